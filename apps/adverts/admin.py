@@ -3,6 +3,8 @@
 from django.contrib import admin
 from django.utils.translation import ugettext_lazy as _
 from django.db import models
+from django.core.urlresolvers import reverse
+from django.utils.html import format_html
 import autocomplete_light
 
 from apps.photo.admin import ThumbAdmin
@@ -13,9 +15,16 @@ from .models import Customer, AdChannel, Advert, AdFormat
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['name', 'contact_info']
+    list_display = ['name', 'contact_info', 'report']
     list_editable = []
 
+    def report(self, instance):
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('adverts:report', kwargs={'customer_id': instance.pk}),
+            _('statistics'),
+        )
+
 
 @admin.register(Advert)
 class AdvertAdmin(AdminImageMixin, admin.ModelAdmin, ThumbAdmin):
@@ -30,6 +39,7 @@ class AdvertAdmin(AdminImageMixin, admin.ModelAdmin, ThumbAdmin):
         'ad_type',
         'status',
         'ordering',
+        'weight',
         'extra_classes',
         'channels',
     ]
@@ -38,6 +48,7 @@ class AdvertAdmin(AdminImageMixin, admin.ModelAdmin, ThumbAdmin):
         'end_time',
         'status',
         'ordering',
+        'weight',
         'extra_classes',
     ]
     readonly_fields = ['get_html']
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.utils.translation import ugettext_lazy as _
 
 class AdvertsAppConfig(AppConfig):
     name = 'apps.adverts'
-    verbose_name = _('Adverts')
\ No newline at end of file
+    verbose_name = _('Adverts')
+
+    def ready(self):
+        from .serving import invalidate_snapshot
+        Advert = self.get_model('Advert')
+        AdChannel = self.get_model('AdChannel')
+        AdFormat = self.get_model('AdFormat')
+        for model in (Advert, AdChannel, AdFormat):
+            post_save.connect(invalidate_snapshot, sender=model)
+            post_delete.connect(invalidate_snapshot, sender=model)
+        for through in (Advert.ad_channels.through,
+                        AdChannel.ad_formats.through):
+            m2m_changed.connect(invalidate_snapshot, sender=through)
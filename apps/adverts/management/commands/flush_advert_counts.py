@@ -0,0 +1,21 @@
+import logging
+logger = logging.getLogger('universitas')
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.adverts.tracking import flush_counts, get_buffer
+
+
+class Command(BaseCommand):
+    help = 'Saves buffered advert impressions and clicks to the database.'
+
+    def handle(self, *args, **options):
+        counter_buffer = get_buffer()
+        if not counter_buffer.shared:
+            raise CommandError(
+                '{} is kept inside each web process, and flushes itself. '
+                'Set ADVERTS_COUNTER_BUFFER to a shared buffer such as '
+                'apps.adverts.tracking.RedisCounterBuffer.'.format(
+                    counter_buffer.__class__.__name__))
+        rows = flush_counts(counter_buffer)
+        self.stdout.write('Saved counts for {} advert days'.format(rows))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adverts', '0006_auto_20150303_0009'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advert',
+            name='weight',
+            field=models.PositiveSmallIntegerField(help_text='Relative share of views among ads with the same ordering', default=1),
+            preserve_default=True,
+        ),
+    ]
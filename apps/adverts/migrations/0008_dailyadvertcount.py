@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adverts', '0007_advert_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAdvertCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('date', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('advert', models.ForeignKey(to='adverts.Advert')),
+            ],
+            options={
+                'verbose_name': 'Daily advert count',
+                'verbose_name_plural': 'Daily advert counts',
+                'ordering': ('advert', 'date'),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyadvertcount',
+            unique_together=set([('advert', 'date')]),
+        ),
+    ]
@@ -9,6 +9,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.utils.safestring import mark_safe
+from django.core.urlresolvers import reverse
 
 from sorl.thumbnail import ImageField, get_thumbnail
 
@@ -105,11 +106,9 @@ class AdChannel(models.Model):
         return ', '.join(str(ad) for ad in self.current_ads())
 
     def serve_ads(self):
-        served_ads = self.current_ads().order_by(
-            'ordering',
-            '?',
-        )[:self.max_at_once]
-        return served_ads
+        """ Ads to show now, from the ad serving snapshot. """
+        from .serving import serve_ads
+        return serve_ads(self.name)
 
         # old_ads = old_ads or []
         # served_ads = []
@@ -240,6 +239,10 @@ class Advert(models.Model):
         help_text=_('Ordering of the ad within the channel'),
         default=1,
     )
+    weight = models.PositiveSmallIntegerField(
+        help_text=_('Relative share of views among ads with the same ordering'),
+        default=1,
+    )
     status = models.PositiveIntegerField(
         help_text=_('Publication status'),
         choices=STATUS_CHOICES,
@@ -343,10 +346,10 @@ class Advert(models.Model):
             return getattr(self.imagefile, axis)
         except AttributeError:
             pass
-        try:
-            return getattr(self.ad_channels.first().ad_formats.first(), axis)
-        except AttributeError:
-            pass
+        # Iterate over all() instead of first(), which works with prefetching.
+        for channel in self.ad_channels.all():
+            for ad_format in channel.ad_formats.all():
+                return getattr(ad_format, axis)
 
         return 300
 
@@ -358,6 +361,10 @@ class Advert(models.Model):
     def height(self):
         return self.dimension('height')
 
+    def get_click_url(self):
+        """ Url that counts a click before redirecting to the link. """
+        return reverse('adverts:click', kwargs={'advert_id': self.id})
+
     def determine_ad_type(self, as_string=False):
         """ Determine which kind of ad it is based on which fields are filled in. """
         if self.html_source:
@@ -370,7 +377,7 @@ class Advert(models.Model):
     def get_html(self):
         html_class = 'annonse ' + self.extra_classes
         img_template = (
-            '<a href="{this.link}" '
+            '<a href="{click_url}" '
             'alt="{this.alt_text}" >'
             '<img src="{src}">'
             '</a>'
@@ -384,7 +391,8 @@ class Advert(models.Model):
             thumb = get_thumbnail(
                 self.imagefile, '%sx%s' %
                 (self.width, self.height))
-            content = img_template.format(this=self, src=thumb.url)
+            content = img_template.format(
+                this=self, src=thumb.url, click_url=self.get_click_url())
         elif self.ad_type == self.DUMMY_AD:
             content = str(self)
         html_source = div_template.format(
@@ -396,3 +404,23 @@ class Advert(models.Model):
     def channels(self):
         return ','.join(
             channel.name for channel in self.ad_channels.all()) or '-'
+
+
+class DailyAdvertCount(models.Model):
+
+    """ Impressions and clicks of an advert on one day. """
+
+    advert = models.ForeignKey(Advert)
+    date = models.DateField()
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Daily advert count')
+        verbose_name_plural = _('Daily advert counts')
+        unique_together = ('advert', 'date')
+        ordering = ('advert', 'date')
+
+    def __str__(self):
+        return '{s.advert_id} {s.date}: {s.impressions} / {s.clicks}'.format(
+            s=self)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory ad serving.
+
+Each process keeps a snapshot of the eligible ads in every channel, with
+their html rendered in advance. Serving ads is then a weighted random pick
+in memory, without any database queries. The snapshot is rebuilt when an
+advert, channel or format is changed, or when a scheduled start or end
+time has passed.
+"""
+import random
+import time
+from itertools import groupby
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import AdChannel, Advert
+
+import logging
+logger = logging.getLogger('universitas')
+
+# The cache key for the snapshot version, shared by all processes.
+VERSION_KEY = 'adverts.snapshot_version'
+# Seconds between checks of the shared snapshot version.
+VERSION_CHECK_INTERVAL = 5
+# Cookie set by javascript in the browser, never by the server, so pages can
+# be cached and anonymous visitors get no session. The value is a random
+# visitor id and a page view counter, like "k3j5h2.17".
+SEED_COOKIE = 'ad_seed'
+
+
+class ServedAd:
+
+    """ An advert with prerendered html. """
+
+    def __init__(self, advert):
+        self.id = advert.id
+        self.ordering = advert.ordering
+        self.weight = max(advert.weight, 1)
+        self.html = advert.get_html()
+
+    def get_html(self):
+        return mark_safe(self.html)
+
+    def __repr__(self):
+        return '<ServedAd {}>'.format(self.id)
+
+
+class ChannelSnapshot:
+
+    """ Eligible adverts in an ad channel. """
+
+    def __init__(self, channel, ads):
+        self.id = channel.id
+        self.name = channel.name
+        self.max_at_once = channel.max_at_once
+        self._css_classes = channel.css_classes()
+        self.ads = sorted(ads, key=lambda ad: ad.ordering)
+
+    def css_classes(self):
+        return self._css_classes
+
+    def __str__(self):
+        return self.name
+
+    def serve(self, randomizer=random):
+        """ Pick ads by ordering, then weighted random within each ordering. """
+        served_ads = []
+        for ordering, ads in groupby(self.ads, lambda ad: ad.ordering):
+            # Weighted random order (Efraimidis and Spirakis).
+            served_ads += sorted(
+                ads,
+                key=lambda ad: randomizer.random() ** (1 / ad.weight),
+                reverse=True,
+            )
+            if len(served_ads) >= self.max_at_once:
+                break
+        return served_ads[:self.max_at_once]
+
+
+class AdSnapshot:
+
+    """ All ad channels and eligible ads at a point in time. """
+
+    def __init__(self, version=None, now=None):
+        self.version = version
+        self.now = now or timezone.now()
+        channels = AdChannel.objects.all()
+        # Published ads must be inside their window. Fallback ads are always eligible.
+        adverts = Advert.objects.filter(
+            Q(status=Advert.PUBLISHED,
+              start_time__lte=self.now,
+              end_time__gte=self.now) |
+            Q(status=Advert.DEFAULT)
+        ).prefetch_related('ad_channels__ad_formats')
+        channel_ads = {channel.id: [] for channel in channels}
+        for advert in adverts:
+            try:
+                served_ad = ServedAd(advert)
+            except Exception:
+                logger.exception('Could not render advert {}'.format(advert.id))
+                continue
+            for channel in advert.ad_channels.all():
+                channel_ads.setdefault(channel.id, []).append(served_ad)
+        self.channels = {
+            channel.name: ChannelSnapshot(channel, channel_ads[channel.id])
+            for channel in channels
+        }
+        self.valid_until = self.next_change()
+
+    def next_change(self):
+        """ The next time a published ad starts or stops. """
+        upcoming = Advert.objects.filter(status=Advert.PUBLISHED)
+        next_start = upcoming.filter(start_time__gt=self.now).order_by(
+            'start_time').values_list('start_time', flat=True).first()
+        next_end = upcoming.filter(end_time__gte=self.now).order_by(
+            'end_time').values_list('end_time', flat=True).first()
+        changes = [change for change in (next_start, next_end) if change]
+        return min(changes) if changes else None
+
+    def is_current(self, now=None):
+        now = now or timezone.now()
+        return self.valid_until is None or now <= self.valid_until
+
+
+_snapshot = None
+_version_checked = 0
+
+
+def get_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def invalidate_snapshot(**kwargs):
+    """ Signal handler. Makes all processes rebuild their snapshot. """
+    global _snapshot
+    _snapshot = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_snapshot():
+    """ The snapshot for this process, rebuilt if it's out of date. """
+    global _snapshot, _version_checked
+    now = time.time()
+    if _snapshot is not None and now - _version_checked > VERSION_CHECK_INTERVAL:
+        _version_checked = now
+        if get_version() != _snapshot.version:
+            _snapshot = None
+    if _snapshot is None or not _snapshot.is_current():
+        _version_checked = now
+        _snapshot = AdSnapshot(version=get_version())
+        logger.debug('Built ad snapshot of {} channels'.format(
+            len(_snapshot.channels)))
+    return _snapshot
+
+
+def get_channel(channel_name):
+    """ The snapshot of a channel, or None if it doesn't exist. """
+    return get_snapshot().channels.get(channel_name)
+
+
+def get_randomizer(request, channel_name):
+    """
+    Random generator for ad rotation, seeded from the visitor's seed cookie.
+
+    The page view counter in the cookie rotates the ads between page views.
+    Without the cookie, the choice is random for each request.
+    """
+    seed = request.COOKIES.get(SEED_COOKIE, '')[:64] if request else ''
+    if not seed:
+        return random
+    return random.Random('{}:{}'.format(seed, channel_name))
+
+
+def serve_ads(channel_name, request=None):
+    """ Ads to show now in a channel. """
+    channel = get_channel(channel_name)
+    if channel is None:
+        return []
+    return channel.serve(get_randomizer(request, channel_name))
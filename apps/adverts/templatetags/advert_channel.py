@@ -3,6 +3,8 @@
 import logging
 from django import template
 from ..models import AdChannel, Advert, AdFormat
+from ..serving import get_channel, get_randomizer, invalidate_snapshot
+from ..tracking import count_impressions
 
 register = template.Library()
 logger = logging.getLogger('universitas')
@@ -10,26 +12,28 @@ logger = logging.getLogger('universitas')
 
 @register.inclusion_tag('_advert-channel.html', takes_context=True)
 def advert(context, channel_name):
-    channel, new = AdChannel.objects.get_or_create(name=channel_name)
-    if new:
-        adformat = AdFormat.objects.order_by('?').first()
-        dummy_ad = Advert.objects.create_dummy(adformat)
-        dummy_ad.status = Advert.PUBLISHED
-        dummy_ad.ad_channels.add(channel)
-        channel.ad_formats.add(adformat)
-        dummy_ad.save()
-        channel.description = 'autocreate'
-        logger.warning('Template requests unknown ad channel ' + channel_name)
-        channel.save()
+    channel = get_channel(channel_name)
+    if channel is None:
+        channel, new = AdChannel.objects.get_or_create(name=channel_name)
+        if new:
+            adformat = AdFormat.objects.order_by('?').first()
+            dummy_ad = Advert.objects.create_dummy(adformat)
+            dummy_ad.status = Advert.PUBLISHED
+            dummy_ad.ad_channels.add(channel)
+            channel.ad_formats.add(adformat)
+            dummy_ad.save()
+            channel.description = 'autocreate'
+            logger.warning(
+                'Template requests unknown ad channel ' + channel_name)
+            channel.save()
+        # The channel is missing from the snapshot.
+        invalidate_snapshot()
+        channel = get_channel(channel_name)
 
-    new_ads = channel.serve_ads()
-    session = context.get('session')
-    if session:
-        seen_ads = session.get('seen_ads', [])
-        for ad in new_ads:
-            seen_ads.remove(ad.id)
-            seen_ads.append(ad.id)
-        session['seen_ads'] = seen_ads
+    # Rotation is stateless, so rendering ads never touches the session.
+    randomizer = get_randomizer(context.get('request'), channel_name)
+    new_ads = channel.serve(randomizer)
+    count_impressions([ad.id for ad in new_ads])
 
     channel_context = {
         "ads": new_ads,
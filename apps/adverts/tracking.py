@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered counting of advert impressions and clicks.
+
+Counts are added to a buffer while pages are served, and flushed in bulk to
+DailyAdvertCount rows. The buffer class is set with the
+ADVERTS_COUNTER_BUFFER setting. The redis buffer is shared by all processes,
+and is flushed by `manage.py flush_advert_counts`. The in-process buffer
+flushes itself every minute and when the process exits. Counts are lost if
+the process is killed, so it's only meant for development and tests.
+"""
+import atexit
+import time
+import uuid
+from collections import Counter
+from importlib import import_module
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Advert, DailyAdvertCount
+
+import logging
+logger = logging.getLogger('universitas')
+
+IMPRESSIONS = 'impressions'
+CLICKS = 'clicks'
+
+
+def today():
+    return timezone.localtime(timezone.now()).date()
+
+
+class LocalCounterBuffer:
+
+    """ Counts kept in this process. """
+
+    # Seconds between automatic flushes.
+    flush_interval = 60
+    # Other processes can't flush this buffer.
+    shared = False
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = Lock()
+        self._flushed = time.time()
+        # Save what's left when the worker is recycled.
+        atexit.register(flush_counts, self)
+
+    def add(self, kind, advert_ids, date):
+        with self._lock:
+            for advert_id in advert_ids:
+                self._counts[kind, advert_id, date] += 1
+
+    def add_counts(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+    def pop_all(self):
+        """ Remove and return all counts as a Counter. """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed = time.time()
+        return counts
+
+    def needs_flush(self):
+        return time.time() - self._flushed > self.flush_interval
+
+
+class RedisCounterBuffer:
+
+    """ Counts kept in a redis hash, shared between processes. """
+
+    key = 'adverts:counts'
+    flush_interval = None
+    shared = True
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                'RedisCounterBuffer requires the redis package.')
+        url = getattr(settings, 'ADVERTS_REDIS_URL', 'redis://localhost:6379/0')
+        self._redis = redis.StrictRedis.from_url(url)
+        self._response_error = redis.ResponseError
+
+    def add(self, kind, advert_ids, date):
+        self.add_counts(Counter(
+            (kind, advert_id, date) for advert_id in advert_ids))
+
+    def add_counts(self, counts):
+        pipeline = self._redis.pipeline(transaction=False)
+        for (kind, advert_id, date), number in counts.items():
+            field = '{}:{}:{:%Y-%m-%d}'.format(kind, advert_id, date)
+            pipeline.hincrby(self.key, field, number)
+        pipeline.execute()
+
+    def pop_all(self):
+        # Renaming is atomic, so counts added meanwhile go to a new hash.
+        flushing_key = '{}:{}'.format(self.key, uuid.uuid4().hex)
+        try:
+            self._redis.rename(self.key, flushing_key)
+        except self._response_error:
+            # There is nothing to flush.
+            return Counter()
+        counts = Counter()
+        for field, count in self._redis.hgetall(flushing_key).items():
+            kind, advert_id, date = field.decode().split(':')
+            date = timezone.datetime.strptime(date, '%Y-%m-%d').date()
+            counts[kind, int(advert_id), date] += int(count)
+        self._redis.delete(flushing_key)
+        return counts
+
+    def needs_flush(self):
+        return False
+
+
+_buffer = None
+
+
+def get_buffer():
+    """ The counter buffer configured with ADVERTS_COUNTER_BUFFER. """
+    global _buffer
+    if _buffer is None:
+        buffer_name = getattr(
+            settings, 'ADVERTS_COUNTER_BUFFER',
+            'apps.adverts.tracking.RedisCounterBuffer')
+        module_name, class_name = buffer_name.rsplit('.', 1)
+        _buffer = getattr(import_module(module_name), class_name)()
+    return _buffer
+
+
+def count(kind, advert_ids):
+    """ Add to the counts of some adverts. """
+    if not advert_ids:
+        return
+    counter_buffer = get_buffer()
+    counter_buffer.add(kind, advert_ids, today())
+    if counter_buffer.needs_flush():
+        flush_counts(counter_buffer)
+
+
+def count_impressions(advert_ids):
+    count(IMPRESSIONS, advert_ids)
+
+
+def count_click(advert_id):
+    count(CLICKS, [advert_id])
+
+
+def _update_rows(rows):
+    """ Add to existing DailyAdvertCount rows. """
+    if connection.vendor == 'postgresql':
+        # One UPDATE ... FROM (VALUES ...) statement for all rows.
+        values = ', '.join(['(%s, %s::date, %s, %s)'] * len(rows))
+        params = []
+        for (advert_id, date), (impressions, clicks) in rows.items():
+            params += [advert_id, date, impressions, clicks]
+        sql = (
+            'UPDATE {table} AS c SET '
+            'impressions = c.impressions + v.impressions, '
+            'clicks = c.clicks + v.clicks '
+            'FROM (VALUES {values}) AS v (advert_id, date, impressions, clicks) '
+            'WHERE c.advert_id = v.advert_id AND c.date = v.date'
+        ).format(table=DailyAdvertCount._meta.db_table, values=values)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, params)
+        finally:
+            cursor.close()
+    else:
+        for (advert_id, date), (impressions, clicks) in rows.items():
+            DailyAdvertCount.objects.filter(
+                advert_id=advert_id, date=date).update(
+                impressions=F('impressions') + impressions,
+                clicks=F('clicks') + clicks)
+
+
+def save_counts(counts):
+    """ Upsert a Counter of (kind, advert_id, date) into the daily rows. """
+    rows = {}
+    for (kind, advert_id, date), number in counts.items():
+        row = rows.setdefault((advert_id, date), [0, 0])
+        row[0 if kind == IMPRESSIONS else 1] += number
+    if not rows:
+        return 0
+    advert_ids = set(advert_id for advert_id, date in rows)
+    dates = set(date for advert_id, date in rows)
+    # Adverts might have been deleted since they were counted.
+    advert_ids = set(Advert.objects.filter(
+        id__in=advert_ids).values_list('id', flat=True))
+    rows = {key: row for key, row in rows.items() if key[0] in advert_ids}
+    with transaction.atomic():
+        existing = set(DailyAdvertCount.objects.filter(
+            advert_id__in=advert_ids, date__in=dates,
+        ).values_list('advert_id', 'date'))
+        existing_rows = {
+            key: row for key, row in rows.items() if key in existing}
+        new_rows = {
+            key: row for key, row in rows.items() if key not in existing}
+        if existing_rows:
+            _update_rows(existing_rows)
+        try:
+            with transaction.atomic():
+                DailyAdvertCount.objects.bulk_create([
+                    DailyAdvertCount(
+                        advert_id=advert_id, date=date,
+                        impressions=impressions, clicks=clicks)
+                    for (advert_id, date), (impressions, clicks)
+                    in new_rows.items()
+                ])
+        except IntegrityError:
+            # Another process created some of the rows meanwhile.
+            for (advert_id, date), (impressions, clicks) in new_rows.items():
+                row, new = DailyAdvertCount.objects.get_or_create(
+                    advert_id=advert_id, date=date)
+                DailyAdvertCount.objects.filter(pk=row.pk).update(
+                    impressions=F('impressions') + impressions,
+                    clicks=F('clicks') + clicks)
+    return len(rows)
+
+
+def flush_counts(counter_buffer=None):
+    """ Move buffered counts to the database. Returns number of rows. """
+    counter_buffer = counter_buffer or get_buffer()
+    counts = counter_buffer.pop_all()
+    try:
+        return save_counts(counts)
+    except Exception:
+        # Keep the counts for the next flush.
+        logger.exception('Could not save {} advert counts'.format(len(counts)))
+        counter_buffer.add_counts(counts)
+        return 0
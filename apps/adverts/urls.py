@@ -0,0 +1,10 @@
+"""URLs for advert clicks and reports."""
+
+from django.conf.urls import patterns, url
+from .views import advert_click, customer_report
+
+urlpatterns = patterns(
+    '',
+    url(r'^(?P<advert_id>\d+)/klikk/$', advert_click, name='click'),
+    url(r'^kunde/(?P<customer_id>\d+)/$', customer_report, name='report'),
+)
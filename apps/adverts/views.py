@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Sum
+from django.http import HttpResponseRedirect
+from django.shortcuts import render, get_object_or_404
 
-# Create your views here.
+from .models import Advert, Customer, DailyAdvertCount
+from .tracking import count_click
+
+
+def advert_click(request, advert_id):
+    """ Count a click on an image advert and redirect to its link. """
+    link = get_object_or_404(
+        Advert.objects.exclude(link=None).exclude(link='').values_list(
+            'link', flat=True),
+        pk=advert_id,
+    )
+    count_click(int(advert_id))
+    return HttpResponseRedirect(link)
+
+
+@staff_member_required
+def customer_report(request, customer_id):
+    """ Impressions and clicks of a customer's adverts. """
+    customer = get_object_or_404(Customer, pk=customer_id)
+    daily_counts = DailyAdvertCount.objects.filter(
+        advert__customer=customer).select_related('advert')
+    totals = daily_counts.values(
+        'advert', 'advert__description').annotate(
+        impressions=Sum('impressions'),
+        clicks=Sum('clicks'),
+    ).order_by('advert')
+    context = {
+        'customer': customer,
+        'daily_counts': daily_counts,
+        'totals': totals,
+    }
+    return render(request, 'advert-report.html', context)
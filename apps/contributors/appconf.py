@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 
 class ContributorsAppConfig(AppConfig):
     name = 'apps.contributors'
-    verbose_name = _('Contributors')
\ No newline at end of file
+    verbose_name = _('Contributors')
+    def ready(self):
+        from .name_index import update_index, remove_from_index
+        Contributor = self.get_model('Contributor')
+        post_save.connect(update_index, sender=Contributor)
+        post_delete.connect(remove_from_index, sender=Contributor)
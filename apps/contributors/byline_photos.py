@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory index of byline photos.
+
+Contributors without a byline photo are matched by name to the files in the
+byline photo folder. The folder is listed once, and the file names are kept
+in a dictionary and a name index, so a lookup is a dictionary hit, or fuzzy
+scoring of the few files with similar names. Names without a photo are
+remembered, so they are not looked up again.
+
+Each process keeps its index until the folder is changed, or until the
+`index_byline_photos` command is run.
+"""
+import os
+import re
+
+from django.conf import settings
+from fuzzywuzzy import fuzz
+from slugify import Slugify
+
+from utils.process_cache import ProcessCache
+from .name_index import NameIndex
+
+import logging
+logger = logging.getLogger('universitas')
+
+BYLINE_PHOTO_FOLDER = os.path.normpath(
+    os.path.join(settings.MEDIA_ROOT, 'byline'))
+# File names with a `fuzz.ratio` above this are photos of the contributor.
+MINIMUM_RATIO = 91
+# The cache key for the index version, shared by all processes.
+VERSION_KEY = 'contributors.byline_photo_version'
+# Seconds between checks of the folder and the shared index version.
+VERSION_CHECK_INTERVAL = 5
+
+slugify = Slugify(to_lower=True)
+
+
+def folder_mtime(folder):
+    try:
+        return os.path.getmtime(folder)
+    except OSError:
+        return None
+
+
+def name_slugs(name):
+    """ File names of a photo of a contributor. """
+    name = name.lower()
+    name_last_first = re.sub(r'^(.*) (\S+)$', r'\2 \1', name)
+    return [slugify(name) + '.jpg', slugify(name_last_first) + '.jpg']
+
+
+class BylinePhotoIndex:
+
+    """ Byline photos keyed by lower case file name and name bigrams. """
+
+    def __init__(self, folder=BYLINE_PHOTO_FOLDER):
+        self.folder = folder
+        self.mtime = folder_mtime(folder)
+        self.paths = {}
+        self.misses = set()
+        try:
+            filenames = sorted(
+                filename for filename in os.listdir(folder)
+                if filename.endswith('.jpg'))
+        except OSError:
+            filenames = []
+        for filename in filenames:
+            self.paths.setdefault(
+                filename.lower(), os.path.join(folder, filename))
+        self.filenames = sorted(self.paths)
+        self.names = NameIndex(
+            enumerate(self.filenames), minimum_ratio=MINIMUM_RATIO)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def is_current(self):
+        return folder_mtime(self.folder) == self.mtime
+
+    def find(self, name):
+        """ Path of the best matching photo for a name, or None. """
+        if name in self.misses:
+            return None
+        slugs = name_slugs(name)
+        for slug in slugs:
+            if slug in self.paths:
+                return self.paths[slug]
+        candidates = set()
+        for slug in slugs:
+            candidates.update(self.names.candidates(slug))
+        bestratio = MINIMUM_RATIO - 1
+        bestmatch = None
+        for index in sorted(candidates):
+            filename = self.filenames[index]
+            ratio = max(fuzz.ratio(filename, slug) for slug in slugs)
+            if ratio > bestratio:
+                bestmatch = filename
+                bestratio = ratio
+        if bestmatch is None:
+            self.misses.add(name)
+            return None
+        logger.debug('found match: name:{}, img:{}, ratio:{} '.format(
+            slugs[0], bestmatch, bestratio))
+        return self.paths[bestmatch]
+
+
+def build_photo_index():
+    photo_index = BylinePhotoIndex()
+    logger.debug('Built byline photo index of {} photos'.format(
+        len(photo_index)))
+    return photo_index
+
+
+_cache = ProcessCache(
+    VERSION_KEY, build_photo_index,
+    is_current=BylinePhotoIndex.is_current,
+    check_interval=VERSION_CHECK_INTERVAL)
+
+
+def invalidate_photo_index():
+    """ Makes all processes list the byline photo folder again. """
+    _cache.invalidate()
+
+
+def get_photo_index():
+    """ The byline photo index for this process, rebuilt if it's stale. """
+    return _cache.get()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Deduplication of contributors.
+
+Legacy imports have created many contributors for the same person, because
+of misspelled and reversed names. Contributors are grouped in blocks that
+share a blocking key, such as first initial and surname, and only names
+within the same block are compared with fuzzy scoring. Contributors with
+similar names are grouped together, and each group is split into clusters
+around a primary contributor. Every duplicate in a cluster must have a name
+similar to the primary, not just to some other duplicate, and verified
+contributors are never merged into each other. Each cluster is merged into
+its primary contributor. The foreign keys of all duplicates in a cluster are
+moved with one update per related model.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Count
+from fuzzywuzzy import fuzz
+
+from .models import Contributor
+
+import logging
+logger = logging.getLogger('universitas')
+
+# Names with a `fuzz.token_sort_ratio` of at least this are the same person.
+MINIMUM_RATIO = 90
+# Blocks larger than this are too common to say anything about identity.
+MAX_BLOCK_SIZE = 200
+# Fields of duplicates used when the primary contributor has no value.
+FILL_FIELDS = ['initials', 'phone', 'email', 'byline_photo_id']
+
+
+def normalize(name):
+    """ Lower case name without punctuation and diacritics. """
+    name = re.sub(r'\(.*?\)', '', name).lower()
+    name = ''.join(
+        char for char in unicodedata.normalize('NFKD', name)
+        if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', name))
+
+
+def blocking_keys(name):
+    """ Keys shared by names that might be the same person. """
+    words = name.split()
+    if len(words) < 2:
+        return set()
+    first, last = words[0], words[-1]
+    initials = ''.join(word[0] for word in words)
+    return {
+        # Kari Nordmann
+        (first[0], last),
+        # Nordmann Kari
+        (last[0], first),
+        # Kari Nordman
+        (initials, last[:4]),
+    }
+
+
+class Cluster:
+
+    """ A primary contributor and its duplicates. """
+
+    def __init__(self, primary, duplicates):
+        self.primary = primary
+        self.duplicates = duplicates
+
+    def __str__(self):
+        return '{} ({}) <- {}'.format(
+            self.primary.display_name, self.primary.pk, ', '.join(
+                '{} ({})'.format(duplicate.display_name, duplicate.pk)
+                for duplicate in self.duplicates))
+
+
+class Deduplicator:
+
+    """ Finds and merges clusters of duplicate contributors. """
+
+    def __init__(self, minimum_ratio=MINIMUM_RATIO, queryset=None):
+        self.minimum_ratio = minimum_ratio
+        if queryset is None:
+            queryset = Contributor.objects.all()
+        self.contributors = {
+            contributor.pk: contributor for contributor in
+            queryset.annotate(bylines=Count('byline'))
+        }
+
+    def names(self, contributor):
+        """ Normalized display name and aliases of a contributor. """
+        names = [contributor.display_name]
+        names += contributor.aliases.splitlines()
+        return {normalize(name) for name in names if normalize(name)}
+
+    def blocks(self):
+        """ Pks of contributors, keyed by blocking key. """
+        self.normalized = {}
+        blocks = defaultdict(set)
+        for pk, contributor in self.contributors.items():
+            names = self.names(contributor)
+            self.normalized[pk] = names
+            for name in names:
+                for key in blocking_keys(name):
+                    blocks[key].add(pk)
+        return blocks
+
+    def score(self, pk, other_pk):
+        return max(
+            fuzz.token_sort_ratio(name, other_name)
+            for name in self.normalized[pk]
+            for other_name in self.normalized[other_pk])
+
+    def primary(self, pks):
+        """ Verified contributors first, then the one with most bylines. """
+        return min(pks, key=lambda pk: (
+            not self.contributors[pk].verified,
+            -self.contributors[pk].bylines,
+            pk))
+
+    def split(self, pks):
+        """
+        Clusters of a group of similar contributors. Each primary gets the
+        unverified contributors that are similar to it. Verified contributors
+        are always primaries, so two of them are never merged.
+        """
+        clusters = []
+        remaining = set(pks)
+        while len(remaining) > 1:
+            primary = self.primary(remaining)
+            remaining.discard(primary)
+            duplicates = sorted(
+                pk for pk in remaining
+                if not self.contributors[pk].verified and
+                self.score(primary, pk) >= self.minimum_ratio)
+            remaining.difference_update(duplicates)
+            if duplicates:
+                clusters.append(Cluster(
+                    self.contributors[primary],
+                    [self.contributors[pk] for pk in duplicates]))
+        return clusters
+
+    def find_clusters(self):
+        """ Clusters of similar contributors, largest first. """
+        parent = {}
+
+        def find(pk):
+            while parent.get(pk, pk) != pk:
+                pk = parent[pk]
+            return pk
+
+        scored = set()
+        for key, pks in self.blocks().items():
+            if len(pks) > MAX_BLOCK_SIZE:
+                logger.debug('Skipped block {} of {} contributors'.format(
+                    key, len(pks)))
+                continue
+            for pk, other_pk in combinations(sorted(pks), 2):
+                if (pk, other_pk) in scored or find(pk) == find(other_pk):
+                    continue
+                scored.add((pk, other_pk))
+                if self.score(pk, other_pk) >= self.minimum_ratio:
+                    parent[find(other_pk)] = find(pk)
+
+        groups = defaultdict(list)
+        for pk in parent:
+            groups[find(pk)].append(pk)
+        clusters = []
+        for root, pks in groups.items():
+            # Similarity is not transitive, so the group may be split.
+            clusters += self.split(set(pks) | {root})
+        clusters.sort(key=lambda cluster: (
+            -len(cluster.duplicates), cluster.primary.pk))
+        return clusters
+
+    def report(self, clusters):
+        """ Lines describing the merges, for a dry run. """
+        lines = [str(cluster) for cluster in clusters]
+        lines.append('{} clusters, {} duplicates of {} contributors'.format(
+            len(clusters),
+            sum(len(cluster.duplicates) for cluster in clusters),
+            len(self.contributors)))
+        return lines
+
+    @transaction.atomic
+    def merge(self, clusters):
+        """ Merge all clusters. Returns the number of merged contributors. """
+        related_fields = [
+            related.field for related in
+            Contributor._meta.get_all_related_objects()
+        ]
+        merged = []
+        for cluster in clusters:
+            if any(duplicate.verified for duplicate in cluster.duplicates):
+                logger.warning('Not merging verified contributors: {}'.format(
+                    cluster))
+                continue
+            primary = cluster.primary
+            duplicates = [duplicate.pk for duplicate in cluster.duplicates]
+            for field in related_fields:
+                field.model.objects.filter(**{
+                    field.name + '__in': duplicates
+                }).update(**{field.name: primary.pk})
+            aliases = primary.aliases.splitlines()
+            for duplicate in cluster.duplicates:
+                for name in [duplicate.display_name] + (
+                        duplicate.aliases.splitlines()):
+                    if name and name not in aliases and (
+                            name != primary.display_name):
+                        aliases.append(name)
+                for field_name in FILL_FIELDS:
+                    if getattr(primary, field_name) in [None, '']:
+                        setattr(primary, field_name,
+                                getattr(duplicate, field_name))
+            primary.aliases = '\n'.join(aliases)
+            primary.save()
+            merged += duplicates
+        Contributor.objects.filter(pk__in=merged).delete()
+        logger.info('Merged {} contributors in {} clusters'.format(
+            len(merged), len(clusters)))
+        return len(merged)
@@ -0,0 +1,99 @@
+from optparse import make_option
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from fuzzywuzzy import fuzz
+
+from apps.contributors.name_index import NameIndex, MINIMUM_RATIO
+
+FIRST_NAMES = [
+    'Anne', 'Kari', 'Ingrid', 'Marte', 'Siri', 'Åse', 'Ola', 'Per', 'Hans',
+    'Jon', 'Øystein', 'Tor', 'Knut', 'Lars', 'Mari', 'Nora', 'Emma', 'Jakob',
+]
+LAST_NAMES = [
+    'Hansen', 'Johansen', 'Olsen', 'Larsen', 'Andersen', 'Pedersen',
+    'Nilsen', 'Kristiansen', 'Berg', 'Haugen', 'Bakke', 'Strand', 'Ås',
+    'Nordmann', 'Solberg', 'Lie', 'Dahl', 'Moen',
+]
+
+
+def random_name(randomizer):
+    """ A name with a few random typos. """
+    name = list('{} {} {}'.format(
+        randomizer.choice(FIRST_NAMES),
+        randomizer.choice(FIRST_NAMES + LAST_NAMES),
+        randomizer.choice(LAST_NAMES)))
+    for _ in range(randomizer.randint(0, 3)):
+        index = randomizer.randrange(len(name))
+        name[index] = randomizer.choice('aeiouæøå')
+    return ''.join(name)
+
+
+def full_scan(names, full_name):
+    """ The previous implementation: fuzz.ratio of every contributor. """
+    candidates = []
+    for pk, name in names:
+        if fuzz.ratio(name, full_name) >= MINIMUM_RATIO:
+            return pk, []
+        if name in full_name:
+            candidates.append(pk)
+    return None, candidates
+
+
+class Command(BaseCommand):
+    help = 'Compares the contributor name index to a full fuzzy scan.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--contributors', '-c',
+            type='int',
+            dest='contributors',
+            default=10000,
+            help='Number of contributor names.'
+        ),
+        make_option(
+            '--number', '-n',
+            type='int',
+            dest='number',
+            default=200,
+            help='Number of lookups.'
+        ),
+        make_option(
+            '--seed',
+            type='int',
+            dest='seed',
+            default=1,
+            help='Random seed for the names.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        randomizer = random.Random(options['seed'])
+        names = [
+            (pk, random_name(randomizer))
+            for pk in range(1, options['contributors'] + 1)]
+        queries = [random_name(randomizer) for _ in range(options['number'])]
+
+        start = time.time()
+        index = NameIndex(names)
+        self.stdout.write('Built index of {} names in {:.0f} ms'.format(
+            len(index), 1000 * (time.time() - start)))
+
+        results = {}
+        for name, function in [
+                ('full scan', lambda query: full_scan(names, query)),
+                ('index', lambda query: index.lookup(query, fuzz.ratio))]:
+            start = time.time()
+            results[name] = [function(query) for query in queries]
+            duration = time.time() - start
+            self.stdout.write(
+                '{:<10} lookups: {}  total: {:.0f} ms  mean: {:.2f} ms'.format(
+                    name,
+                    len(queries),
+                    1000 * duration,
+                    1000 * duration / len(queries),
+                ))
+        differences = sum(
+            1 for a, b in zip(results['full scan'], results['index'])
+            if a != b)
+        self.stdout.write('Different matches: {}'.format(differences))
@@ -0,0 +1,40 @@
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.contributors.dedup import Deduplicator, MINIMUM_RATIO
+
+
+class Command(BaseCommand):
+    help = 'Finds and merges duplicate contributors. Dry run by default.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--merge',
+            action='store_true',
+            dest='merge',
+            default=False,
+            help='Merge the duplicates. Otherwise only report them.'
+        ),
+        make_option(
+            '--ratio',
+            type='int',
+            dest='ratio',
+            default=MINIMUM_RATIO,
+            help='Minimum fuzzy ratio of duplicate names.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        deduplicator = Deduplicator(minimum_ratio=options['ratio'])
+        clusters = deduplicator.find_clusters()
+        for line in deduplicator.report(clusters):
+            self.stdout.write(line)
+        self.stdout.write('Found clusters in {:.1f} s'.format(
+            time.time() - start))
+        if options['merge'] and clusters:
+            start = time.time()
+            merged = deduplicator.merge(clusters)
+            self.stdout.write('Merged {} contributors in {:.1f} s'.format(
+                merged, time.time() - start))
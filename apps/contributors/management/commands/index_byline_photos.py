@@ -0,0 +1,34 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from apps.contributors.models import Contributor
+from apps.contributors.byline_photos import (
+    get_photo_index, invalidate_photo_index)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the byline photo index in all processes.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--assign',
+            action='store_true',
+            dest='assign',
+            default=False,
+            help='Find photos for all contributors without a byline photo.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        invalidate_photo_index()
+        index = get_photo_index()
+        self.stdout.write('Indexed {} byline photos in {}'.format(
+            len(index), index.folder))
+        if options['assign']:
+            found = 0
+            for contributor in Contributor.objects.filter(byline_photo=None):
+                if contributor.get_byline_image():
+                    found += 1
+            self.stdout.write(
+                'Found {} new byline photos, {} names without photos'.format(
+                    found, len(index.misses)))
@@ -1,8 +1,5 @@
 """ Contributors to the thing """
 
-import os
-from slugify import Slugify
-import glob
 import re
 import json
 
@@ -11,19 +8,16 @@ from fuzzywuzzy import fuzz
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
-from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from django.contrib.auth.models import Group
 
 from apps.photo.models import ImageFile
+from .name_index import get_name_index
+from .byline_photos import get_photo_index
 import logging
 logger = logging.getLogger('universitas')
 
 
-BYLINE_PHOTO_FOLDER = os.path.normpath(
-    os.path.join(settings.MEDIA_ROOT, 'byline'))
-
-
 def today():
     return timezone.now().date()
 
@@ -80,31 +74,10 @@ class Contributor(models.Model):
         return self.byline_set.count()
 
     def get_byline_image(self, force_new=False):
-        slugify = Slugify(to_lower=True)
         if not force_new and self.byline_photo:
             return self.byline_photo
-        imagefiles = glob.glob(BYLINE_PHOTO_FOLDER + '/*.jpg')
-        name = self.name.lower()
-        name_last_first = re.sub(r'^(.*) (\S+)$', r'\2 \1', name)
-        name_slug = slugify(name) + '.jpg'
-        name_slug_reverse = slugify(name_last_first) + '.jpg'
-        bestratio = 90
-        bestmatch = None
-        for path in imagefiles:
-            filename = os.path.split(path)[1].lower()
-            ratio = max(
-                fuzz.ratio(filename, name_slug),
-                fuzz.ratio(filename, name_slug_reverse)
-            )
-            if ratio > bestratio:
-                bestmatch = path
-                bestratio = ratio
-                if ratio == 100:
-                    break
+        bestmatch = get_photo_index().find(self.name)
         if bestmatch:
-            msg = 'found match: name:{}, img:{}, ratio:{} '.format(
-                name_slug, bestmatch, ratio)
-            logger.debug(msg)
             img, _ = ImageFile.objects.get_or_create(source_file=bestmatch)
             img.autocrop()
             self.byline_photo = img
@@ -176,16 +149,20 @@ class Contributor(models.Model):
             return base_query.get(aliases__icontains=last_name)
 
         def fuzzy_search():
-            MINIMUM_RATIO = 85
-            candidates = []
-            for contributor in base_query.all():
-                ratio = fuzz.ratio(contributor.display_name, full_name)
-                if ratio >= MINIMUM_RATIO:
-                    # TODO: two contributors with same name.
+            # The index only scores names that can possibly match.
+            name_index = get_name_index()
+            while True:
+                match, candidates = name_index.lookup(full_name, fuzz.ratio)
+                if match is None:
+                    break
+                # TODO: two contributors with same name.
+                contributor = base_query.filter(pk=match).first()
+                if contributor is not None:
                     return contributor
-                if contributor.display_name in full_name:
-                    candidates.append(contributor)
-            return candidates or None
+                # Deleted by another process since the index was built.
+                name_index.remove(match)
+            candidates = base_query.in_bulk(candidates)
+            return [candidates[pk] for pk in sorted(candidates)] or None
 
         # Variuous queries to look for contributor in the database.
         contributor = (
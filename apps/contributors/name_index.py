@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory index of contributor names.
+
+Contributor.get_or_create falls back to fuzzy matching of names. Instead of
+scoring every contributor with `fuzz.ratio`, the index finds the few names
+that can possibly score high enough, and only those are scored. A name can
+only reach the minimum ratio if its length is close enough, and if it shares
+enough character bigrams with the searched name. Both bounds are exact, so
+the index finds the same contributors as a full scan.
+
+Each process keeps its index until a contributor is saved or deleted in
+another process. Saves in this process update the index in place.
+"""
+import math
+from collections import Counter, defaultdict
+
+from utils.process_cache import ProcessCache
+
+import logging
+logger = logging.getLogger('universitas')
+
+# The cache key for the index version, shared by all processes.
+VERSION_KEY = 'contributors.name_index_version'
+# Seconds between checks of the shared index version.
+VERSION_CHECK_INTERVAL = 5
+# Names with a `fuzz.ratio` of at least this are the same person.
+MINIMUM_RATIO = 85
+# fuzz.ratio is rounded, so a slightly lower similarity can still match.
+SIMILARITY_BOUND = (MINIMUM_RATIO - 1) / 100
+# Margin for floating point errors in the bounds.
+EPSILON = 1e-9
+
+
+def bigrams(name):
+    return Counter(name[i:i + 2] for i in range(len(name) - 1))
+
+
+def length_window(length, bound=SIMILARITY_BOUND):
+    """ Name lengths that can be similar enough to a name of `length`. """
+    shortest = math.ceil(length * bound / (2 - bound) - EPSILON)
+    longest = math.floor(length * (2 - bound) / bound + EPSILON)
+    return range(shortest, longest + 1)
+
+
+def required_bigrams(length, other_length, bound=SIMILARITY_BOUND):
+    """
+    The fewest common bigrams of two names that can be similar enough.
+
+    The similarity is `2 * matches / total_length`, so a match can be at
+    most `max_edits` insertions and deletions away. Each edit can remove at
+    most two bigrams.
+    """
+    max_edits = math.floor((1 - bound) * (length + other_length) + EPSILON)
+    return max(length, other_length) - 1 - 2 * max_edits
+
+
+class NameIndex:
+
+    """ Contributor names keyed by exact name, length and bigram. """
+
+    def __init__(self, names=(), minimum_ratio=MINIMUM_RATIO):
+        self.minimum_ratio = minimum_ratio
+        self.bound = (minimum_ratio - 1) / 100
+        self.names = {}
+        self.by_name = defaultdict(set)
+        self.by_length = defaultdict(set)
+        # (name length, bigram) -> {pk: count}
+        self.postings = defaultdict(dict)
+        for pk, name in names:
+            self.add(pk, name)
+
+    @classmethod
+    def build(cls):
+        """ Index all contributors with a single query. """
+        from .models import Contributor
+        return cls(Contributor.objects.values_list('pk', 'display_name'))
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, pk, name):
+        if self.names.get(pk) == name:
+            return
+        self.remove(pk)
+        self.names[pk] = name
+        self.by_name[name].add(pk)
+        self.by_length[len(name)].add(pk)
+        for gram, count in bigrams(name).items():
+            self.postings[len(name), gram][pk] = count
+
+    def remove(self, pk):
+        name = self.names.pop(pk, None)
+        if name is None:
+            return
+        self.by_name[name].discard(pk)
+        self.by_length[len(name)].discard(pk)
+        for gram in bigrams(name):
+            self.postings[len(name), gram].pop(pk, None)
+
+    def candidates(self, name):
+        """ Contributors that might have a high enough `fuzz.ratio`. """
+        grams = bigrams(name)
+        result = set()
+        for length in length_window(len(name), self.bound):
+            if not self.by_length.get(length):
+                continue
+            required = required_bigrams(len(name), length, self.bound)
+            if required <= 0:
+                result.update(self.by_length[length])
+                continue
+            common = defaultdict(int)
+            for gram, count in grams.items():
+                for pk, other_count in self.postings.get(
+                        (length, gram), {}).items():
+                    common[pk] += min(count, other_count)
+            result.update(pk for pk, n in common.items() if n >= required)
+        return sorted(result)
+
+    def substrings(self, name):
+        """ Contributors with a name that is part of `name`. """
+        result = set()
+        for start in range(len(name) + 1):
+            for end in range(start, len(name) + 1):
+                result.update(self.by_name.get(name[start:end], ()))
+        return sorted(result)
+
+    def lookup(self, name, ratio):
+        """
+        The first contributor by pk with a high enough ratio, or else all
+        contributors with names that are part of `name`.
+
+        Returns a tuple of (pk or None, list of pks).
+        """
+        for pk in self.candidates(name):
+            if ratio(self.names[pk], name) >= self.minimum_ratio:
+                return pk, []
+        return None, self.substrings(name)
+
+
+def build_name_index():
+    name_index = NameIndex.build()
+    logger.debug('Built contributor name index of {} names'.format(
+        len(name_index)))
+    return name_index
+
+
+_cache = ProcessCache(
+    VERSION_KEY, build_name_index, check_interval=VERSION_CHECK_INTERVAL)
+
+
+def update_index(sender, instance, **kwargs):
+    """ Signal handler. Updates this process and invalidates the others. """
+    name_index = _cache.value
+    if name_index is not None:
+        if name_index.names.get(instance.pk) == instance.display_name:
+            # Only other fields were changed.
+            return
+        name_index.add(instance.pk, instance.display_name)
+    _cache.changed()
+
+
+def remove_from_index(sender, instance, **kwargs):
+    """ Signal handler. Updates this process and invalidates the others. """
+    name_index = _cache.value
+    if name_index is not None:
+        name_index.remove(instance.pk)
+    _cache.changed()
+
+
+def get_name_index():
+    """ The name index for this process, rebuilt if it's out of date. """
+    return _cache.get()
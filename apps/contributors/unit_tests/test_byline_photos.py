@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the byline photo index.
+"""
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from apps.contributors.byline_photos import BylinePhotoIndex
+
+PHOTOS = ['kari-nordmann.jpg', 'hansen-ola.jpg', 'Per-Berg.jpg', 'skip.png']
+
+
+class BylinePhotoIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for filename in PHOTOS:
+            open(os.path.join(self.folder, filename), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def test_find(self):
+        index = BylinePhotoIndex(self.folder)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.find('Kari Nordmann'),
+                         self.path('kari-nordmann.jpg'))
+        self.assertEqual(index.find('Ola Hansen'), self.path('hansen-ola.jpg'))
+        self.assertEqual(index.find('Per Berg'), self.path('Per-Berg.jpg'))
+        self.assertEqual(index.find('Kari Nordman'),
+                         self.path('kari-nordmann.jpg'))
+
+    def test_misses(self):
+        index = BylinePhotoIndex(self.folder)
+        self.assertIsNone(index.find('Skip'))
+        self.assertIn('Skip', index.misses)
+        self.assertTrue(index.is_current())
+        os.remove(self.path('hansen-ola.jpg'))
+        self.assertFalse(index.is_current())
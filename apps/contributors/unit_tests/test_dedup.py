@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of contributor deduplication.
+"""
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from apps.contributors.dedup import Deduplicator, blocking_keys, normalize
+from apps.contributors.models import Contributor, Position, Stint
+
+
+class BlockingKeysTest(SimpleTestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize('Kåre Nordmann (foto)'), 'kare nordmann')
+
+    def test_blocking_keys(self):
+        self.assertEqual(blocking_keys('kari nordmann'), {
+            ('k', 'nordmann'),
+            ('n', 'kari'),
+            ('kn', 'nord'),
+        })
+        # Reversed names share a key.
+        self.assertTrue(
+            blocking_keys('kari nordmann') & blocking_keys('nordmann kari'))
+        self.assertEqual(blocking_keys('kari'), set())
+
+
+# Contributor signals update the name index version in the cache.
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DeduplicatorTest(TestCase):
+
+    def contributor(self, display_name, **kwargs):
+        return Contributor.objects.create(display_name=display_name, **kwargs)
+
+    def clusters(self):
+        return [
+            (cluster.primary.pk, [duplicate.pk for duplicate in cluster.duplicates])
+            for cluster in Deduplicator().find_clusters()]
+
+    def test_find_clusters(self):
+        kari = self.contributor('Kari Nordmann', verified=True)
+        typo = self.contributor('Kari Nordman')
+        self.contributor('Per Hansen')
+        self.assertEqual(self.clusters(), [(kari.pk, [typo.pk])])
+
+    def test_no_chaining(self):
+        # Each name is similar to the next, but the first and last are not.
+        first = self.contributor('Kari Nordmannsen')
+        middle = self.contributor('Kari Nordmanns')
+        self.contributor('Kari Nordman')
+        self.assertEqual(self.clusters(), [(first.pk, [middle.pk])])
+
+    def test_verified_contributors_are_not_merged(self):
+        self.contributor('Ola Hansen', verified=True)
+        self.contributor('Ole Hansen', verified=True)
+        self.assertEqual(self.clusters(), [])
+
+    def test_merge(self):
+        kari = self.contributor('Kari Nordmann', verified=True)
+        typo = self.contributor(
+            'Kari Nordman', aliases='K. Nordman', email='kari@example.com')
+        stint = Stint.objects.create(
+            position=Position.objects.create(title='Journalist'),
+            contributor=typo)
+        deduplicator = Deduplicator()
+        self.assertEqual(deduplicator.merge(deduplicator.find_clusters()), 1)
+        # Foreign keys are moved to the primary contributor.
+        self.assertEqual(Stint.objects.get(pk=stint.pk).contributor_id, kari.pk)
+        kari = Contributor.objects.get(pk=kari.pk)
+        self.assertEqual(kari.aliases.splitlines(), ['Kari Nordman', 'K. Nordman'])
+        self.assertEqual(kari.email, 'kari@example.com')
+        self.assertFalse(Contributor.objects.filter(pk=typo.pk).exists())
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the contributor name index.
+"""
+import random
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from fuzzywuzzy import fuzz
+from apps.contributors.name_index import NameIndex, MINIMUM_RATIO
+from utils.process_cache import ProcessCache
+
+NAMES = [
+    (1, 'Kari Nordmann'),
+    (2, 'Ola Nordmann'),
+    (3, 'Per'),
+    (4, ''),
+    (5, 'Ås'),
+    (6, 'Ingrid Marie Haugen'),
+]
+
+
+def full_scan(names, full_name):
+    candidates = []
+    for pk, name in names:
+        if fuzz.ratio(name, full_name) >= MINIMUM_RATIO:
+            return pk, []
+        if name in full_name:
+            candidates.append(pk)
+    return None, candidates
+
+
+class NameIndexTest(SimpleTestCase):
+
+    def test_lookup(self):
+        index = NameIndex(NAMES)
+        self.assertEqual(index.lookup('Kari Nordman', fuzz.ratio), (1, []))
+        self.assertEqual(index.lookup('Per Ås', fuzz.ratio), (None, [3, 4, 5]))
+
+    def test_add_and_remove(self):
+        index = NameIndex(NAMES)
+        index.add(1, 'Kåre Nilsen')
+        index.remove(2)
+        self.assertEqual(index.lookup('Ola Nordmann', fuzz.ratio), (None, [4]))
+        self.assertEqual(index.lookup('Kåre Nilsen', fuzz.ratio), (1, []))
+
+    def test_same_as_full_scan(self):
+        randomizer = random.Random(1)
+        alphabet = 'aeionrsk Å'
+        names = [
+            (pk, ''.join(randomizer.choice(alphabet)
+                         for _ in range(randomizer.randint(0, 12))))
+            for pk in range(1, 500)]
+        index = NameIndex(names)
+        for pk, name in names[:100]:
+            query = name[1:] + randomizer.choice(alphabet)
+            self.assertEqual(
+                index.lookup(query, fuzz.ratio), full_scan(names, query))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProcessCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return NameIndex(NAMES)
+
+    def process(self):
+        # Checks the shared version on every call.
+        return ProcessCache('test.name_index_version', self.build,
+                            check_interval=-1)
+
+    def test_changed_in_place(self):
+        this, other = self.process(), self.process()
+        name_index = this.get()
+        other.get()
+        name_index.add(7, 'Kåre Nilsen')
+        this.changed()
+        self.assertIs(this.get(), name_index)
+        # Other processes rebuild the index.
+        other.get()
+        self.assertEqual(self.builds, 3)
+
+    def test_changed_by_other_process_meanwhile(self):
+        this, other = self.process(), self.process()
+        this.get()
+        other.get()
+        other.changed()
+        # This process can't keep its index, since it lacks the other change.
+        this.changed()
+        self.assertIsNone(this.value)
+        self.assertIsNotNone(other.value)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Autocomplete lookups for the admin menu.
+
+On PostgreSQL all models are searched with a single UNION ALL query per
+keystroke. The trigram indexes created by the core migration let the
+database answer the `UPPER(field) LIKE UPPER('%q%')` conditions without
+scanning the tables. Other databases use an in-memory prefix index of the
+words in each field, which is rebuilt when it gets old.
+"""
+import re
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+
+from apps.stories.models import Story
+from apps.contributors.models import Contributor
+from apps.photo.models import ImageFile
+
+RE_WORD = re.compile(r'\w+')
+
+
+def words(text):
+    """ Lowercase words in a text. """
+    return RE_WORD.findall(text.lower())
+
+
+class AutocompleteSource:
+
+    """ A model field to search, with the number of hits to return. """
+
+    def __init__(self, model, field, limit):
+        self.model = model
+        self.field = field
+        self.limit = limit
+        self.name = model.__name__
+        self.change = 'admin:{app}_{object}_change'.format(
+            app=model._meta.app_label,
+            object=model._meta.model_name,
+        )
+
+    def format_label(self, value):
+        """ Label of a hit. File fields show the file name only. """
+        if self.model is ImageFile:
+            return value.rpartition('/')[-1]
+        return value
+
+
+SOURCES = [
+    AutocompleteSource(Story, 'title', 10),
+    AutocompleteSource(Contributor, 'display_name', 6),
+    AutocompleteSource(ImageFile, 'source_file', 6),
+]
+
+
+class Hit:
+
+    """ Primary key and label of a matching object. """
+
+    def __init__(self, pk, label):
+        self.pk = pk
+        self.label = label
+
+    def __str__(self):
+        return self.label
+
+
+def combined_query(query, sources):
+    """ Search all sources with one UNION ALL query, newest first. """
+    quote = connection.ops.quote_name
+    pattern = '%{}%'.format(connection.ops.prep_for_like_query(query))
+    parts, params = [], []
+    for index, source in enumerate(sources):
+        opts = source.model._meta
+        parts.append(
+            '(SELECT %s, {pk}, {column} FROM {table} '
+            'WHERE UPPER({column}::text) LIKE UPPER(%s) '
+            'ORDER BY {pk} DESC LIMIT %s)'.format(
+                pk=quote(opts.pk.column),
+                column=quote(opts.get_field(source.field).column),
+                table=quote(opts.db_table),
+            ))
+        params += [index, pattern, source.limit]
+    cursor = connection.cursor()
+    try:
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    hits = [[] for source in sources]
+    for index, pk, value in rows:
+        hits[index].append(Hit(pk, sources[index].format_label(value)))
+    return hits
+
+
+class PrefixIndex:
+
+    """
+    In-memory index of the words in each source field.
+
+    Words are kept in one sorted list, so all words starting with a prefix
+    are found by bisection. Parallel arrays hold the source and primary key
+    of each word.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources
+        self.labels = {}
+        entries = []
+        for index, source in enumerate(sources):
+            values = source.model.objects.values_list('pk', source.field)
+            for pk, value in values.iterator():
+                if not value:
+                    continue
+                label = source.format_label(value)
+                self.labels[index, pk] = label
+                for word in set(words(label)):
+                    entries.append((word, index, pk))
+        entries.sort()
+        self.words = [entry[0] for entry in entries]
+        self.source_indexes = array('B', (entry[1] for entry in entries))
+        self.pks = array('L', (entry[2] for entry in entries))
+        self.created = time.time()
+
+    def search(self, query):
+        """ Objects with a word starting with each of the query words. """
+        query_words = sorted(set(words(query)), key=len, reverse=True)
+        hits = [[] for source in self.sources]
+        if not query_words:
+            return hits
+        first, rest = query_words[0], query_words[1:]
+        candidates = set()
+        position = bisect_left(self.words, first)
+        while (position < len(self.words) and
+               self.words[position].startswith(first)):
+            candidates.add(
+                (self.source_indexes[position], self.pks[position]))
+            position += 1
+        matches = {}
+        for index, pk in candidates:
+            label_words = words(self.labels[index, pk])
+            if all(any(word.startswith(prefix) for word in label_words)
+                   for prefix in rest):
+                matches.setdefault(index, []).append(pk)
+        for index, pks in matches.items():
+            pks.sort(reverse=True)
+            hits[index] = [
+                Hit(pk, self.labels[index, pk])
+                for pk in pks[:self.sources[index].limit]]
+        return hits
+
+
+_prefix_index = None
+
+
+def get_prefix_index(sources):
+    """ Cached prefix index, rebuilt after AUTOCOMPLETE_INDEX_MAX_AGE seconds. """
+    global _prefix_index
+    max_age = getattr(settings, 'AUTOCOMPLETE_INDEX_MAX_AGE', 300)
+    if (_prefix_index is None or _prefix_index.sources is not sources or
+            time.time() - _prefix_index.created > max_age):
+        _prefix_index = PrefixIndex(sources)
+    return _prefix_index
+
+
+def autocomplete(query, sources=SOURCES):
+    """ Returns a list of hits for each source. """
+    query = query.strip()
+    if not query:
+        return [[] for source in sources]
+    if connection.vendor == 'postgresql':
+        return combined_query(query, sources)
+    return get_prefix_index(sources).search(query)
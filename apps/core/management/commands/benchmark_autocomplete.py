@@ -0,0 +1,84 @@
+from optparse import make_option
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.autocomplete_index import autocomplete, SOURCES
+
+
+def icontains_lookup(query):
+    """ The previous implementation: one icontains query per model. """
+    return [
+        list(source.model.objects.filter(
+            **{source.field + '__icontains': query})[:source.limit])
+        for source in SOURCES
+    ]
+
+
+def sample_queries(number, seed):
+    """ Substrings of existing titles and names, like partly typed words. """
+    randomizer = random.Random(seed)
+    values = []
+    for source in SOURCES:
+        labels = [
+            source.format_label(value) for value in
+            source.model.objects.values_list(source.field, flat=True)
+            if value]
+        values += randomizer.sample(labels, min(len(labels), number))
+    queries = []
+    for value in randomizer.sample(values, min(len(values), number)):
+        length = randomizer.randint(2, 6)
+        start = randomizer.randint(0, max(0, len(value) - length))
+        queries.append(value[start:start + length])
+    return queries
+
+
+def timings(function, queries):
+    result = []
+    for query in queries:
+        start = time.time()
+        function(query)
+        result.append(1000 * (time.time() - start))
+    return sorted(result)
+
+
+class Command(BaseCommand):
+    help = 'Compares the autocomplete index to icontains queries.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--number', '-n',
+            type='int',
+            dest='number',
+            default=200,
+            help='Number of queries.'
+        ),
+        make_option(
+            '--seed',
+            type='int',
+            dest='seed',
+            default=1,
+            help='Random seed for the sample queries.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        queries = sample_queries(options['number'], options['seed'])
+        if not queries:
+            self.stdout.write('Nothing to search for.')
+            return
+        # Build the prefix index, if it's used, before timing.
+        autocomplete('warmup')
+        for name, function in [
+                ('icontains', icontains_lookup),
+                ('index', autocomplete)]:
+            result = timings(function, queries)
+            self.stdout.write(
+                '{:<10} queries: {}  mean: {:.1f} ms  '
+                'median: {:.1f} ms  p95: {:.1f} ms'.format(
+                    name,
+                    len(result),
+                    sum(result) / len(result),
+                    result[len(result) // 2],
+                    result[int(len(result) * .95)],
+                ))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+# Trigram indexes for case insensitive substring searches (icontains) in the
+# admin autocomplete. Only PostgreSQL with the pg_trgm extension supports them.
+INDEXES = [
+    ('stories_story', 'title'),
+    ('stories_story', 'lede'),
+    ('contributors_contributor', 'display_name'),
+    ('photo_imagefile', 'source_file'),
+]
+
+
+def index_name(table, column):
+    return '{}_{}_upper_trgm'.format(table, column)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in INDEXES:
+        schema_editor.execute(
+            'CREATE INDEX {name} ON {table} '
+            'USING gin (UPPER({column}::text) gin_trgm_ops)'.format(
+                name=index_name(table, column),
+                table=table,
+                column=column,
+            ))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS {name}'.format(
+            name=index_name(table, column)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0016_relatedstory'),
+        ('contributors', '0008_auto_20150513_0006'),
+        ('photo', '0002_auto_20150512_1301'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
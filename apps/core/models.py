@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+# The core app has no models. This module makes Django load the migrations
+# in apps/core/migrations, which create the autocomplete indexes.
@@ -22,7 +22,8 @@ def universitas_menu(active_section):
         ]
     ]
 
-    latest_pdf = PrintIssue.objects.exclude(pdf=None).order_by(
+    latest_pdf = PrintIssue.objects.filter(
+        rendition_status=PrintIssue.RENDITION_READY).order_by(
         'issue__publication_date', 'pk').last()
 
     context = {
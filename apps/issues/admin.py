@@ -18,6 +18,8 @@ class ThumbAdmin:
         """ Show thumbnail of pdf frontpage """
         try:
             source = instance.get_thumbnail()
+            if source is None:
+                raise FileNotFoundError  # noqa
             thumb = get_thumbnail(source, '%sx%s' % (width, height))
             url = thumb.url
         except FileNotFoundError:  # noqa
@@ -46,6 +48,8 @@ class IssueAdmin(admin.ModelAdmin):
     def pdf_thumb(self, pdf, width=250, height=100):
         try:
             source = pdf.get_thumbnail()
+            if source is None:
+                raise FileNotFoundError  # noqa
             thumb = get_thumbnail(
                 source,
                 '%sx%s' % (width, height),
@@ -95,6 +99,7 @@ class PrintIssueAdmin(AdminImageMixin, admin.ModelAdmin, ThumbAdmin):
         'pages',
         'pdf',
         'thumbnail',
+        'rendition_status',
         'text',
         'issue'
     )
@@ -104,10 +109,10 @@ class PrintIssueAdmin(AdminImageMixin, admin.ModelAdmin, ThumbAdmin):
     )
     fieldsets = (
         ('', {'fields': (
-            ('pdf', 'pages', 'issue', ),
+            ('pdf', 'pages', 'rendition_status', 'issue', ),
             ('large_thumbnail', 'text')
         ), }, ),
     )
     readonly_fields = (
-        'large_thumbnail', 'text', 'pages',
+        'large_thumbnail', 'text', 'pages', 'rendition_status',
     )
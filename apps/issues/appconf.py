@@ -1,6 +1,16 @@
+import watson
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 
 class IssuesAppConfig(AppConfig):
     name = 'apps.issues'
-    verbose_name = _('Issues')
\ No newline at end of file
+    verbose_name = _('Issues')
+    def ready(self):
+        from .search_adapters import PrintPageSearchAdapter
+        from .issue_calendar import invalidate_calendar
+        PrintPage = self.get_model('PrintPage')
+        watson.register(PrintPage, PrintPageSearchAdapter)
+        Issue = self.get_model('Issue')
+        post_save.connect(invalidate_calendar, sender=Issue)
+        post_delete.connect(invalidate_calendar, sender=Issue)
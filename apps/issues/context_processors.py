@@ -1,12 +1,12 @@
 """ Issues context processor """
-from .models import Issue
+from .issue_calendar import get_calendar
 
 def issues(request):
+    calendar = get_calendar()
     context = {
         'issues': {
-            'latest': Issue.objects.latest_issue(),
-            'next': Issue.objects.next_issue(),
+            'latest': calendar.latest_issue,
+            'next': calendar.next_issue,
         }
     }
     return context
-
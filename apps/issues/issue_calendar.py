@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory calendar of print issues.
+
+All issues are loaded with a single query, and numbered by publication date
+within each year. Each process keeps its calendar until an issue is changed,
+or until the next publication date, when the latest and next issue change.
+"""
+import datetime
+import time
+from bisect import bisect_right
+
+from django.core.cache import cache
+from django.utils import timezone
+
+import logging
+logger = logging.getLogger('universitas')
+
+# The cache key for the calendar version, shared by all processes.
+VERSION_KEY = 'issues.calendar_version'
+# Seconds between checks of the shared calendar version.
+VERSION_CHECK_INTERVAL = 5
+
+
+def today():
+    return timezone.localtime(timezone.now()).date()
+
+
+class IssueCalendar:
+
+    """ Issue numbers, and the latest and next issue at a point in time. """
+
+    def __init__(self, version=None, date=None):
+        from .models import Issue
+        self.version = version
+        self.date = date or today()
+        issues = list(Issue.objects.exclude(
+            publication_date=None).order_by('publication_date', 'pk'))
+        self.numbers = {}
+        year, number = None, 0
+        for issue in issues:
+            if issue.publication_date.year != year:
+                year, number = issue.publication_date.year, 0
+            number += 1
+            self.numbers[issue.pk] = number
+        # Issues published today are the latest issue.
+        dates = [issue.publication_date for issue in issues]
+        index = bisect_right(dates, self.date)
+        self.latest_issue = issues[index - 1] if index else None
+        self.next_issue = issues[index] if index < len(issues) else None
+        if self.next_issue:
+            # Start of the day of the next publication.
+            self.valid_until = self.next_issue.publication_date
+        else:
+            self.valid_until = self.date + datetime.timedelta(days=1)
+
+    def number(self, issue):
+        """ Number of an issue within its year, or None if it's unknown. """
+        return self.numbers.get(issue.pk)
+
+    def current_issue(self):
+        """ The issue published today, or else the next issue. """
+        latest_issue = self.latest_issue
+        if latest_issue and latest_issue.publication_date == self.date:
+            return latest_issue
+        return self.next_issue
+
+    def is_current(self, date=None):
+        return (date or today()) < self.valid_until
+
+
+_calendar = None
+_version_checked = 0
+
+
+def get_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def invalidate_calendar(**kwargs):
+    """ Signal handler. Makes all processes rebuild their calendar. """
+    global _calendar
+    _calendar = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_calendar():
+    """ The calendar for this process, rebuilt if it's out of date. """
+    global _calendar, _version_checked
+    now = time.time()
+    if _calendar is not None and now - _version_checked > VERSION_CHECK_INTERVAL:
+        _version_checked = now
+        if get_version() != _calendar.version:
+            _calendar = None
+    if _calendar is None or not _calendar.is_current():
+        _version_checked = now
+        _calendar = IssueCalendar(version=get_version())
+        logger.debug('Built issue calendar of {} issues'.format(
+            len(_calendar.numbers)))
+    return _calendar
@@ -0,0 +1,39 @@
+"""
+Extract page text from print issue pdfs.
+"""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from apps.issues.models import PrintIssue
+from apps.issues.page_text import extract_changed
+
+import logging
+logger = logging.getLogger('universitas')
+
+
+class Command(BaseCommand):
+    help = 'Extract and index the text of each page in new or changed pdfs.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--workers', '-w',
+            type='int',
+            dest='workers',
+            default=None,
+            help='Number of worker processes. Defaults to number of cpus.'
+        ),
+        make_option(
+            '--all', '-a',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Extract all pdfs again, even if they have not changed.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            PrintIssue.objects.update(text_mtime=None)
+        pages = extract_changed(workers=options['workers'])
+        self.stdout.write('Extracted text of {} pages'.format(pages))
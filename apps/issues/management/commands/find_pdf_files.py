@@ -25,6 +25,13 @@ class Command(BaseCommand):
             default=False,
             help='Replace existing content from previous imports.'
         ),
+        make_option(
+            '--render', '-r',
+            action='store_true',
+            dest='render',
+            default=False,
+            help='Render covers and page thumbnails of new files.'
+        ),
     )
 
     def handle(self, *args, **options):
@@ -34,6 +41,13 @@ class Command(BaseCommand):
 
         self.import_issues_from_file_system()
 
+        from apps.issues.page_text import extract_changed
+        pages = extract_changed()
+        self.stdout.write('Extracted text of {} pages'.format(pages))
+        if options['render']:
+            from apps.issues.renditions import render_pending
+            results = render_pending()
+            self.stdout.write('Rendered {} pdf files'.format(len(results)))
 
 
     def import_issues_from_file_system(self):
@@ -55,7 +69,6 @@ class Command(BaseCommand):
                     name = os.path.basename(path)
 
                 issue.issue_name = name
-                issue.get_thumbnail()
 
                 logger.info(
                     'new pdf found {name} {filename}'.format(
@@ -0,0 +1,67 @@
+"""
+Render covers and page thumbnails of print issues.
+"""
+
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.issues.renditions import render_pending
+
+import logging
+logger = logging.getLogger('universitas')
+
+
+class Command(BaseCommand):
+    help = ('Render page counts, covers, page thumbnails and page pdfs of '
+            'pending pdfs.')
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--workers', '-w',
+            type='int',
+            dest='workers',
+            default=None,
+            help='Number of worker processes. Defaults to number of cpus.'
+        ),
+        make_option(
+            '--retry-failed',
+            action='store_true',
+            dest='retry failed',
+            default=False,
+            help='Also try pdfs that could not be rendered before.'
+        ),
+        make_option(
+            '--all', '-a',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Render all pdfs again, even if the files are up to date.'
+        ),
+        make_option(
+            '--interval', '-i',
+            type='int',
+            dest='interval',
+            default=0,
+            help='Keep running, looking for pending pdfs every N seconds.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        while True:
+            results = render_pending(
+                workers=options['workers'],
+                retry_failed=options['retry failed'],
+                force=options['all'],
+            )
+            failed = [result for result in results if result.error]
+            if results:
+                self.stdout.write('Rendered {} pdfs, {} failed'.format(
+                    len(results) - len(failed), len(failed)))
+            if not options['interval']:
+                break
+            options['all'] = False
+            # Don't keep a connection open while sleeping.
+            connection.close()
+            time.sleep(options['interval'])
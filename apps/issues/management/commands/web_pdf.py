@@ -7,16 +7,22 @@ from django.core.management.base import BaseCommand  # ,CommandError
 from django.conf import settings
 
 import os
+import time
 from datetime import datetime
 import subprocess
 # import re
 from glob import glob
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from PyPDF2 import PdfFileMerger
 from apps.issues.models import PrintIssue, current_issue
 
 import logging
 logger = logging.getLogger('universitas')
 
 PDF_STAGING = os.path.join(settings.MEDIA_ROOT, 'STAGING', 'PDF')
+# Staged pages after conversion to rgb and downsampling.
+PDF_CONVERTED = os.path.join(PDF_STAGING, 'web')
 PDF_FOLDER = os.path.join(settings.MEDIA_ROOT, 'pdf')
 
 PDF_MERGE = os.path.join(settings.BASE_DIR, 'bin', 'pdf_merge.sh')
@@ -34,6 +40,20 @@ class Command(BaseCommand):
             default=False,
             help='Replace existing content from previous imports.'
         ),
+        make_option(
+            '--reuse', '-r',
+            action='store_true',
+            dest='reuse',
+            default=False,
+            help='Only convert pages that have changed since the last run.'
+        ),
+        make_option(
+            '--workers', '-w',
+            type='int',
+            dest='workers',
+            default=None,
+            help='Number of pages to convert at once. Defaults to number of cpus.'
+        ),
     )
 
     def get_staging_pdf_files(self, magazine='1'):
@@ -52,10 +72,81 @@ class Command(BaseCommand):
                 new_files.append(pdf_file)
         return sorted(new_files)
 
+    def convert_page(self, pdf_file):
+        """
+        Convert a single staged page with ghostscript. Returns the path of the
+        converted page, or None if the conversion failed.
+        """
+        converted = os.path.join(PDF_CONVERTED, os.path.basename(pdf_file))
+        if self.reuse and os.path.isfile(converted) and (
+                os.path.getmtime(converted) >= os.path.getmtime(pdf_file)):
+            return converted, False
+        # Ghostscript writes to a temporary file, so a failed conversion
+        # never replaces a good page or gets reused later.
+        temp_path = converted + '.tmp'
+        args = [PDF_MERGE, temp_path, pdf_file]
+        logger.debug(' '.join(args))
+        returncode = subprocess.call(args)
+        if returncode != 0 or not os.path.isfile(temp_path):
+            logger.error('Could not convert {} (exit status {})'.format(
+                pdf_file, returncode))
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            return None, False
+        os.replace(temp_path, converted)
+        return converted, True
+
+    def convert_pages(self, files):
+        """
+        Convert staged pages in parallel. Ghostscript runs in subprocesses.
+        Returns the converted pages, the number of new conversions and the
+        staged pages that could not be converted.
+        """
+        os.makedirs(PDF_CONVERTED, exist_ok=True)
+        with ThreadPool(self.workers or cpu_count()) as pool:
+            results = pool.map(self.convert_page, files)
+        converted = [path for path, new in results]
+        count = sum(1 for path, new in results if new)
+        failed = [
+            pdf_file for pdf_file, (path, new) in zip(files, results)
+            if path is None]
+        return converted, count, failed
+
+    def remove_old_conversions(self):
+        """ Remove converted pages when the staged page is gone. """
+        for converted in glob(os.path.join(PDF_CONVERTED, '*.pdf')):
+            if not os.path.isfile(
+                    os.path.join(PDF_STAGING, os.path.basename(converted))):
+                os.remove(converted)
+
+    def concatenate(self, files, pdf_path):
+        """ Join converted pages without processing them again. """
+        merger = PdfFileMerger(strict=False)
+        for pdf_file in files:
+            merger.append(pdf_file)
+        temp_path = pdf_path + '.tmp'
+        with open(temp_path, 'wb') as output:
+            merger.write(output)
+        merger.close()
+        # Replace the web pdf in a single step.
+        os.replace(temp_path, pdf_path)
+
+    def report(self, stage, started, **kwargs):
+        msg = '{stage}: {seconds:.1f} s {details}'.format(
+            stage=stage,
+            seconds=time.time() - started,
+            details=' '.join('{}={}'.format(*item) for item in kwargs.items()),
+        )
+        logger.info(msg)
+        self.stdout.write(msg)
+
     def handle(self, *args, **options):
 
         """ Finds pdf files on disks and creates PrintIssue objects. """
 
+        self.reuse = options['reuse']
+        self.workers = options['workers']
+
         for code, suffix in (1, ''), (2, '_mag'):
             year, number = current_issue()
             filename = FILENAME_PATTERN.format(
@@ -79,12 +170,30 @@ class Command(BaseCommand):
 
             pdf_path = os.path.join(PDF_FOLDER, filename)
 
-            args = [PDF_MERGE, pdf_path] + files
-            msg = '\n'.join(args)
-            logger.debug(msg)
-            subprocess.call(args)
+            started = time.time()
+            converted, count, failed = self.convert_pages(files)
+            self.report('convert', started, pages=len(files), converted=count)
+            if failed:
+                # Don't publish an issue with missing or broken pages.
+                msg = 'Could not convert {} pages, {}: {}'.format(
+                    len(failed), code, ', '.join(
+                        os.path.basename(pdf_file) for pdf_file in failed))
+                logger.error(msg)
+                self.stdout.write(msg)
+                continue
+
+            started = time.time()
+            self.concatenate(converted, pdf_path)
+            self.report('concatenate', started, file=filename)
 
             issue, new = PrintIssue.objects.get_or_create(pdf='pdf/' + filename)
+            if not new:
+                # The file has changed. Make new renditions in the background.
+                PrintIssue.objects.filter(pk=issue.pk).update(
+                    rendition_status=PrintIssue.RENDITION_PENDING,
+                    pages_rendered=False)
             if new:
                 name = '{number}/{year}{suffix}'.format(**locals())
                 issue.issue_name = name
+
+        self.remove_old_conversions()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+READY = 2
+
+
+def mark_rendered_issues_ready(apps, schema_editor):
+    """ Issues with a cover were rendered before the rendition pipeline. """
+
+    PrintIssue = apps.get_model('issues', 'PrintIssue')
+    PrintIssue.objects.exclude(pdf='').exclude(pdf=None).exclude(
+        cover_page='').exclude(cover_page=None).update(
+        rendition_status=READY)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0007_auto_20150421_1938'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printissue',
+            name='rendition_status',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, choices=[(1, 'Pending'), (2, 'Ready'), (3, 'Failed')], help_text='Cover and page thumbnails are made in the background.'),
+            preserve_default=True,
+        ),
+        migrations.AlterField(
+            model_name='printissue',
+            name='pages',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of pages'),
+        ),
+        migrations.RunPython(
+            mark_rendered_issues_ready,
+            reverse_code=noop,
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0008_printissue_rendition_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrintPage',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('page_number', models.PositiveSmallIntegerField()),
+                ('text', models.TextField(blank=True, editable=False, help_text='Extracted from file.')),
+                ('print_issue', models.ForeignKey(related_name='print_pages', to='issues.PrintIssue')),
+            ],
+            options={
+                'verbose_name': 'Print page',
+                'verbose_name_plural': 'Print pages',
+                'ordering': ['print_issue', 'page_number'],
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='printpage',
+            unique_together=set([('print_issue', 'page_number')]),
+        ),
+        migrations.AddField(
+            model_name='printissue',
+            name='text_mtime',
+            field=models.FloatField(blank=True, null=True, editable=False, help_text='Modification time of the pdf when the page text was extracted.'),
+            preserve_default=True,
+        ),
+    ]
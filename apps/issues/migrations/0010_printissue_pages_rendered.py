@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0009_printpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printissue',
+            name='pages_rendered',
+            field=models.BooleanField(default=False, editable=False, help_text='Page thumbnails and single page pdfs have been made.'),
+            preserve_default=True,
+        ),
+    ]
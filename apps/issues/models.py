@@ -12,13 +12,12 @@ from django.utils.translation import ugettext_lazy as _
 from django.db import models
 from django.db.models.signals import pre_delete
 from django.dispatch.dispatcher import receiver
+from django.core.urlresolvers import reverse
 # from django.utils.text import slugify
 
 # Installed apps
 from PyPDF2 import PdfFileReader
 from sorl.thumbnail import ImageField
-from wand.image import Image as WandImage
-from wand.color import Color
 import os.path
 # Project apps
 
@@ -27,13 +26,8 @@ from utils.model_mixins import Edit_url_mixin
 
 def current_issue():
     """ Return a tuple of year and number for the current issue. """
-    today = timezone.now().astimezone().date()
-    latest_issue = Issue.objects.latest_issue()
-    if latest_issue.publication_date == today:
-        current_issue = latest_issue
-    else:
-        current_issue = Issue.objects.next_issue()
-
+    from .issue_calendar import get_calendar
+    current_issue = get_calendar().current_issue()
     return (current_issue.year, current_issue.number)
 
 
@@ -86,15 +80,18 @@ class Issue(models.Model, Edit_url_mixin):
 
     @property
     def number(self):
-
-        issue_list = Issue.objects.filter(
-            publication_date__year=self.year
-        ).order_by('publication_date').values_list(
-            'id',
-            flat=True,
-        )
-
-        return list(issue_list).index(self.id) + 1
+        from .issue_calendar import get_calendar
+        number = get_calendar().number(self)
+        if number is None:
+            # Not in the calendar yet.
+            issue_list = Issue.objects.filter(
+                publication_date__year=self.year
+            ).order_by('publication_date', 'id').values_list(
+                'id',
+                flat=True,
+            )
+            number = list(issue_list).index(self.id) + 1
+        return number
 
     @property
     def advert_deadline(self):
@@ -135,10 +132,36 @@ class PrintIssue(models.Model, Edit_url_mixin):
 
     # publication_date = models.DateField(blank=True, null=True)
 
+    RENDITION_PENDING = 1
+    RENDITION_READY = 2
+    RENDITION_FAILED = 3
+    # Keyed by pk, since pdfs in different folders can have the same name.
+    PAGE_THUMBNAIL_NAME = 'pdf/thumbs/{pk}-s{page:02d}.jpg'
+    PAGE_PDF_NAME = 'pdf/pages/{pk}-s{page:02d}.pdf'
+    RENDITION_CHOICES = [
+        (RENDITION_PENDING, _('Pending')),
+        (RENDITION_READY, _('Ready')),
+        (RENDITION_FAILED, _('Failed')),
+    ]
+
     pages = models.IntegerField(
         help_text='Number of pages',
+        default=0,
         editable=False,)
 
+    rendition_status = models.PositiveSmallIntegerField(
+        help_text=_('Cover and page thumbnails are made in the background.'),
+        choices=RENDITION_CHOICES,
+        default=RENDITION_PENDING,
+        editable=False,
+    )
+
+    pages_rendered = models.BooleanField(
+        help_text=_('Page thumbnails and single page pdfs have been made.'),
+        default=False,
+        editable=False,
+    )
+
     pdf = models.FileField(
         help_text=_('Pdf file for this issue.'),
         upload_to='pdf/',
@@ -157,6 +180,13 @@ class PrintIssue(models.Model, Edit_url_mixin):
         editable=False,
     )
 
+    text_mtime = models.FloatField(
+        help_text=_('Modification time of the pdf when the page text was '
+                    'extracted.'),
+        blank=True, null=True,
+        editable=False,
+    )
+
     def __str__(self):
         return self.pdf.url
 
@@ -166,10 +196,11 @@ class PrintIssue(models.Model, Edit_url_mixin):
         else:
             old_self = PrintIssue()
         if self.pdf and old_self.pdf != self.pdf:
-            reader = PdfFileReader(self.pdf)
-            self.pages = reader.numPages
-            self.text = reader.getPage(0).extractText()[:200]
-            self.cover_page.delete()
+            # Page count, cover and thumbnails are made by the rendition
+            # pipeline. See apps.issues.renditions.
+            self.rendition_status = self.RENDITION_PENDING
+            self.pages_rendered = False
+            self.cover_page.delete(save=False)
         if not self.pdf and self.cover_page:
             self.cover_page.delete()
         if self.pdf and not self.issue:
@@ -182,35 +213,53 @@ class PrintIssue(models.Model, Edit_url_mixin):
 
     def create_thumbnail(self):
         """ Create a jpg version of the pdf frontpage """
-        pdf_name = self.pdf.path
-        cover_page = pdf_name.replace(
-            '.pdf', '.jpg').replace(
-            'pdf/', 'pdf/covers/')
-        img = WandImage(filename=pdf_name + '[0]', resolution=60)
-        bg = WandImage(
-            width=img.width,
-            height=img.height,
-            background=Color('white'))
-        bg.composite(img, 0, 0)
-        bg.save(filename=cover_page)
-        self.cover_page = cover_page
-        self.save()
+        from .renditions import render_issue
+        render_issue(self)
 
     def get_thumbnail(self):
-        """ Get or create a jpg version of the pdf frontpage """
-        pdf = self.pdf
-        cover = self.cover_page
-        if not pdf:
-            return None
-        if cover and os.path.isfile(cover.path):
-            # There is a cover thumb
-            timestamp = os.path.getmtime
-            if timestamp(cover.path) > timestamp(pdf.path):
-                # Pdf has not changed
-                return self.cover_page
-
-        self.create_thumbnail()
-        return self.cover_page
+        """ The jpg version of the pdf frontpage, if it has been made. """
+        # Changing the pdf deletes the cover, so any cover is up to date.
+        if self.pdf and self.cover_page:
+            return self.cover_page
+        return None
+
+    def pdf_stem(self):
+        """ File name of the pdf without folder and extension """
+        return os.path.splitext(os.path.basename(self.pdf.name))[0]
+
+    def page_thumbnail_name(self, page_number):
+        """ File name of the thumbnail of a page, relative to MEDIA_ROOT """
+        return self.PAGE_THUMBNAIL_NAME.format(
+            pk=self.pk, page=page_number)
+
+    def page_pdf_name(self, page_number):
+        """ File name of the single page pdf, relative to MEDIA_ROOT """
+        return self.PAGE_PDF_NAME.format(
+            pk=self.pk, page=page_number)
+
+    def is_ready(self):
+        """ True if the cover and page count have been made. """
+        return bool(self.pdf) and (
+            self.rendition_status == self.RENDITION_READY)
+
+    def has_pages(self):
+        """ True if the page thumbnails and page pdfs have been made. """
+        return self.is_ready() and self.pages_rendered
+
+    def page_url(self, page_number=1):
+        """ Url of the page viewer. """
+        return reverse('pdf_page', kwargs={
+            'pk': self.pk, 'page_number': page_number})
+
+    def page_thumbnails(self):
+        """ Urls of the page thumbnails, if they have been made. """
+        if not self.has_pages():
+            return []
+        storage = self.pdf.storage
+        return [
+            storage.url(self.page_thumbnail_name(page_number))
+            for page_number in range(1, self.pages + 1)
+        ]
 
     def extract_page_text(self, page_number):
         """ Extracts text from a page in the pdf """
@@ -242,10 +291,50 @@ class PrintIssue(models.Model, Edit_url_mixin):
 
     # @models.permalink
     def get_absolute_url(self):
+        if self.has_pages():
+            return self.page_url(1)
         return self.pdf.url
 
 
+class PrintPage(models.Model):
+
+    """ Text of a single page in a printed newspaper. """
+
+    class Meta:
+        verbose_name = _('Print page')
+        verbose_name_plural = _('Print pages')
+        ordering = ['print_issue', 'page_number']
+        unique_together = [('print_issue', 'page_number')]
+
+    print_issue = models.ForeignKey(
+        PrintIssue,
+        related_name='print_pages',
+    )
+
+    page_number = models.PositiveSmallIntegerField()
+
+    text = models.TextField(
+        help_text=_('Extracted from file.'),
+        blank=True,
+        editable=False,
+    )
+
+    def __str__(self):
+        return '{} s{}'.format(self.print_issue.pdf_stem(), self.page_number)
+
+    def get_absolute_url(self):
+        if self.print_issue.has_pages():
+            return self.print_issue.page_url(self.page_number)
+        # Pdf viewers open the page given in the fragment.
+        return '{}#page={}'.format(self.print_issue.pdf.url, self.page_number)
+
+
 @receiver(pre_delete, sender=PrintIssue)
 def delete_pdf_and_cover_page(sender, instance, **kwargs):
+    if instance.pdf:
+        storage = instance.pdf.storage
+        for page_number in range(1, instance.pages + 1):
+            storage.delete(instance.page_thumbnail_name(page_number))
+            storage.delete(instance.page_pdf_name(page_number))
     instance.cover_page.delete(False)
     instance.pdf.delete(False)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Page level text extraction from print issue pdfs.
+
+The text of every page is saved as a PrintPage, which is indexed by watson,
+so search results can link to a page in the printed newspaper. Pages are
+extracted in a pool of worker processes. The modification time of each pdf
+is saved when it has been extracted, so only new and changed files are
+processed when the job runs again.
+"""
+import os
+import re
+from multiprocessing import Pool, cpu_count
+
+from django.db import transaction
+from django.utils import timezone
+import watson
+
+from .models import PrintIssue, PrintPage
+
+import logging
+logger = logging.getLogger('universitas')
+
+RE_WHITESPACE = re.compile(r'\s+')
+
+
+class ExtractionResult:
+
+    """ Page texts of a pdf. Sent back from a worker process. """
+
+    def __init__(self, pk, mtime, texts=(), error=None):
+        self.pk = pk
+        self.mtime = mtime
+        self.texts = list(texts)
+        self.error = error
+
+
+def extract(task):
+    """ Extract text of all pages in a pdf. Runs in a worker process. """
+    from PyPDF2 import PdfFileReader
+    pk, pdf_path, mtime = task
+    try:
+        with open(pdf_path, 'rb') as pdf_file:
+            reader = PdfFileReader(pdf_file, strict=False)
+            texts = [
+                RE_WHITESPACE.sub(' ', reader.getPage(index).extractText())
+                .strip()
+                for index in range(reader.numPages)
+            ]
+    except Exception as error:
+        return ExtractionResult(pk, mtime, error='{}: {}'.format(
+            type(error).__name__, error))
+    return ExtractionResult(pk, mtime, texts)
+
+
+def changed_issues(queryset=None):
+    """ Tasks for print issues with pdfs changed since the last extraction. """
+    if queryset is None:
+        queryset = PrintIssue.objects.all()
+    storage = PrintIssue._meta.get_field('pdf').storage
+    rows = queryset.exclude(pdf='').exclude(pdf=None).values_list(
+        'pk', 'pdf', 'text_mtime')
+    tasks = []
+    for pk, name, text_mtime in rows:
+        path = storage.path(name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            logger.warning('Missing pdf file {}'.format(path))
+            continue
+        if mtime != text_mtime:
+            tasks.append((pk, path, mtime))
+    return tasks
+
+
+def save_pages(result):
+    """ Replace the pages of a print issue and update the search index. """
+    if result.error:
+        logger.warning('Could not extract text from print issue {}: {}'.format(
+            result.pk, result.error))
+        return 0
+    with transaction.atomic():
+        existing = dict(PrintPage.objects.filter(
+            print_issue_id=result.pk).values_list('page_number', 'text'))
+        new_pages = []
+        for page_number, text in enumerate(result.texts, 1):
+            if page_number not in existing:
+                new_pages.append(PrintPage(
+                    print_issue_id=result.pk,
+                    page_number=page_number,
+                    text=text,
+                ))
+            elif existing[page_number] != text:
+                PrintPage.objects.filter(
+                    print_issue_id=result.pk,
+                    page_number=page_number,
+                ).update(text=text)
+        PrintPage.objects.bulk_create(new_pages)
+        # Pages that are gone. Deleted one by one, so they leave the index.
+        PrintPage.objects.filter(
+            print_issue_id=result.pk,
+            page_number__gt=len(result.texts),
+        ).delete()
+        pages = PrintPage.objects.filter(
+            print_issue_id=result.pk).select_related('print_issue__issue')
+        watson.default_search_engine.update_obj_index_batch(PrintPage, pages)
+        PrintIssue.objects.filter(pk=result.pk).update(text_mtime=result.mtime)
+    return len(result.texts)
+
+
+def extract_changed(workers=None, queryset=None):
+    """ Extract pages of new and changed pdfs. Returns number of pages. """
+    tasks = changed_issues(queryset)
+    if not tasks:
+        return 0
+    workers = min(workers or cpu_count(), len(tasks))
+    started = timezone.now()
+    page_count = 0
+    if workers == 1:
+        for task in tasks:
+            page_count += save_pages(extract(task))
+    else:
+        with Pool(workers) as pool:
+            for result in pool.imap_unordered(extract, tasks):
+                page_count += save_pages(result)
+    logger.info('Extracted {} pages from {} pdfs with {} workers in {}'.format(
+        page_count, len(tasks), workers, timezone.now() - started))
+    return page_count
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Background rendition pipeline for print issue pdfs.
+
+Rasterising pdfs with ImageMagick is slow, so it's never done while serving a
+request. New and changed pdfs are marked as pending when saved, and the
+`render_pdfs` management command renders the page count, cover, page
+thumbnails and single page pdfs of all pending issues in a pool of worker
+processes. Ready issues without page thumbnails and page pdfs are rendered
+too, and stay in the archive meanwhile. The workers only read and write
+files, the database is updated by the parent process. Views only show
+artefacts that have been made, and link to the pdf file otherwise.
+"""
+import os
+from multiprocessing import Pool, cpu_count
+
+import watson
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PrintIssue, PrintPage
+
+import logging
+logger = logging.getLogger('universitas')
+
+# Resolution of the cover image in the archive.
+COVER_RESOLUTION = 60
+# Resolution and pixel width of the page thumbnails.
+THUMBNAIL_RESOLUTION = 160
+THUMBNAIL_WIDTH = 1000
+
+
+class RenditionTask:
+
+    """ Paths of a pdf and its artefacts. Sent to a worker process. """
+
+    def __init__(self, print_issue, force=False):
+        self.pk = print_issue.pk
+        self.pdf_path = print_issue.pdf.path
+        cover_name = print_issue.pdf.name.replace(
+            '.pdf', '.jpg').replace('pdf/', 'pdf/covers/', 1)
+        self.cover_name = cover_name
+        self.cover_path = os.path.join(settings.MEDIA_ROOT, cover_name)
+        self.force = force
+
+    def page_thumbnail_path(self, page_number):
+        return os.path.join(
+            settings.MEDIA_ROOT, PrintIssue.PAGE_THUMBNAIL_NAME.format(
+                pk=self.pk, page=page_number))
+
+    def page_pdf_path(self, page_number):
+        return os.path.join(
+            settings.MEDIA_ROOT, PrintIssue.PAGE_PDF_NAME.format(
+                pk=self.pk, page=page_number))
+
+    def is_fresh(self, path):
+        """ True if an artefact exists and is newer than the pdf. """
+        if self.force or not os.path.isfile(path):
+            return False
+        return os.path.getmtime(path) > os.path.getmtime(self.pdf_path)
+
+
+class RenditionResult:
+
+    """ Outcome of a task. Sent back to the parent process. """
+
+    def __init__(self, task, pages=0, text='', error=None):
+        self.pk = task.pk
+        self.cover_name = task.cover_name
+        self.pages = pages
+        self.text = text
+        self.error = error
+
+
+def rasterise(pdf_path, page_index, resolution, path, width=None):
+    """ Render a pdf page as a jpg with white background and srgb colors. """
+    from wand.image import Image as WandImage
+    from wand.color import Color
+    with WandImage(
+            filename='{}[{}]'.format(pdf_path, page_index),
+            resolution=resolution) as page:
+        if page.colorspace == 'cmyk':
+            page.transform_colorspace('srgb')
+        with WandImage(
+                width=page.width,
+                height=page.height,
+                background=Color('white')) as image:
+            image.composite(page, 0, 0)
+            if width and image.width > width:
+                image.transform(resize='{}x'.format(width))
+            image.format = 'jpeg'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            image.save(filename=path)
+
+
+def split_page(reader, page_index, path):
+    """ Save a single page of a pdf as a new pdf file. """
+    from PyPDF2 import PdfFileWriter
+    writer = PdfFileWriter()
+    writer.addPage(reader.getPage(page_index))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as page_file:
+        writer.write(page_file)
+
+
+def render(task):
+    """ Make all artefacts of one pdf. Runs in a worker process. """
+    from PyPDF2 import PdfFileReader
+    try:
+        with open(task.pdf_path, 'rb') as pdf_file:
+            reader = PdfFileReader(pdf_file, strict=False)
+            pages = reader.numPages
+            text = reader.getPage(0).extractText()[:200]
+            for page_number in range(1, pages + 1):
+                path = task.page_pdf_path(page_number)
+                if not task.is_fresh(path):
+                    split_page(reader, page_number - 1, path)
+        if not task.is_fresh(task.cover_path):
+            rasterise(task.pdf_path, 0, COVER_RESOLUTION, task.cover_path)
+        for page_number in range(1, pages + 1):
+            path = task.page_thumbnail_path(page_number)
+            if not task.is_fresh(path):
+                rasterise(
+                    task.pdf_path, page_number - 1, THUMBNAIL_RESOLUTION,
+                    path, width=THUMBNAIL_WIDTH)
+    except Exception as error:
+        return RenditionResult(task, error='{}: {}'.format(
+            type(error).__name__, error))
+    return RenditionResult(task, pages=pages, text=text)
+
+
+def reindex_pages(pk):
+    """ Update the search entries of the pages of a print issue. """
+    pages = PrintPage.objects.filter(
+        print_issue_id=pk).select_related('print_issue__issue')
+    with transaction.atomic():
+        watson.default_search_engine.update_obj_index_batch(PrintPage, pages)
+
+
+def save_result(result):
+    """ Update the print issue with the outcome of a task. """
+    issues = PrintIssue.objects.filter(pk=result.pk)
+    if result.error:
+        logger.warning('Could not render print issue {}: {}'.format(
+            result.pk, result.error))
+        issues.update(rendition_status=PrintIssue.RENDITION_FAILED)
+    else:
+        # Queryset update, so the pdf is not read again by PrintIssue.save().
+        issues.update(
+            pages=result.pages,
+            text=result.text,
+            cover_page=result.cover_name,
+            rendition_status=PrintIssue.RENDITION_READY,
+            pages_rendered=True,
+        )
+    # Search entries store page urls, which link to the page viewer once
+    # the pages are rendered, and to the pdf file otherwise.
+    reindex_pages(result.pk)
+
+
+def pending_issues(retry_failed=False):
+    """ Print issues that need renditions. """
+    status = [PrintIssue.RENDITION_PENDING]
+    if retry_failed:
+        status.append(PrintIssue.RENDITION_FAILED)
+    return PrintIssue.objects.filter(
+        Q(rendition_status__in=status) | Q(
+            rendition_status=PrintIssue.RENDITION_READY, pages_rendered=False)
+    ).exclude(pdf='').exclude(pdf=None)
+
+
+def render_issue(print_issue, force=True):
+    """ Render a single print issue in this process. """
+    result = render(RenditionTask(print_issue, force=force))
+    save_result(result)
+    if result.error:
+        print_issue.rendition_status = PrintIssue.RENDITION_FAILED
+    else:
+        print_issue.pages = result.pages
+        print_issue.text = result.text
+        print_issue.cover_page = result.cover_name
+        print_issue.rendition_status = PrintIssue.RENDITION_READY
+        print_issue.pages_rendered = True
+    return result
+
+
+def render_pending(workers=None, retry_failed=False, force=False):
+    """
+    Render all pending print issues in a pool of worker processes. With
+    force, all print issues are rendered again, while still being shown.
+    """
+    if force:
+        print_issues = PrintIssue.objects.exclude(pdf='').exclude(pdf=None)
+    else:
+        print_issues = pending_issues(retry_failed)
+    tasks = [
+        RenditionTask(print_issue, force=force)
+        for print_issue in print_issues.order_by('-pk')
+    ]
+    if not tasks:
+        return []
+    workers = min(workers or cpu_count(), len(tasks))
+    started = timezone.now()
+    results = []
+    if workers == 1:
+        results = [render(task) for task in tasks]
+        for result in results:
+            save_result(result)
+    else:
+        # maxtasksperchild limits memory leaked by ImageMagick.
+        with Pool(workers, maxtasksperchild=20) as pool:
+            for result in pool.imap_unordered(render, tasks):
+                save_result(result)
+                results.append(result)
+    logger.info('Rendered {} print issues with {} workers in {}'.format(
+        len(results), workers, timezone.now() - started))
+    return results
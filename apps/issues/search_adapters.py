@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+""" Search index adapters for the print archive. """
+
+from django.utils import dateformat
+from watson import SearchAdapter
+
+# Facet value of pages from the printed newspaper.
+PRINT_PAGE_TYPE = 'pdf'
+
+
+class PrintPageSearchAdapter(SearchAdapter):
+
+    """ Search adapter for PrintPage. """
+
+    fields = ('text',)
+    store = ('page_number',)
+
+    def get_batch_queryset(self, queryset):
+        # Titles, urls and facets need the print issue and issue.
+        return queryset.select_related('print_issue__issue')
+
+    def get_title(self, obj):
+        issue = obj.print_issue.issue
+        if issue and issue.publication_date:
+            name = dateformat.format(issue.publication_date, 'j. F Y')
+        else:
+            name = obj.print_issue.pdf_stem()
+        return 'Universitas {}, side {}'.format(name, obj.page_number)
+
+    def get_description(self, obj):
+        return ' '.join(obj.text.split()[:40])
+
+    def get_facets(self, obj):
+        """ Print pages have no section, only type and year. """
+        issue = obj.print_issue.issue
+        year = None
+        if issue and issue.publication_date:
+            year = issue.publication_date.year
+        return {
+            'type': PRINT_PAGE_TYPE,
+            'year': year,
+        }
@@ -5,7 +5,10 @@
 
 from django.views.generic.base import TemplateView
 from django.utils import timezone
-from .models import Issue
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from .models import Issue, PrintIssue
 # from django.conf import settings
 
 
@@ -16,7 +19,11 @@ class PdfArchiveView(TemplateView):
     template_name = 'pdf-archive.html'
 
     def get_queryset(self):
-        queryset = Issue.objects.published()
+        # Pdfs that are still being rendered in the background are shown
+        # without a cover, and link straight to the pdf file.
+        pdfs = PrintIssue.objects.exclude(pdf='').exclude(pdf=None)
+        queryset = Issue.objects.published().prefetch_related(
+            Prefetch('pdfs', queryset=pdfs))
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -25,6 +32,47 @@ class PdfArchiveView(TemplateView):
         return context
 
 
+class PrintPageView(TemplateView):
+
+    """ A single page of a print issue, with links to the next and previous. """
+
+    template_name = 'pdf-page.html'
+
+    def get_print_issue(self):
+        return get_object_or_404(
+            PrintIssue.objects.select_related('issue'),
+            pk=self.kwargs['pk'],
+            rendition_status=PrintIssue.RENDITION_READY,
+            pages_rendered=True,
+        )
+
+    def page(self, print_issue, page_number):
+        storage = print_issue.pdf.storage
+        return {
+            'number': page_number,
+            'url': print_issue.page_url(page_number),
+            'image': storage.url(print_issue.page_thumbnail_name(page_number)),
+            'pdf': storage.url(print_issue.page_pdf_name(page_number)),
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        print_issue = self.get_print_issue()
+        page_number = int(self.kwargs['page_number'])
+        if not 1 <= page_number <= print_issue.pages:
+            raise Http404('No page {}'.format(page_number))
+        context['print_issue'] = print_issue
+        context['issue'] = print_issue.issue
+        context['page'] = self.page(print_issue, page_number)
+        # Neighbours are prefetched by the browser.
+        if page_number > 1:
+            context['previous_page'] = self.page(print_issue, page_number - 1)
+        if page_number < print_issue.pages:
+            context['next_page'] = self.page(print_issue, page_number + 1)
+        context['page_numbers'] = range(1, print_issue.pages + 1)
+        return context
+
+
 class PubPlanView(TemplateView):
 
     """ Publication plan """
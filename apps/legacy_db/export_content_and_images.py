@@ -113,19 +113,25 @@ def import_prodsys_content(
     status = [Prodsak.READY_FOR_WEB, ]
     # status = list(range(Prodsak.READY_FOR_WEB, Prodsak.ARCHIVED))
 
-    prodsak_ids = Prodsak.objects.filter(
-        produsert__in=status).values_list(
-        'prodsak_id', flat=True)
-    prodsak_ids = sorted(set(prodsak_ids), reverse=reverse)
+    # Latest versions of all the stories in a single query.
+    final_versions = {
+        prodsak.prodsak_id: prodsak for prodsak in
+        Prodsak.objects.latest_version().filter(produsert__in=status)
+    }
+    prodsak_ids = sorted(final_versions, reverse=reverse)
 
     logger.info('Found {} stories to import'.format(len(prodsak_ids)))
 
     import_images = not text_only
     for prodsak_id in prodsak_ids:
-        _importer_prodsak(prodsak_id, replace_existing, autocrop, import_images)
+        _importer_prodsak(
+            prodsak_id, replace_existing, autocrop, import_images,
+            final_version=final_versions[prodsak_id])
+
+    # Update the status of all versions of all stories at once.
+    if prodsak_ids:
         Prodsak.objects.filter(
-            prodsak_id=prodsak_id,
-            # produsert__in=status
+            prodsak_id__in=prodsak_ids,
         ).update(produsert=Prodsak.PUBLISHED_ON_WEB)
 
     return len(prodsak_ids)
@@ -229,9 +235,13 @@ def _importer_prodsak(
         prodsak_id,
         replace_existing=False,
         autocrop=False,
-        import_images=True):
+        import_images=True,
+        final_version=None):
     """
     Create a Story with images from a prodsak object in the prodsys database.
+
+    The latest version can be given as `final_version`, if it has been
+    fetched already.
     """
     # Check if this story has been imported already.
     exists = Story.objects.filter(prodsak_id=prodsak_id)
@@ -242,7 +252,10 @@ def _importer_prodsak(
             return
 
     # Create a new Story.
-    xtags, status, json, prodsak = _get_xtags_from_prodsys(prodsak_id)
+    if final_version is None:
+        xtags, status, json, prodsak = _get_xtags_from_prodsys(prodsak_id)
+    else:
+        xtags, status, json, prodsak = _prodsak_content(final_version)
     story_type = _get_story_type(prodsak.mappe)
     new_story = Story(
         prodsak_id=prodsak_id,
@@ -268,6 +281,7 @@ def _importer_prodsak(
     #         prodsak.kommentar or '') + '\n\n Importert til nettside'
     #     prodsak.save()
     #     logger.debug('prodsak updated: {}'.format(prodsak))
+    return new_story
 
 
 def _get_xtags_from_prodsys(prodsak_id, status_in=None):
@@ -279,7 +293,11 @@ def _get_xtags_from_prodsys(prodsak_id, status_in=None):
     # Find the correct story in the database.
     story_versions = Prodsak.objects.filter(**filters)
     final_version = story_versions.latest('version_no')
+    return _prodsak_content(final_version)
+
 
+def _prodsak_content(final_version):
+    """ Get cleaned xtags, status and json from a prodsak version. """
     # Check whether the story has been edited in InDesign.
     if "Vellykket eksport fra InDesign!" in (
             final_version.kommentar or '') and '@tit' in (
@@ -331,12 +349,7 @@ def _importer_bilder_fra_webside(websak, story, autocrop):
     """ Import all images connected to a single story. """
     for bilde in websak.bilde_set.all():
         # Prepare the caption.
-        try:
-            caption = bilde.bildetekst.tekst
-            caption = _clean_up_html(caption)
-            caption = re.sub(r'^@[^:]+: ?', '', caption)  # strip tag.
-        except (Bildetekst.DoesNotExist, AttributeError):
-            caption = ''
+        caption = _bilde_caption(bilde)
 
         # Make the ImageFile object.
         image_file = _create_image_file(
@@ -361,6 +374,17 @@ def _importer_bilder_fra_webside(websak, story, autocrop):
                 image_file.autocrop()
 
 
+def _bilde_caption(bilde):
+    """ Caption of a legacy website image, without tags. """
+    try:
+        caption = bilde.bildetekst.tekst
+        caption = _clean_up_html(caption)
+        caption = re.sub(r'^@[^:]+: ?', '', caption)  # strip tag.
+    except (Bildetekst.DoesNotExist, AttributeError):
+        caption = ''
+    return caption
+
+
 def _create_image_file(filepath, publication_date=None, pk=None, prodsys=False):
     """ Create an ImageFile object from a filepath. """
     # Check if this ImageFile is registered in the database already.
@@ -396,6 +420,20 @@ def _create_image_file(filepath, publication_date=None, pk=None, prodsys=False):
             filepath = os.path.join(issue_image_folder, filepath)
             logger.debug(msg)
 
+    # Save ImageFile object in the database.
+    try:
+        image_file = _new_image_file(filepath, publication_date, pk)
+        if image_file:
+            image_file.save()
+            logger.debug('    new image: {}'.format(image_file.source_file))
+        return image_file
+    except TypeError:
+        # Possibly a currupt imagefile, or wrong file extension.
+        return None
+
+
+def _new_image_file(filepath, publication_date=None, pk=None):
+    """ Unsaved ImageFile, or None if the file does not exist. """
     full_path = os.path.join(BILDEMAPPE, filepath)
 
     if os.path.isfile(full_path):
@@ -419,21 +457,13 @@ def _create_image_file(filepath, publication_date=None, pk=None, prodsys=False):
         # publication date.
         created = min(dates)
 
-        # Save ImageFile object in the database.
-        try:
-            image_file = ImageFile(
-                pk=pk,
-                old_file_path=filepath,
-                source_file=filepath,
-                created=created,
-                modified=modified,
-            )
-            image_file.save()
-            logger.debug('    new image: {}'.format(image_file.source_file))
-            return image_file
-        except TypeError:
-            # Possibly a currupt imagefile, or wrong file extension.
-            return None
+        return ImageFile(
+            pk=pk,
+            old_file_path=filepath,
+            source_file=filepath,
+            created=created,
+            modified=modified,
+        )
 
 
 def _make_aware(time_input):
@@ -462,8 +492,13 @@ def _get_story_type(prodsys_mappe):
     return story_type
 
 
-def _websak_til_xtags(websak):
-    """ Convert legacy article on website into tagged text. """
+def _websak_til_xtags(websak, fakta=None):
+    """
+    Convert legacy article on website into tagged text.
+
+    The texts of the fact boxes can be given as `fakta`, if they have been
+    fetched already.
+    """
     content_list = []
 
     def main(websak):
@@ -524,9 +559,12 @@ def _websak_til_xtags(websak):
                             text_content=item))
 
     def xtags_fact_asides():
-        for aside in websak.fakta_set.all():
+        texts = fakta
+        if texts is None:
+            texts = [aside.tekst for aside in websak.fakta_set.all()]
+        for text in texts:
             content_list.append(
-                '\n@fakta: {text_content}'.format(text_content=aside.tekst)
+                '\n@fakta: {text_content}'.format(text_content=text)
             )
 
     return main(websak)
@@ -9,11 +9,11 @@ from django.core.management.base import BaseCommand  # ,CommandError
 
 # from apps.stories.models import Story
 from apps.legacy_db.export_content_and_images import (
-    import_legacy_website_content,
     import_prodsys_content,
     drop_model_tables,
     reset_db_autoincrement,
 )
+from apps.legacy_db.website_import import LegacyImport
 
 from apps.stories.models import Story
 from apps.contributors.models import Contributor
@@ -81,6 +81,27 @@ class Command(BaseCommand):
             default=False,
             help='Autocrop images'
         ),
+        make_option(
+            '--resume', '-R',
+            action='store_true',
+            dest='resume',
+            default=False,
+            help='Continue website import after the last checkpoint.'
+        ),
+        make_option(
+            '--workers', '-w',
+            type='int',
+            dest='workers',
+            default=None,
+            help='Number of worker processes. Defaults to number of cpus.'
+        ),
+        make_option(
+            '--chunk',
+            type='int',
+            dest='chunk',
+            default=100,
+            help='Number of stories to import in each transaction.'
+        ),
     )
 
     def handle(self, *args, **options):
@@ -114,13 +135,18 @@ class Command(BaseCommand):
             if options['drop'] and not options['replace existing']:
                 drop_model_tables(Story, Contributor, ImageFile)
 
-            status = import_legacy_website_content(
+            legacy_import = LegacyImport(
+                chunk_size=options['chunk'],
+                workers=options['workers'],
                 text_only=options['text only'],
+                replace_existing=options['replace existing'],
+                autocrop=options['autocrop'],
+            )
+            status = legacy_import.run(
                 first=first,
                 last=last,
                 reverse=options['reverse'],
-                replace_existing=options['replace existing'],
-                autocrop=options['autocrop'],
+                resume=options['resume'],
             )
 
             reset_db_autoincrement()
@@ -0,0 +1,72 @@
+""" Import new stories from prodsys as they become ready for web. """
+
+from optparse import make_option
+import logging
+logger = logging.getLogger('universitas')
+
+from django.core.management.base import BaseCommand
+
+from apps.legacy_db.prodsys_sync import ProdsysSync
+
+
+class Command(BaseCommand):
+    help = 'Imports stories that are ready for web from prodsys.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--daemon', '-d',
+            action='store_true',
+            dest='daemon',
+            default=False,
+            help='Keep running and poll prodsys for changes.'
+        ),
+        make_option(
+            '--interval', '-i',
+            type='int',
+            dest='interval',
+            default=10,
+            help='Seconds between each poll in daemon mode.'
+        ),
+        make_option(
+            '--full-scan-interval',
+            type='int',
+            dest='full scan interval',
+            default=3600,
+            help='Seconds between each scan of all stories in daemon mode.'
+        ),
+        make_option(
+            '--full-scan', '-f',
+            action='store_true',
+            dest='full scan',
+            default=False,
+            help='Look for all stories that are ready, not only changed ones.'
+        ),
+        make_option(
+            '--textonly', '-t',
+            action='store_true',
+            dest='text only',
+            default=False,
+            help='Only import text.'
+        ),
+        make_option(
+            '--crop', '-c',
+            action='store_true',
+            dest='autocrop',
+            default=False,
+            help='Autocrop images'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        sync = ProdsysSync(
+            import_images=not options['text only'],
+            autocrop=options['autocrop'],
+        )
+        if options['daemon']:
+            sync.run(
+                interval=options['interval'],
+                full_scan_interval=options['full scan interval'],
+            )
+        else:
+            new_stories = sync.poll(full_scan=options['full scan'])
+            self.stdout.write(
+                'Imported {} stories from prodsys.'.format(len(new_stories)))
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental import of new stories from prodsys.
+
+The sync keeps a high-water mark, the latest `version_date` it has seen, in
+settings.PRODSYS_SYNC_STATE_FILE. Each poll reads only the story versions
+saved after the mark, in a single query over the prodsys connection. Stories
+whose newest version is ready for web are imported, and their status is set
+to published on web with one update. Changing the status in prodsys does not
+always make a new version, so a full scan of ready stories is done when the
+sync starts, and then at regular intervals.
+"""
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from apps.legacy_db.models import Prodsak
+from apps.legacy_db.export_content_and_images import _importer_prodsak
+from apps.stories.models import Story
+
+import logging
+logger = logging.getLogger('universitas')
+
+# Versions saved in the same second as the mark may not have been read yet.
+MARK_OVERLAP = timedelta(seconds=1)
+
+
+class ProdsysSync:
+
+    """ Imports stories from prodsys that are ready for web. """
+
+    def __init__(self, state_file=None, import_images=True, autocrop=False):
+        self.state_file = state_file or getattr(
+            settings, 'PRODSYS_SYNC_STATE_FILE', None)
+        self.import_images = import_images
+        self.autocrop = autocrop
+        self.mark = self.load_mark()
+
+    def load_mark(self):
+        """ The high-water mark from the last run, or None. """
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return None
+        with open(self.state_file) as state:
+            mark = json.load(state).get('version_date')
+        return parse_datetime(mark) if mark else None
+
+    def save_mark(self):
+        if not self.state_file or self.mark is None:
+            return
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as state:
+            json.dump({'version_date': self.mark.isoformat()}, state)
+        os.replace(temp_file, self.state_file)
+
+    def changed_versions(self):
+        """ The newest version of each story changed since the mark. """
+        if self.mark is None:
+            # First run. Start from now, the full scan finds ready stories.
+            self.mark = Prodsak.objects.aggregate(
+                mark=Max('version_date'))['mark']
+            return {}
+        versions = Prodsak.objects.filter(
+            version_date__gte=self.mark - MARK_OVERLAP)
+        final_versions = {}
+        for version in versions.order_by('version_no'):
+            final_versions[version.prodsak_id] = version
+        return final_versions
+
+    def ready_versions(self):
+        """ The newest version of all stories that are ready for web. """
+        return {
+            version.prodsak_id: version for version in
+            Prodsak.objects.latest_version().filter(
+                produsert=Prodsak.READY_FOR_WEB)
+        }
+
+    def import_versions(self, final_versions):
+        """ Import stories that are ready, and update their status. """
+        ready = {
+            prodsak_id: version
+            for prodsak_id, version in final_versions.items()
+            if version.produsert == Prodsak.READY_FOR_WEB
+        }
+        imported = set(Story.objects.filter(
+            prodsak_id__in=list(ready)).values_list('prodsak_id', flat=True))
+        new_stories = []
+        for prodsak_id, version in sorted(ready.items()):
+            if prodsak_id in imported:
+                continue
+            try:
+                new_story = _importer_prodsak(
+                    prodsak_id,
+                    autocrop=self.autocrop,
+                    import_images=self.import_images,
+                    final_version=version,
+                )
+            except Exception:
+                # Try again in the next full scan.
+                logger.exception('Could not import prodsak {}'.format(
+                    prodsak_id))
+                ready.pop(prodsak_id)
+                continue
+            new_stories.append(new_story)
+        if ready:
+            Prodsak.objects.filter(prodsak_id__in=list(ready)).update(
+                produsert=Prodsak.PUBLISHED_ON_WEB)
+        return new_stories
+
+    def poll(self, full_scan=False):
+        """ Import new stories. Returns the new stories. """
+        started = time.time()
+        full_scan = full_scan or self.mark is None
+        final_versions = self.changed_versions()
+        if full_scan:
+            final_versions.update(self.ready_versions())
+        new_stories = self.import_versions(final_versions)
+        version_dates = [
+            version.version_date for version in final_versions.values()
+            if version.version_date]
+        if version_dates and (
+                self.mark is None or max(version_dates) > self.mark):
+            self.mark = max(version_dates)
+        self.save_mark()
+        if final_versions:
+            logger.info(
+                'Prodsys sync: {} changed, {} imported in {:.1f} s'.format(
+                    len(final_versions), len(new_stories),
+                    time.time() - started))
+        return new_stories
+
+    def run(self, interval=10, full_scan_interval=3600):
+        """ Poll prodsys until interrupted. """
+        next_full_scan = 0
+        while True:
+            full_scan = time.time() >= next_full_scan
+            if full_scan:
+                next_full_scan = time.time() + full_scan_interval
+            try:
+                self.poll(full_scan=full_scan)
+            except Exception:
+                logger.exception('Prodsys sync failed')
+            # Don't keep connections open while sleeping.
+            for connection in connections.all():
+                connection.close()
+            time.sleep(interval)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk import of the legacy website archive.
+
+Stories are imported in chunks. For each chunk the legacy rows, fact boxes,
+images and existing image files are fetched with a few queries. The html of
+the legacy stories is converted to xtags in a pool of worker processes, and
+image files are written with batched inserts. Stories are saved one by one,
+since parsing the markup needs the saved story. Each chunk is saved in one
+transaction, and the last imported id is saved to
+settings.LEGACY_IMPORT_CHECKPOINT_FILE, so a crashed import can be resumed.
+"""
+import json
+import os
+from collections import defaultdict
+from multiprocessing import Pool, cpu_count
+
+from django.conf import settings
+from django.core import serializers
+from django.db import connections, transaction, IntegrityError
+
+from apps.legacy_db.models import Sak, Bilde
+from apps.legacy_db.export_content_and_images import (
+    _websak_til_xtags, _make_aware, _get_story_type, _bilde_caption,
+    _new_image_file)
+from apps.stories.models import Story, StoryImage
+from apps.photo.models import ImageFile
+
+import logging
+logger = logging.getLogger('universitas')
+
+
+def websak_xtags(task):
+    """ Xtags and json source of a legacy story. Runs in a worker process. """
+    websak, fakta, undersak, undersak_fakta = task
+    xtags = _websak_til_xtags(websak, fakta)
+    if undersak is not None:
+        xtags += '\n' + _websak_til_xtags(undersak, undersak_fakta).replace(
+            '@tit:', '@undersaktit:')
+    return websak.pk, xtags, serializers.serialize('json', (websak,))
+
+
+def _prodsak_id(websak):
+    # No integer prodsak_id means that this article does not exist in prodsys.
+    try:
+        return int(websak.filnavn)
+    except (TypeError, ValueError):
+        return None
+
+
+class LegacyImport:
+
+    """ Imports stories and images from the legacy website in bulk. """
+
+    def __init__(self, chunk_size=100, workers=None, text_only=False,
+                 autocrop=False, replace_existing=False, checkpoint_file=None):
+        self.chunk_size = chunk_size
+        self.workers = workers or cpu_count()
+        self.text_only = text_only
+        self.autocrop = autocrop
+        self.replace_existing = replace_existing
+        self.checkpoint_file = checkpoint_file or getattr(
+            settings, 'LEGACY_IMPORT_CHECKPOINT_FILE', None)
+        self.story_types = {}
+
+    def load_checkpoint(self):
+        """ The last imported legacy id, or None. """
+        if not self.checkpoint_file or not os.path.isfile(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file) as checkpoint:
+            return json.load(checkpoint).get('id_sak')
+
+    def save_checkpoint(self, id_sak):
+        if not self.checkpoint_file:
+            return
+        temp_file = self.checkpoint_file + '.tmp'
+        with open(temp_file, 'w') as checkpoint:
+            json.dump({'id_sak': id_sak}, checkpoint)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def story_type(self, mappe):
+        if mappe not in self.story_types:
+            self.story_types[mappe] = _get_story_type(mappe)
+        return self.story_types[mappe]
+
+    def prefetch_maps(self):
+        """ Lookup maps for the whole archive. """
+        self.existing = set(Story.objects.values_list('id', flat=True))
+        self.imported = set()
+        # A story with a parent is imported as part of the parent story.
+        self.parent_of = {}
+        self.children_of = defaultdict(list)
+        for id_sak, undersak in Sak.objects.exclude(
+                undersak=None).exclude(undersak=0).values_list(
+                'id_sak', 'undersak'):
+            self.parent_of[undersak] = id_sak
+            self.children_of[id_sak].append(undersak)
+
+    def root(self, id_sak):
+        """ The legacy id of the story this legacy story is part of. """
+        seen = set()
+        while id_sak in self.parent_of and id_sak not in seen:
+            seen.add(id_sak)
+            id_sak = self.parent_of[id_sak]
+        return id_sak
+
+    def fetch_chunk(self, roots):
+        """ Legacy stories, subsidiary stories and images of a chunk. """
+        members = set(roots)
+        for root in roots:
+            members.update(self.children_of[root])
+        saker = Sak.objects.prefetch_related('fakta_set').in_bulk(list(members))
+        bilder = defaultdict(list)
+        if not self.text_only:
+            for bilde in Bilde.objects.filter(
+                    sak__in=members).select_related(
+                    'bildetekst').order_by('id_bilde'):
+                bilder[self.root(bilde.sak_id)].append(bilde)
+        return saker, bilder
+
+    def xtags_tasks(self, roots, saker):
+        tasks = []
+        for root in roots:
+            websak = saker.get(root)
+            if websak is None:
+                continue
+            undersak = saker.get(websak.undersak) if websak.undersak else None
+            tasks.append((
+                websak,
+                [fakta.tekst for fakta in websak.fakta_set.all()],
+                undersak,
+                [fakta.tekst for fakta in undersak.fakta_set.all()]
+                if undersak else None,
+            ))
+        return tasks
+
+    def create_image_files(self, bilder, saker):
+        """ Get or create image files for legacy images, keyed by image id. """
+        bilder = [bilde for images in bilder.values() for bilde in images]
+        by_pk = ImageFile.objects.in_bulk([bilde.pk for bilde in bilder])
+        by_path = {}
+        for image_file in ImageFile.objects.filter(
+                source_file__in=[bilde.path for bilde in bilder]):
+            by_path.setdefault(str(image_file.source_file), image_file)
+        image_files, new_image_files = {}, []
+        for bilde in bilder:
+            image_file = by_pk.get(bilde.pk) or by_path.get(bilde.path)
+            if image_file is None:
+                try:
+                    image_file = _new_image_file(
+                        bilde.path, saker[bilde.sak_id].dato, bilde.pk)
+                except TypeError:
+                    # Possibly a currupt imagefile, or wrong file extension.
+                    image_file = None
+                if image_file is None:
+                    continue
+                new_image_files.append(image_file)
+                by_path[bilde.path] = image_file
+            image_files[bilde.pk] = image_file
+        try:
+            with transaction.atomic():
+                ImageFile.objects.bulk_create(new_image_files)
+        except (IntegrityError, TypeError):
+            # Save one by one, and skip the bad ones.
+            for image_file in new_image_files:
+                try:
+                    with transaction.atomic():
+                        image_file.save()
+                except (IntegrityError, TypeError):
+                    logger.warning('Could not import image {}'.format(
+                        image_file.source_file))
+                    image_files = {
+                        pk: value for pk, value in image_files.items()
+                        if value is not image_file}
+        return image_files
+
+    def import_chunk(self, roots, pool):
+        """ Import the stories with the given legacy ids. """
+        saker, bilder = self.fetch_chunk(roots)
+        tasks = self.xtags_tasks(roots, saker)
+        if pool:
+            results = pool.map(websak_xtags, tasks)
+        else:
+            results = [websak_xtags(task) for task in tasks]
+
+        stories = []
+        for id_sak, xtags, source in results:
+            websak = saker[id_sak]
+            stories.append(Story(
+                id=id_sak,
+                publication_date=_make_aware(websak.dato),
+                story_type=self.story_type(websak.mappe),
+                legacy_html_source=source,
+                hit_count=websak.lesninger,
+                prodsak_id=_prodsak_id(websak),
+                # Prodsys versions are never marked as published, so the
+                # legacy website text is always used.
+                bodytext_markup=xtags,
+                publication_status=Story.STATUS_PUBLISHED,
+            ))
+
+        with transaction.atomic():
+            if self.replace_existing:
+                Story.objects.filter(id__in=roots).delete()
+            image_files = self.create_image_files(bilder, saker)
+            for story in stories:
+                # Each story is saved on its own, since clean() needs the row
+                # and every story is saved again afterwards anyway.
+                story.save()
+                # Creates bylines, asides and pullquotes from the markup.
+                story.clean()
+                for bilde in bilder[story.id]:
+                    image_file = image_files.get(bilde.pk)
+                    if image_file is None:
+                        continue
+                    published = bool(bilde.size)
+                    StoryImage(
+                        parent_story=story,
+                        imagefile=image_file,
+                        index=0 if published else None,
+                        size=bilde.size or 0,
+                        creditline='',
+                        caption=_bilde_caption(bilde)[:1000],
+                    ).save()
+                    if self.autocrop:
+                        image_file.autocrop()
+                story.full_clean()
+                story.save(new=not self.text_only)
+        self.imported.update(story.id for story in stories)
+        return len(stories)
+
+    def run(self, first=0, last=None, reverse=False, resume=False):
+        """ Import legacy stories. Returns the number of new stories. """
+        order_by = 'id_sak' if not reverse else '-id_sak'
+        websaker = Sak.objects.exclude(publisert=0).order_by(order_by)
+        if resume:
+            checkpoint = self.load_checkpoint()
+            if checkpoint is not None:
+                logger.info('Resuming import after {}'.format(checkpoint))
+                if reverse:
+                    websaker = websaker.filter(id_sak__lt=checkpoint)
+                else:
+                    websaker = websaker.filter(id_sak__gt=checkpoint)
+        ids = list(websaker.values_list('id_sak', flat=True)[first:last])
+        self.prefetch_maps()
+
+        pool = None
+        if self.workers > 1:
+            # Forked workers must not share database connections.
+            for connection in connections.all():
+                connection.close()
+            pool = Pool(self.workers)
+        imported = 0
+        try:
+            for start in range(0, len(ids), self.chunk_size):
+                chunk = ids[start:start + self.chunk_size]
+                roots = []
+                for id_sak in chunk:
+                    root = self.root(id_sak)
+                    if root in roots or root in self.imported:
+                        continue
+                    if root in self.existing and not self.replace_existing:
+                        continue
+                    roots.append(root)
+                if roots:
+                    imported += self.import_chunk(roots, pool)
+                self.save_checkpoint(chunk[-1])
+                logger.info('Imported {} of {} legacy stories'.format(
+                    start + len(chunk), len(ids)))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return imported
@@ -5,9 +5,12 @@ Views for use with django-watson
 from django.views.generic.list import BaseListView
 from django.views.generic import ListView
 import watson
+from watson.models import FACETS
 import json
 from django.http import HttpResponse
 from django.shortcuts import redirect
+from apps.stories.models import Section, StoryType
+from apps.issues.search_adapters import PRINT_PAGE_TYPE
 
 
 class SearchMixin:
@@ -38,7 +41,8 @@ class SearchMixin:
         """Returns the initial queryset."""
         # return watson.search(self.query, models=self.get_models(),
         # exclude=self.get_exclude())
-        search_results = watson.search(self.query)
+        search_results = watson.search(
+            self.query, facets=self.selected_facets)
         if search_results:
             search_results = search_results.prefetch_related("object")
 
@@ -49,6 +53,17 @@ class SearchMixin:
         # return request.GET.get(self.get_query_param(), "").strip()
         return request.GET.get(self.query_param, "").strip()
 
+    def get_selected_facets(self, request):
+        """Parses the selected facet values from the request."""
+        selected_facets = {}
+        for facet in FACETS:
+            value = request.GET.get(facet, "").strip()
+            if facet == "year":
+                value = int(value) if value.isdigit() else None
+            if value:
+                selected_facets[facet] = value
+        return selected_facets
+
     empty_query_redirect = None
 
     def get_empty_query_redirect(self):
@@ -79,6 +94,7 @@ class SearchMixin:
     def get(self, request, *args, **kwargs):
         """Performs a GET request."""
         self.query = self.get_query(request)
+        self.selected_facets = self.get_selected_facets(request)
         if not self.query:
             empty_query_redirect = self.get_empty_query_redirect()
             if empty_query_redirect:
@@ -92,6 +108,67 @@ class SearchView(SearchMixin, ListView):
 
     paginate_by = 10
     template_name = "search-results.html"
+    facet_titles = (
+        ("section", "Seksjon"),
+        ("type", "Sakstype"),
+        ("year", "År"),
+    )
+
+    def get_facet_labels(self, facet_counts):
+        """Returns display names for the facet values, keyed by facet."""
+        section_slugs = [value for value, count in facet_counts["section"]]
+        type_slugs = [value for value, count in facet_counts["type"]]
+        type_labels = dict(StoryType.objects.filter(
+            slug__in=type_slugs).values_list("slug", "name"))
+        type_labels.setdefault(PRINT_PAGE_TYPE, "Papiravis")
+        return {
+            "section": dict(Section.objects.filter(
+                slug__in=section_slugs).values_list("slug", "title")),
+            "type": type_labels,
+            "year": {},
+        }
+
+    def get_facet_url(self, facet, value):
+        """Returns a query string that toggles a facet value."""
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        if self.selected_facets.get(facet) == value:
+            params.pop(facet, None)
+        else:
+            params[facet] = str(value)
+        return "?" + params.urlencode()
+
+    def get_facets(self):
+        """Returns facet values and match counts for the current search."""
+        facet_counts = watson.facet_counts(
+            self.query, facets=self.selected_facets)
+        labels = self.get_facet_labels(facet_counts)
+        return [
+            {
+                "name": facet,
+                "title": title,
+                "values": [
+                    {
+                        "value": value,
+                        "label": labels[facet].get(value, value),
+                        "count": count,
+                        "selected": self.selected_facets.get(facet) == value,
+                        "url": self.get_facet_url(facet, value),
+                    } for value, count in facet_counts[facet]
+                ],
+            } for facet, title in self.facet_titles
+        ]
+
+    def get_context_data(self, **kwargs):
+        """Adds facets, suggestions and the query string used by pagination links."""
+        context = super(SearchView, self).get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        context["querystring"] = params.urlencode()
+        context["facets"] = self.get_facets()
+        if self.query and not context["object_list"]:
+            context["suggestion"] = watson.suggest(self.query)
+        return context
 
 
 class SearchApiView(SearchMixin, BaseListView):
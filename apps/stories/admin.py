@@ -67,7 +67,8 @@ class LinkInline(admin.TabularInline):
 class VideoInline(admin.TabularInline, ):
     model = StoryVideo
     formfield_overrides = {models.CharField: {'widget': Textarea(attrs={'rows': 5, 'cols': 30})}, }
-    fields = ['top', 'index', 'caption', 'creditline', 'size', 'video_host', 'host_video_id', ]
+    fields = ['top', 'index', 'caption', 'creditline', 'size', 'video_host', 'host_video_id', 'validation_status', 'title', ]
+    readonly_fields = ('validation_status', 'title', )
     extra = 0
 
 class ImageInline(admin.TabularInline, ThumbAdmin, ):
@@ -6,5 +6,6 @@ class StoriesAppConfig(AppConfig):
     name = 'apps.stories'
     verbose_name = _('Stories')
     def ready(self):
+        from .search_adapters import StorySearchAdapter
         Story = self.get_model('Story')
-        watson.register(Story.objects.published())
\ No newline at end of file
+        watson.register(Story.objects.published(), StorySearchAdapter)
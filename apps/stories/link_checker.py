@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent checking of inline links.
+
+The urls of all links are checked with asyncio, so many slow hosts can be
+waited for at the same time. Each url is only requested once, even if many
+stories link to it. The number of open connections is limited, both in total
+and for each host, and there is a short delay between requests to the same
+host. The status codes are saved with one update for each status code.
+
+The status codes are the same as `InlineLink.check_link` would find: a HEAD
+request, and a GET request following redirects if the HEAD request returns
+410. 'INT' for links to stories on this site, '408' for timeouts, 'URL' for
+invalid urls and 'DNS' for hosts that can not be reached. Any other error,
+such as a bad certificate or a broken response, is saved as '500', so one bad
+host can't stop the other urls from being checked.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit, urljoin, quote
+
+import logging
+logger = logging.getLogger('universitas')
+
+# Open connections at the same time.
+CONCURRENCY = 50
+# Open connections to the same host at the same time.
+PER_HOST = 2
+# Seconds between requests to the same host.
+HOST_DELAY = 0.5
+# Redirects to follow in GET requests.
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+USER_AGENT = 'universitas.no link checker'
+
+
+class InvalidURL(ValueError):
+    pass
+
+
+def request_line(method, url):
+    """ Host, port, ssl and request bytes of a http request. """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise InvalidURL(url)
+    try:
+        host = parts.hostname.encode('idna').decode('ascii')
+    except UnicodeError:
+        raise InvalidURL(url)
+    use_ssl = parts.scheme == 'https'
+    port = parts.port or (443 if use_ssl else 80)
+    path = quote(parts.path or '/', safe='/%:@!$&\'()*+,;=~')
+    if parts.query:
+        path += '?' + quote(parts.query, safe='/%:@!$&\'()*+,;=~?')
+    headers = [
+        '{} {} HTTP/1.1'.format(method.upper(), path),
+        'Host: {}'.format(host if parts.port is None else '{}:{}'.format(
+            host, parts.port)),
+        'User-Agent: {}'.format(USER_AGENT),
+        'Accept: */*',
+        'Connection: close',
+    ]
+    data = ('\r\n'.join(headers) + '\r\n\r\n').encode('ascii')
+    return host, port, use_ssl, data
+
+
+@asyncio.coroutine
+def http_status(method, url):
+    """ Status code and redirect location of a http request. """
+    host, port, use_ssl, data = request_line(method, url)
+    reader, writer = yield from asyncio.open_connection(
+        host, port, ssl=use_ssl)
+    try:
+        writer.write(data)
+        status_line = yield from reader.readline()
+        try:
+            status_code = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise ConnectionError('Bad response from {}'.format(url))
+        location = None
+        while True:
+            line = yield from reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'location':
+                location = value.strip()
+    finally:
+        writer.close()
+    return status_code, location
+
+
+class LinkChecker:
+
+    """ Checks the http status of many urls at the same time. """
+
+    def __init__(self, timeout=1, concurrency=CONCURRENCY, per_host=PER_HOST,
+                 delay=HOST_DELAY):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.delay = delay
+        self.loop = asyncio.get_event_loop()
+        self.connections = asyncio.Semaphore(concurrency)
+        self.hosts = {}
+
+    def host_limit(self, url):
+        host = urlsplit(url).hostname
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        return self.hosts[host]
+
+    @asyncio.coroutine
+    def request(self, method, url):
+        """ A single request, limited by host and total connections. """
+        host_limit = self.host_limit(url)
+        yield from host_limit.acquire()
+        try:
+            yield from self.connections.acquire()
+            try:
+                return (yield from asyncio.wait_for(
+                    http_status(method, url), self.timeout))
+            finally:
+                self.connections.release()
+                # Be polite, don't hammer the same host.
+                yield from asyncio.sleep(self.delay)
+        finally:
+            host_limit.release()
+
+    @asyncio.coroutine
+    def get(self, url):
+        """ Status code of a GET request, following redirects. """
+        for redirect in range(MAX_REDIRECTS + 1):
+            status_code, location = yield from self.request('get', url)
+            if status_code not in REDIRECT_CODES or not location:
+                break
+            url = urljoin(url, location)
+        return status_code
+
+    @asyncio.coroutine
+    def check(self, url):
+        """ Status code of an url, as a string. """
+        try:
+            status_code, location = yield from self.request('head', url)
+            if status_code == 410:
+                status_code = yield from self.get(url)
+            if status_code > 500:
+                status_code = 500
+            return str(status_code)
+        except asyncio.TimeoutError:
+            return '408'  # HTTP Timout
+        except InvalidURL:
+            return 'URL'  # not a HTTP url
+        except OSError:
+            return 'DNS'  # DNS error
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            logger.debug('Link check of {} failed: {!r}'.format(url, error))
+            return '500'  # bad certificate or response
+
+    def check_urls(self, urls):
+        """ Check urls concurrently. Returns a dict of status codes. """
+        urls = sorted(set(urls))
+        status_codes = self.loop.run_until_complete(asyncio.gather(
+            *[self.check(url) for url in urls]))
+        return dict(zip(urls, status_codes))
+
+
+def link_url(link):
+    """ The url to check for a link, or a status code if it's not needed. """
+    if link.linked_story_id:
+        return None, 'INT'
+    if not link.href:
+        return None, ''
+    url = link.validate_url(link.href)
+    if url is None:
+        return None, 'URL'
+    return url, None
+
+
+def check_links(links, **kwargs):
+    """ Check and save the status codes of inline links. """
+    from .models import InlineLink
+    started = time.time()
+    links = list(links.only('pk', 'href', 'linked_story', 'status_code'))
+    urls = {}
+    status_codes = {}
+    for link in links:
+        url, status_code = link_url(link)
+        urls[link.pk] = url
+        status_codes[link.pk] = status_code
+    checked = LinkChecker(**kwargs).check_urls(
+        url for url in urls.values() if url)
+    changed = defaultdict(list)
+    for link in links:
+        status_code = status_codes[link.pk]
+        if status_code is None:
+            status_code = checked[urls[link.pk]]
+        if status_code != link.status_code:
+            changed[status_code].append(link.pk)
+    for status_code, pks in changed.items():
+        InlineLink.objects.filter(pk__in=pks).update(status_code=status_code)
+    logger.info('Checked {} links with {} urls in {:.1f} s, {} changed'.format(
+        len(links), len(checked), time.time() - started,
+        sum(len(pks) for pks in changed.values())))
+    return checked
@@ -0,0 +1,66 @@
+from optparse import make_option
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.stories.bylines import (
+    REPLACEMENTS, clean_up_bylines, clean_up_bylines_many)
+from apps.stories.unit_tests.byline_golden import BYLINE_GOLDEN
+
+
+def uncompiled(raw_bylines):
+    """ The previous implementation: re.sub with string patterns. """
+    bylines = ' '.join(raw_bylines.split())
+    for pattern, replacement, flags in REPLACEMENTS:
+        bylines = re.sub(pattern, replacement, bylines, flags=flags)
+    bylines = bylines.strip()
+    if 'photo:' in bylines:
+        bylines = bylines.replace('by:', 'text:')
+    return bylines
+
+
+class Command(BaseCommand):
+    help = 'Checks and times the byline cleanup with the golden corpus.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--repeat', '-n',
+            type='int',
+            dest='repeat',
+            default=100,
+            help='Number of times to clean the corpus.'
+        ),
+        make_option(
+            '--workers',
+            type='int',
+            dest='workers',
+            default=None,
+            help='Worker processes for the batch cleanup.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        raw_bylines = [raw for raw, expected in BYLINE_GOLDEN]
+        expected = [expected for raw, expected in BYLINE_GOLDEN]
+        raw_bylines *= options['repeat']
+        expected *= options['repeat']
+        for name, function in [
+                ('uncompiled', lambda values: [
+                    uncompiled(raw) for raw in values]),
+                ('compiled', lambda values: [
+                    clean_up_bylines(raw, log=False) for raw in values]),
+                ('many', lambda values: clean_up_bylines_many(
+                    values, workers=options['workers'], log=False))]:
+            start = time.time()
+            result = function(raw_bylines)
+            duration = time.time() - start
+            errors = sum(1 for a, b in zip(result, expected) if a != b)
+            self.stdout.write(
+                '{:<10} bylines: {}  total: {:.0f} ms  '
+                'per byline: {:.1f} us  errors: {}'.format(
+                    name,
+                    len(result),
+                    1000 * duration,
+                    1e6 * duration / len(result),
+                    errors,
+                ))
@@ -7,6 +7,8 @@ from django.core.management.base import BaseCommand  # , CommandError
 from django.db.models import Count
 
 from apps.stories.models import InlineLink
+from apps.stories.link_checker import (
+    check_links, CONCURRENCY, PER_HOST, HOST_DELAY)
 
 
 class Command(BaseCommand):
@@ -41,6 +43,30 @@ class Command(BaseCommand):
             default=1,
             help='Seconds to wait for a http response'
         ),
+        make_option(
+            '--concurrency', '-c',
+            type=int,
+            action='store',
+            dest='concurrency',
+            default=CONCURRENCY,
+            help='Number of http requests at the same time'
+        ),
+        make_option(
+            '--per-host',
+            type=int,
+            action='store',
+            dest='per host',
+            default=PER_HOST,
+            help='Number of http requests to the same host at the same time'
+        ),
+        make_option(
+            '--delay', '-d',
+            type=float,
+            action='store',
+            dest='delay',
+            default=HOST_DELAY,
+            help='Seconds between http requests to the same host'
+        ),
     )
 
     def handle(self, *args, **options):
@@ -58,15 +84,21 @@ class Command(BaseCommand):
         if options['fix broken']:
             self._repair_legacy_links(links_to_check)
 
-        self._check_links(links_to_check, timeout=options['timeout'])
+        self._check_links(
+            links_to_check,
+            timeout=options['timeout'],
+            concurrency=options['concurrency'],
+            per_host=options['per host'],
+            delay=options['delay'],
+        )
 
-    def _check_links(self, links_to_check, timeout):
+    def _check_links(self, links_to_check, **kwargs):
         """ Check and update status code for inline links in articles. """
 
         self.stdout.write('Checking {} links'.format(links_to_check.count()))
 
-        for link in links_to_check:
-            link.check_link(save_if_changed=True, timeout=timeout)
+        checked = check_links(links_to_check, **kwargs)
+        self.stdout.write('Requested {} urls'.format(len(checked)))
 
         self.stdout.write('Checked {} links'.format(links_to_check.count()))
         link_statuses = InlineLink.objects.values('status_code').annotate(count=Count('status_code'))
@@ -0,0 +1,47 @@
+from optparse import make_option
+import os
+import logging
+logger = logging.getLogger('universitas')
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.stories.models import RelatedStory
+from apps.stories import related
+
+
+class Command(BaseCommand):
+    help = (
+        'Finds related stories. Newly published stories are added to the '
+        'saved tf-idf model. Use --rebuild now and then to pick up edited '
+        'stories and new words.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--rebuild', '-r',
+            action='store_true',
+            dest='rebuild',
+            default=False,
+            help='Build a new model from all published stories.'
+        ),
+        make_option(
+            '--number', '-n',
+            type='int',
+            dest='number',
+            default=RelatedStory.RELATED_COUNT,
+            help='Number of related stories per story.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        path = settings.RELATED_STORIES_FILE
+        number = options['number']
+        if options['rebuild'] or not os.path.isfile(path):
+            model = related.rebuild(number)
+            self.stdout.write('Built model of {} stories'.format(
+                len(model.story_ids)))
+        else:
+            model = related.TfidfModel.load(path)
+            new_ids = related.update(model, number)
+            self.stdout.write('Added {} stories'.format(len(new_ids)))
+        model.save(path)
@@ -0,0 +1,70 @@
+"""
+Validate story videos and fetch oEmbed data from the video hosts.
+"""
+
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.stories.models import StoryVideo
+from apps.stories.video_validation import validate_pending, THREADS
+
+
+class Command(BaseCommand):
+    help = 'Validate pending videos with the oEmbed api of the video host.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--threads', '-t',
+            type='int',
+            dest='threads',
+            default=THREADS,
+            help='Number of lookups at the same time.'
+        ),
+        make_option(
+            '--retry-failed',
+            action='store_true',
+            dest='retry failed',
+            default=False,
+            help='Also check videos that failed before.'
+        ),
+        make_option(
+            '--all', '-a',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Check all videos again, without using cached answers.'
+        ),
+        make_option(
+            '--interval', '-i',
+            type='int',
+            dest='interval',
+            default=0,
+            help='Keep running, looking for pending videos every N seconds.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            StoryVideo.objects.update(
+                validation_status=StoryVideo.VALIDATION_PENDING)
+
+        while True:
+            results = validate_pending(
+                threads=options['threads'],
+                retry_failed=options['retry failed'],
+                use_cache=not options['all'],
+            )
+            failed = [
+                fields for fields in results.values()
+                if fields['validation_status'] == StoryVideo.VALIDATION_FAILED]
+            if results:
+                self.stdout.write('Validated {} videos, {} failed'.format(
+                    len(results) - len(failed), len(failed)))
+            if not options['interval']:
+                break
+            options['all'] = False
+            # Don't keep a connection open while sleeping.
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0015_auto_20150527_0201'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedStory',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('score', models.FloatField(verbose_name='score', help_text='cosine similarity of the two stories.')),
+                ('related_story', models.ForeignKey(related_name='related_story_backlinks', to='stories.Story')),
+                ('story', models.ForeignKey(related_name='related_story_links', to='stories.Story')),
+            ],
+            options={
+                'verbose_name': 'Related story',
+                'verbose_name_plural': 'Related stories',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedstory',
+            unique_together=set([('story', 'related_story')]),
+        ),
+    ]
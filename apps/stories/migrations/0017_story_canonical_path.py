@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0016_relatedstory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='canonical_path',
+            field=models.CharField(verbose_name='canonical path', editable=False, blank=True, max_length=200, help_text='url path from section and slug.'),
+            preserve_default=True,
+        ),
+    ]
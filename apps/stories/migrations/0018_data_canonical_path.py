@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from django.core.urlresolvers import reverse
+from django.db import migrations
+
+
+def make_canonical_paths(apps, schema_editor):
+    """ Store the url path of all existing stories. """
+
+    Story = apps.get_model('stories', 'Story')
+    stories = Story.objects.values_list(
+        'pk', 'slug', 'story_type__section__slug')
+    for pk, slug, section in stories.iterator():
+        path = reverse(
+            viewname='article',
+            kwargs={
+                'story_id': str(pk),
+                'section': section,
+                'slug': slug,
+            },)
+        Story.objects.filter(pk=pk).update(canonical_path=path)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0017_story_canonical_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            make_canonical_paths,
+            reverse_code=noop,
+        ),
+    ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0018_data_canonical_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyvideo',
+            name='validation_status',
+            field=models.PositiveSmallIntegerField(verbose_name='validation status', editable=False, default=1, choices=[(1, 'Pending'), (2, 'Ok'), (3, 'Failed')], help_text='Checked with the video host in the background.'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='storyvideo',
+            name='title',
+            field=models.CharField(verbose_name='title', editable=False, blank=True, max_length=500, help_text='title from the video host.'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='storyvideo',
+            name='thumbnail_url',
+            field=models.URLField(verbose_name='thumbnail url', editable=False, blank=True, max_length=500, help_text='thumbnail image from the video host.'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='storyvideo',
+            name='video_ratio',
+            field=models.FloatField(verbose_name='video ratio', editable=False, blank=True, null=True, help_text='height / width of the video from the video host.'),
+            preserve_default=True,
+        ),
+    ]
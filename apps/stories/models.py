@@ -6,6 +6,7 @@ import re
 import difflib
 import json
 import logging
+from collections import defaultdict
 logger = logging.getLogger('universitas')
 
 # Django core
@@ -13,7 +14,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
 from django.utils import timezone
 from django.utils import translation
-from django.db import models
+from django.db import models, transaction, connection
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import URLValidator, ValidationError
@@ -134,9 +135,17 @@ class MarkupModelMixin(object):
             for line in raw.splitlines():
                 # line = BlockTag.objects.make_html(line)
                 line = InlineTag.objects.make_html(line)
-                line = self.parent.links().markup_to_html(line)
                 result.append(line)
-            return '\n'.join(result)
+            # Links never span lines, so they are replaced in a single pass.
+            return self.parent.link_resolver().markup_to_html(
+                '\n'.join(result))
+
+    def link_resolver(self):
+        """ Inline links of the parent story. Loaded once per story. """
+        story = self.parent_story
+        if getattr(story, '_link_resolver', None) is None:
+            story._link_resolver = self.links().resolver()
+        return story._link_resolver
 
 
 class Section(models.Model):
@@ -166,6 +175,16 @@ class Section(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        old_section = self.pk and Section.objects.filter(pk=self.pk).first()
+        super().save(*args, **kwargs)
+        if old_section and old_section.slug != self.slug:
+            # A new slug changes the path of every story in the section.
+            Story.objects.filter(
+                story_type__section=self,
+            ).move_canonical_paths(
+                old_section.get_absolute_url(), self.get_absolute_url())
+
     def get_absolute_url(self):
         url = reverse(
             viewname='section',
@@ -202,6 +221,16 @@ class StoryType(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        old_type = self.pk and StoryType.objects.filter(
+            pk=self.pk).select_related('section').first()
+        super().save(*args, **kwargs)
+        if old_type and old_type.section_id != self.section_id:
+            # Stories of this type are moved to another section.
+            Story.objects.filter(story_type=self).move_canonical_paths(
+                old_type.section.get_absolute_url(),
+                self.section.get_absolute_url())
+
     def get_absolute_url(self):
         url = reverse(
             viewname='storytype',
@@ -323,7 +352,7 @@ class TextContent(models.Model, MarkupModelMixin):
 
     def insert_urls_in_links(self, text):
         """ Change markup references to urls. """
-        text = self.links().insert_urls(text)
+        text = self.link_resolver().insert_urls(text)
         return text
 
     def parse_markup(self):
@@ -416,6 +445,29 @@ class StoryQuerySet(models.QuerySet):
     def is_on_frontpage(self, frontpage):
         return self.filter(frontpagestory__placements=frontpage)
 
+    def move_canonical_paths(self, old_prefix, new_prefix):
+        """
+        Change the start of the canonical path of the stories, with a single
+        update statement. Returns the number of changed stories.
+        """
+        if old_prefix == new_prefix:
+            return 0
+        stories = self.filter(canonical_path__startswith=old_prefix)
+        subquery, params = stories.values('pk').query.sql_with_params()
+        quote_name = connection.ops.quote_name
+        column = quote_name('canonical_path')
+        sql = 'UPDATE {table} SET {column} = %s || substr({column}, %s) '\
+            'WHERE {pk} IN ({subquery})'.format(
+                table=quote_name(self.model._meta.db_table),
+                column=column,
+                pk=quote_name(self.model._meta.pk.column),
+                subquery=subquery,
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [new_prefix, len(old_prefix) + 1] + list(params))
+            return cursor.rowcount
+
 
 class PublishedStoryManager(models.Manager):
 
@@ -486,6 +538,13 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
         overwrite=True,
         slugify_function=slugify,
     )
+    canonical_path = models.CharField(
+        max_length=200,
+        blank=True,
+        editable=False,
+        help_text=_('url path from section and slug.'),
+        verbose_name=_('canonical path'),
+    )
     kicker = MarkupCharField(
         max_length=1000,
         blank=True,
@@ -580,6 +639,11 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
 
         super().save(*args, **kwargs)
 
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'title', 'slug', 'story_type'} & set(
+                update_fields):
+            self.update_canonical_path()
+
         if new:
             # make inline elements
             self.bodytext_markup = self.place_all_inline_elements()
@@ -706,7 +770,8 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
             self.bodytext_html = ''
             self.save(update_fields=['bodytext_html'])
 
-    def get_absolute_url(self):
+    def make_canonical_path(self):
+        """ Url path from the section and slug of the story. """
         url = reverse(
             viewname='article',
             kwargs={
@@ -716,6 +781,15 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
             },)
         return url
 
+    def update_canonical_path(self):
+        path = self.make_canonical_path()
+        if path != self.canonical_path:
+            self.canonical_path = path
+            Story.objects.filter(pk=self.pk).update(canonical_path=path)
+
+    def get_absolute_url(self):
+        return self.canonical_path or self.make_canonical_path()
+
     def get_shortlink(self):
         url = reverse(
             viewname='article_short',
@@ -724,6 +798,13 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
             },)
         return 'http://universitas.no' + url
 
+    def related_stories(self, number=None):
+        """ Published stories related to this one, most similar first. """
+        related = Story.objects.published().filter(
+            related_story_backlinks__story=self,
+        ).order_by('-related_story_backlinks__score')
+        return related[:number or RelatedStory.RELATED_COUNT]
+
     def children_modified(self):
         """ check if any related objects have been
         modified after self was last saved. """
@@ -998,6 +1079,35 @@ class Story(TextContent, TimeStampedModel, Edit_url_mixin):
         return body
 
 
+class RelatedStory(models.Model):
+
+    """ Precomputed similarity between two stories. """
+
+    # Number of related stories stored for each story.
+    RELATED_COUNT = 5
+
+    story = models.ForeignKey(
+        Story,
+        related_name='related_story_links',
+    )
+    related_story = models.ForeignKey(
+        Story,
+        related_name='related_story_backlinks',
+    )
+    score = models.FloatField(
+        help_text=_('cosine similarity of the two stories.'),
+        verbose_name=_('score'),
+    )
+
+    class Meta:
+        verbose_name = _('Related story')
+        verbose_name_plural = _('Related stories')
+        unique_together = ('story', 'related_story')
+
+    def __str__(self):
+        return '{} -> {}'.format(self.story_id, self.related_story_id)
+
+
 class ElementQuerySet(models.QuerySet):
 
     def top(self):
@@ -1018,7 +1128,9 @@ class ElementQuerySet(models.QuerySet):
         return self.filter(_subclass='storyimage')
 
     def videos(self):
-        return self.filter(_subclass='storyvideo')
+        """ Videos, except those the video host doesn't have. """
+        return self.filter(_subclass='storyvideo').exclude(
+            storyvideo__validation_status=StoryVideo.VALIDATION_FAILED)
 
     def pullquotes(self):
         return self.filter(_subclass='pullquote')
@@ -1278,6 +1390,16 @@ class StoryVideo(StoryMedia):
         ('youtu', _('youtube'),),
     )
 
+    VALIDATION_PENDING = 1
+    VALIDATION_OK = 2
+    VALIDATION_FAILED = 3
+
+    VALIDATION_CHOICES = [
+        (VALIDATION_PENDING, _('Pending')),
+        (VALIDATION_OK, _('Ok')),
+        (VALIDATION_FAILED, _('Failed')),
+    ]
+
     class Meta:
         verbose_name = _('Video')
         verbose_name_plural = _('Videos')
@@ -1294,6 +1416,37 @@ class StoryVideo(StoryMedia):
         help_text=_('the part of the url that identifies this particular video')
     )
 
+    validation_status = models.PositiveSmallIntegerField(
+        verbose_name=_('validation status'),
+        help_text=_('Checked with the video host in the background.'),
+        choices=VALIDATION_CHOICES,
+        default=VALIDATION_PENDING,
+        editable=False,
+    )
+
+    title = models.CharField(
+        max_length=500,
+        blank=True,
+        editable=False,
+        help_text=_('title from the video host.'),
+        verbose_name=_('title'),
+    )
+
+    thumbnail_url = models.URLField(
+        max_length=500,
+        blank=True,
+        editable=False,
+        help_text=_('thumbnail image from the video host.'),
+        verbose_name=_('thumbnail url'),
+    )
+
+    video_ratio = models.FloatField(
+        blank=True, null=True,
+        editable=False,
+        help_text=_('height / width of the video from the video host.'),
+        verbose_name=_('video ratio'),
+    )
+
     def embed(self, width="100%", height="auto"):
         """ Returns html embed code """
         if self.video_host == 'vimeo':
@@ -1326,49 +1479,41 @@ class StoryVideo(StoryMedia):
         )
 
     @classmethod
-    def create_from_url(cls, url, parent_story):
-        """ create video object from input url """
+    def parse_url(cls, url):
+        """ Video host and host video id of an url, or None. """
         # url formats:
         # https://www.youtube.com/watch?v=roHl3PJsZPk
         # http://youtu.be/roHl3PJsZPk
-            # http://vimeo.com/105149174
-
-        def check_link(url, method='head', timeout=2):
-            """ Does a http request to check the status of the url. """
-            # TODO: check_link() er omtrent lik som metode med samme navn i
-            # InlineLink
-            try:
-                status_code = str(
-                    request(
-                        method,
-                        url,
-                        timeout=timeout).status_code)
-            except Timeout:
-                status_code = 408  # HTTP Timout
-            except MissingSchema:
-                status_code = 0  # not a HTTP url
-            return status_code
-
-        for host in cls.VIDEO_HOSTS:
-            hostname = host[0]
+        # http://vimeo.com/105149174
+        for hostname, label in cls.VIDEO_HOSTS:
             if hostname in url:
-                video_host = hostname
                 break
         else:
-            video_host = None
+            return None
+        match = re.search(r'[?&]v=([\w-]+)', url) or re.search(
+            r'([\w-]+)/?$', url)
+        if not match:
+            return None
+        return hostname, match.group(1)
 
-        if not check_link(url) == 200:
+    @classmethod
+    def create_from_url(cls, url, parent_story):
+        """
+        Create video object from input url. The video is validated later,
+        by the `validate_videos` management command.
+        """
+        parsed = cls.parse_url(url)
+        if parsed is None:
             # something is wrong with the url?
             return None
-
-        id_regex = r'[a-zA-Z0-9]+$'
-        host_video_id = re.search(id_regex, url)
+        video_host, host_video_id = parsed
 
         try:
             new_video = cls(
                 parent_story=parent_story,
                 video_host=video_host,
                 host_video_id=host_video_id,
+                validation_status=cls.VALIDATION_PENDING,
             )
 
             new_video.save()
@@ -1377,20 +1522,67 @@ class StoryVideo(StoryMedia):
             logger.debug(e)
             return None
 
+    def original_ratio(self):
+        return self.video_ratio or super().original_ratio()
+
+    def save(self, *args, **kwargs):
+        if self.pk and not StoryVideo.objects.filter(
+                pk=self.pk,
+                video_host=self.video_host,
+                host_video_id=self.host_video_id).exists():
+            # Another video. Validate it again.
+            self.validation_status = self.VALIDATION_PENDING
+        super().save(*args, **kwargs)
+
+
+class LinkResolver(object):
+
+    """ Replaces markup tags of many links in a single pass. """
+
+    def __init__(self, links):
+        self.links = {}
+        for link in links:
+            self.links.setdefault(link.get_tag(), link)
+        # Longest tags first, if one tag is part of another.
+        tags = sorted(self.links, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(tag) for tag in tags))
+        self._html = {}
+        self._urls = {}
+
+    def replace(self, text, replacements, make_replacement):
+        if not self.links:
+            return text
+
+        def replace_tag(match):
+            tag = match.group(0)
+            if tag not in replacements:
+                replacements[tag] = make_replacement(self.links[tag])
+            return replacements[tag]
+        return self.pattern.sub(replace_tag, text)
+
+    def markup_to_html(self, text):
+        """ replace markup version of tags with html version """
+        return self.replace(text, self._html, lambda link: link.get_html())
+
+    def insert_urls(self, text):
+        """ insert urls as reference in links """
+        return self.replace(
+            text, self._urls, lambda link: link.get_tag(ref=link.link))
+
 
 class InlineLinkManager(models.Manager):
 
+    def resolver(self):
+        """ A LinkResolver for these links, loaded with a single query. """
+        return LinkResolver(self.select_related('linked_story'))
+
     def markup_to_html(self, text):
         """ replace markup version of tag with html version """
-        for link in self.all():
-            text = link.markup_to_html(text)
-        return text
+        return self.resolver().markup_to_html(text)
 
     def insert_urls(self, text):
         """ insert url as reference in link """
-        for link in self.all():
-            text = link.insert_url(text)
-        return text
+        return self.resolver().insert_urls(text)
 
 
 class InlineLink(TimeStampedModel):
@@ -1402,6 +1594,7 @@ class InlineLink(TimeStampedModel):
     find_pattern = '\[(?P<text>.+?)\]\((?P<ref>\S+?)\)'
     change_pattern = '[{text}]({ref})'
     html_pattern = '<a href="{href}" alt="{alt}">{text}</a>'
+    internal_link_pattern = r'universitas.no/.+?/(?P<id>\d+)/'
     objects = InlineLinkManager()
 
     class Meta:
@@ -1494,7 +1687,7 @@ class InlineLink(TimeStampedModel):
 
         if not self.linked_story:
             try:
-                match = re.search(r'universitas.no/.+?/(?P<id>\d+)/', self.href)
+                match = re.search(self.internal_link_pattern, self.href)
                 story_id = int(match.group('id'))
                 self.linked_story = Story.objects.get(pk=story_id)
             except (AttributeError, ObjectDoesNotExist):
@@ -1504,6 +1697,24 @@ class InlineLink(TimeStampedModel):
         self.alt_text = self.linked_story.title
         return self.linked_story
 
+    @classmethod
+    def find_linked_stories(cls, links):
+        """ Like find_linked_story, with a single query for many links. """
+        story_ids = []
+        for link in links:
+            if not link.href or link.linked_story_id:
+                continue
+            match = re.search(cls.internal_link_pattern, link.href)
+            if match:
+                story_ids.append((link, int(match.group('id'))))
+        stories = Story.objects.in_bulk({pk for link, pk in story_ids})
+        for link, story_id in story_ids:
+            story = stories.get(story_id)
+            if story:
+                link.linked_story = story
+                link.href = ''
+                link.alt_text = story.title
+
     def save(self, *args, **kwargs):
         self.find_linked_story()
         super().save(*args, **kwargs)
@@ -1551,39 +1762,59 @@ class InlineLink(TimeStampedModel):
         Return text with updated markup for the changed links.
         """
         body = cls.convert_html_links(body)
-        found_links = re.finditer(cls.find_pattern, body)
-        queryset = parent_story.links()
+        if not re.search(cls.find_pattern, body):
+            return body
 
-        number = queryset.count() + 1
-        for match in found_links:
+        # Existing links by number. New and renumbered links are added here,
+        # so later references to the same number find them.
+        links_by_number = defaultdict(list)
+        for link in parent_story.links().order_by('pk'):
+            links_by_number[link.number].append(link)
+        number = sum(len(links) for links in links_by_number.values()) + 1
+        new_links = []
+        changed_links = {}
+        replacements = {}
+
+        def replace_link(match):
+            nonlocal number
+            original_markup = match.group(0)
+            if original_markup in replacements:
+                # Same markup as an earlier link.
+                return replacements[original_markup]
             ref = match.group('ref')
             text = match.group('text')
-            original_markup = re.escape(match.group(0))
             new_markup = []
 
             if re.match(r'^\d+$', ref):
                 # ref is an integer
                 ref = int(ref)
-                links = queryset.filter(number=ref)
+                links = links_by_number[ref]
                 if not links:
-                    link = cls.objects.create(
+                    link = cls(
                         number=ref,
                         parent_story=parent_story,
+                        text=text,
                     )
+                    new_links.append(link)
+                    links.append(link)
                 else:
                     link = links[0]
                     if link.text != text:
                         link.text = text
-                        link.save()
+                        if link.pk:
+                            changed_links[link.pk] = link
 
                     for otherlink in links[1:]:
                         otherlink.number = number
-                        otherlink.save()
+                        links_by_number[number].append(otherlink)
+                        if otherlink.pk:
+                            changed_links[otherlink.pk] = otherlink
                         number += 1
                         msg = 'multiple links with same ref: ({0}) {1} {2}'
                         msg = msg.format(ref, link, otherlink)
                         logger.warn(msg)
                         new_markup.append(otherlink.get_tag())
+                    del links[1:]
 
             else:
                 # ref is a url
@@ -1594,13 +1825,27 @@ class InlineLink(TimeStampedModel):
                     alt_text=text,
                     text=text,
                 )
+                new_links.append(link)
+                links_by_number[number].append(link)
                 number += 1
-                link.save()
 
             new_markup = [link.get_tag()] + new_markup
             new_markup = ' '.join(new_markup)
-
-            body = re.sub(original_markup, new_markup, body)
+            replacements[original_markup] = new_markup
+            return new_markup
+
+        body = re.sub(cls.find_pattern, replace_link, body)
+
+        with transaction.atomic():
+            cls.find_linked_stories(new_links)
+            cls.objects.bulk_create(new_links)
+            for link in changed_links.values():
+                cls.objects.filter(pk=link.pk).update(
+                    number=link.number,
+                    text=link.text,
+                )
+        # The links have changed.
+        parent_story._link_resolver = None
         return body
 
     @classmethod
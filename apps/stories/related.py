@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Related stories from precomputed TF-IDF vectors.
+
+The vectors are built offline by the `related_stories` management command and
+saved to settings.RELATED_STORIES_FILE. Neighbours are stored as RelatedStory
+rows, so article views only need a single indexed lookup.
+"""
+import math
+import re
+import logging
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+
+from apps.stories.models import Story, RelatedStory
+
+logger = logging.getLogger('universitas')
+
+# Number of stories to compare in each matrix product.
+BATCH_SIZE = 200
+# Ignore words that are too rare or too common to say anything about a story.
+MIN_DOCUMENT_FREQUENCY = 2
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+RE_MARKUP_TAG = re.compile(r'^@[^:\n]*:', flags=re.M)
+RE_WORD = re.compile(r'[^\W\d_]{3,}')
+
+
+def story_texts(queryset):
+    """ Yields (pk, plaintext) for each story in the queryset. """
+    fields = ('pk', 'title', 'kicker', 'lede', 'theme_word', 'bodytext_markup')
+    for row in queryset.values_list(*fields).iterator():
+        text = '\n'.join(value for value in row[1:] if value)
+        yield row[0], RE_MARKUP_TAG.sub('', text)
+
+
+def tokenize(text):
+    """ Word counts of a text. """
+    return Counter(RE_WORD.findall(text.lower()))
+
+
+def vectorize(documents, vocabulary, idf):
+    """ Normalized tf-idf row vectors for a list of word counts. """
+    rows, columns, values = [], [], []
+    for row, document in enumerate(documents):
+        for word, count in document.items():
+            column = vocabulary.get(word)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                values.append(1 + math.log(count))
+    matrix = sparse.csr_matrix(
+        (values, (rows, columns)),
+        shape=(len(documents), len(vocabulary)),
+        dtype=np.float32,
+    )
+    matrix = matrix * sparse.diags(idf, 0)
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms, 0) * matrix
+
+
+def top_neighbours(scores, ids, exclude_ids, number):
+    """ The most similar ids for each row of a dense score matrix. """
+    neighbours = []
+    for row, exclude_id in zip(scores, exclude_ids):
+        row[ids == exclude_id] = 0
+        if number < len(row):
+            candidates = np.argpartition(-row, number)[:number]
+        else:
+            candidates = np.arange(len(row))
+        candidates = candidates[np.argsort(-row[candidates])]
+        neighbours.append([
+            (int(ids[index]), float(row[index]))
+            for index in candidates if row[index] > 0
+        ])
+    return neighbours
+
+
+class TfidfModel:
+
+    """ Tf-idf vectors of all published stories. """
+
+    def __init__(self, story_ids, vectors, words, idf):
+        self.story_ids = np.asarray(story_ids, dtype=np.int64)
+        self.vectors = vectors.tocsr()
+        self.words = list(words)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.vocabulary = {word: index for index, word in enumerate(self.words)}
+
+    @classmethod
+    def build(cls, texts):
+        """ Build model from an iterable of (pk, plaintext). """
+        story_ids, documents = [], []
+        for pk, text in texts:
+            story_ids.append(pk)
+            documents.append(tokenize(text))
+        document_frequency = Counter()
+        for document in documents:
+            document_frequency.update(document.keys())
+        max_frequency = max(MIN_DOCUMENT_FREQUENCY,
+                            MAX_DOCUMENT_FREQUENCY * len(documents))
+        words = sorted(
+            word for word, frequency in document_frequency.items()
+            if MIN_DOCUMENT_FREQUENCY <= frequency <= max_frequency)
+        idf = np.array([
+            math.log(len(documents) / document_frequency[word]) + 1
+            for word in words], dtype=np.float32)
+        vocabulary = {word: index for index, word in enumerate(words)}
+        vectors = vectorize(documents, vocabulary, idf)
+        return cls(story_ids, vectors, words, idf)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        vectors = sparse.csr_matrix(
+            (data['data'], data['indices'], data['indptr']),
+            shape=tuple(data['shape']),
+        )
+        return cls(data['story_ids'], vectors, data['words'], data['idf'])
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            story_ids=self.story_ids,
+            data=self.vectors.data,
+            indices=self.vectors.indices,
+            indptr=self.vectors.indptr,
+            shape=np.array(self.vectors.shape),
+            words=np.array(self.words),
+            idf=self.idf,
+        )
+
+    def neighbours(self, vectors, story_ids, number):
+        """ Top neighbours in this model for each of the given vectors. """
+        neighbours = []
+        for start in range(0, vectors.shape[0], BATCH_SIZE):
+            batch = vectors[start:start + BATCH_SIZE]
+            scores = (batch * self.vectors.T).toarray()
+            neighbours += top_neighbours(
+                scores, self.story_ids,
+                story_ids[start:start + BATCH_SIZE], number)
+        return neighbours
+
+    def add(self, texts):
+        """ Add new stories, keeping the vocabulary. Returns the new vectors. """
+        story_ids, documents = [], []
+        for pk, text in texts:
+            story_ids.append(pk)
+            documents.append(tokenize(text))
+        vectors = vectorize(documents, self.vocabulary, self.idf)
+        self.story_ids = np.concatenate(
+            [self.story_ids, np.asarray(story_ids, dtype=np.int64)])
+        self.vectors = sparse.vstack([self.vectors, vectors]).tocsr()
+        return story_ids, vectors
+
+
+def save_related(neighbours_by_story, replace_all=False):
+    """ Replace the stored related stories for the given stories. """
+    story_ids = list(neighbours_by_story)
+    with transaction.atomic():
+        if replace_all:
+            RelatedStory.objects.all().delete()
+        else:
+            for start in range(0, len(story_ids), BATCH_SIZE):
+                RelatedStory.objects.filter(
+                    story_id__in=story_ids[start:start + BATCH_SIZE]).delete()
+        RelatedStory.objects.bulk_create([
+            RelatedStory(
+                story_id=story_id,
+                related_story_id=related_id,
+                score=score,
+            )
+            for story_id, neighbours in neighbours_by_story.items()
+            for related_id, score in neighbours
+        ], batch_size=1000)
+
+
+def rebuild(number=RelatedStory.RELATED_COUNT):
+    """ Build a new model and neighbours for all published stories. """
+    model = TfidfModel.build(story_texts(Story.objects.published()))
+    neighbours = model.neighbours(model.vectors, model.story_ids, number)
+    save_related(
+        dict(zip(model.story_ids.tolist(), neighbours)), replace_all=True)
+    logger.info('Related stories: built model of {} stories and {} words'.format(
+        len(model.story_ids), len(model.words)))
+    return model
+
+
+def update(model, number=RelatedStory.RELATED_COUNT):
+    """
+    Fold newly published stories into an existing model.
+
+    New stories get neighbours among all stories in the model, and older
+    stories get a new story as a neighbour if it beats their weakest one.
+    The vocabulary and idf weights are kept until the next rebuild.
+    """
+    old_ids = model.story_ids
+    new_stories = Story.objects.published().exclude(pk__in=old_ids.tolist())
+    texts = list(story_texts(new_stories))
+    if not texts:
+        return []
+    new_ids, new_vectors = model.add(texts)
+    new_ids = np.asarray(new_ids, dtype=np.int64)
+    related = dict(zip(
+        new_ids.tolist(), model.neighbours(new_vectors, new_ids, number)))
+
+    # Scores of old stories against the new ones.
+    old_vectors = model.vectors[:len(old_ids)]
+    scores = (old_vectors * new_vectors.T).toarray()
+    candidates = np.flatnonzero(scores.max(axis=1) > 0)
+    stored = {}
+    for link in RelatedStory.objects.filter(
+            story_id__in=old_ids[candidates].tolist()).values_list(
+            'story_id', 'related_story_id', 'score'):
+        stored.setdefault(link[0], []).append(link[1:])
+    for index in candidates:
+        story_id = int(old_ids[index])
+        current = stored.get(story_id, [])
+        merged = current + [
+            (int(new_id), float(score))
+            for new_id, score in zip(new_ids, scores[index]) if score > 0]
+        merged = sorted(merged, key=lambda link: -link[1])[:number]
+        if merged != sorted(current, key=lambda link: -link[1])[:number]:
+            related[story_id] = merged
+    save_related(related)
+    logger.info('Related stories: added {} stories, updated {}'.format(
+        len(new_ids), len(related)))
+    return new_ids.tolist()
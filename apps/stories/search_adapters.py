@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+""" Search index adapters for stories. """
+
+from django.utils import timezone
+from watson import SearchAdapter
+
+
+class StorySearchAdapter(SearchAdapter):
+
+    """ Search adapter for Story. """
+
+    # Page view counters and the cached html rendering of the markup.
+    skip_update_fields = ('hit_count', 'hot_count', 'bodytext_html')
+
+    def get_batch_queryset(self, queryset):
+        # get_facets() needs the section through the story type.
+        return queryset.select_related('story_type__section')
+
+    def get_facets(self, obj):
+        """ Section, story type and publication year for faceted search. """
+        story_type = obj.story_type
+        year = None
+        if obj.publication_date:
+            year = timezone.localtime(obj.publication_date).year
+        return {
+            'section': story_type.section.slug,
+            'type': story_type.slug,
+            'year': year,
+        }
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Golden output of clean_up_bylines for the byline cases in notebooks/bylines.txt,
+notebooks/bylines2.txt and notebooks/byline_cases.py.
+
+Made with the regular expressions in apps/stories/bylines.py before they were
+precompiled. Any change in output is a regression, or must be a deliberate
+change to this file.
+"""
+
+BYLINE_GOLDEN = [  # List of cases: ( "Input string", "Output" )
+    (
+        "Mike Fürstenberg, Kulturkonsulent i Studentliv, Studentsamskipnaden i Oslo og Akershus",
+        "by: Mike Fürstenberg, Kulturkonsulent i Studentliv, Studentsamskipnaden i Oslo og Akershus",
+    ),
+    (
+        "Thea Marie Astrup • Skjalg Bøhmer Vold (foto)",
+        "text: Thea Marie Astrup\nphoto: Skjalg Bøhmer Vold",
+    ),
+    (
+        "Geir Molnes • Sébastian Dahl (Foto)",
+        "text: Geir Molnes\nphoto: Sébastian Dahl",
+    ),
+    (
+        "Espen Mikkelsen, Styreleder Erasmus Student Network UiO",
+        "by: Espen Mikkelsen, Styreleder Erasmus Student Network UiO",
+    ),
+    (
+        "Amanda Schei og Ingrid Keenan, Liberal liste",
+        "by: Amanda Schei\nby: Ingrid Keenan, Liberal liste",
+    ),
+    (
+        "Fredrik Morberg, leder SBIO",
+        "by: Fredrik Morberg, leder SBIO",
+    ),
+    (
+        "Himanshu Gulati, Formann i Fremskrittspartiets Ungdom (FpU)",
+        "by: Himanshu Gulati, Formann i Fremskrittspartiets Ungdom (FpU)",
+    ),
+    (
+        "Tine Tång Engvik, Nestleder Blindern SV",
+        "by: Tine Tång Engvik, Nestleder Blindern SV",
+    ),
+    (
+        "Edle Ravndal, professor, dr. philos., Senter for rus og avhengighetsforskning (SERAF)",
+        "by: Edle Ravndal, professor, dr. philos., Senter for rus og avhengighetsforskning (SERAF)",
+    ),
+    (
+        "Eirin Nordal, internasjonalt ansvarlig i NSO og Jorid Martinsen, Velferds- og likestillingsansvarlig i NSO",
+        "by: Eirin Nordal, internasjonalt ansvarlig i NSO\nby: Jorid Martinsen, Velferds- og likestillingsansvarlig i NSO",
+    ),
+    (
+        "Jon Skogdal, tidl. ingeniørstudent ved HiOA, nå student ved UiO",
+        "by: Jon Skogdal, tidl. ingeniørstudent ved HiOA, nå student ved UiO",
+    ),
+    (
+        "Aksel Braanen Sterri, tidligere studentpolitiker og forfatter av _Tilbake til politikken: Hvordan Arbeiderpartiet igjen skal bli folkets parti_",
+        "by: Aksel Braanen Sterri, tidligere studentpolitiker og forfatter av Tilbake til politikken: Hvordan Arbeiderpartiet igjen skal bli folkets parti",
+    ),
+    (
+        "*Eirik Billingsø Elvevold (tekst) _e.b.elvevold@universitas.no_ • Birte Nystad Mangussen (foto)*",
+        "text: Eirik Billingsø Elvevold\nphoto: Birte Nystad Mangussen",
+    ),
+    (
+        "*Petter Fløttum _petter.flottum@universitas.no_*",
+        "by: Petter Fløttum",
+    ),
+    (
+        "*Petter Fløttum og Ingrid Elise Gipling _petter.flottum@gmail.com_*",
+        "by: Petter Fløttum\nby: Ingrid Elise Gipling",
+    ),
+    (
+        "*Jana Aleksic (master student at UiO)*",
+        "by: Jana Aleksic (master student at UiO)",
+    ),
+    (
+        "*Sigurd Oland Nedrelid (tekst) • Hans Dalane-Hval (arkivfoto)*",
+        "text: Sigurd Oland Nedrelid\nphoto: Hans Dalane-Hval",
+    ),
+    (
+        "*Stian Valla Taraldsvik, student, Queen Mary University of London*",
+        "by: Stian Valla Taraldsvik, student ved Queen Mary University of London",
+    ),
+    (
+        "*Hans Dalane-Hval (foto og video) og Ingrid Elise Gipling (tekst)*",
+        "photo and video: Hans Dalane-Hval\ntext: Ingrid Elise Gipling",
+    ),
+    (
+        "*Skrevet av: Hilde Vinje, masterstudent i klassiske språk, Vilde Mortensdatter Horvei, masterstudent i kunsthistorie, Britt Medalen Nilsen, masterstudent i idéhistorie og Bendik Hellem Aaby, masterstudent i filosofi*",
+        "by: Hilde Vinje, masterstudent i klassiske språk\nby: Vilde Mortensdatter Horvei, masterstudent i kunsthistorie\nby: Britt Medalen Nilsen, masterstudent i idéhistorie\nby: Bendik Hellem Aaby, masterstudent i filosofi",
+    ),
+    (
+        "*Magnus Newth (text) mgnewth@universitas.no • Dorthe Karlsen (photography)*",
+        "text: Magnus Newth\nphoto: Dorthe Karlsen",
+    ),
+    (
+        "Truls Oftedal Ellingsen, leder Econa, Handelshøyskolen BI",
+        "by: Truls Oftedal Ellingsen, leder Econa, Handelshøyskolen BI",
+    ),
+    (
+        "Matthis Kleeb Solheim, fotograf i Universitas",
+        "by: Matthis Kleeb Solheim, fotograf i Universitas",
+    ),
+    (
+        "Geir Molnes (tekst), Patrick da Silva Sæther (foto)",
+        "text: Geir Molnes\nphoto: Patrick da Silva Sæther",
+    ),
+    (
+        "*I SØR-AFRIKA: Oda Kristin Korneliussen (tekst og foto)*",
+        "text and photo: Oda Kristin Korneliussen, I SØR-AFRIKA",
+    ),
+    (
+        "*_PÅ VESTBREDDEN:_ Camilla Kleiberg Jensen (tekst og foto)*",
+        "text and photo: Camilla Kleiberg Jensen, PÅ VESTBREDDEN",
+    ),
+    (
+        "*Kristina Holt (tekst og foto)*",
+        "text and photo: Kristina Holt",
+    ),
+    (
+        "I Egypt: Sunniva Rebekka Skjeggestad (tekst og foto)",
+        "text and photo: Sunniva Rebekka Skjeggestad, I Egypt",
+    ),
+    (
+        "tekst og foto Eskil Wie og Frode Nagel Dahl",
+        "text and photo: Eskil Wie\ntext and photo: Frode Nagel Dahl",
+    ),
+    (
+        "Anders Ballangrud – Birte Nystad Magnussen (foto)",
+        "text: Anders Ballangrud\nphoto: Birte Nystad Magnussen",
+    ),
+    (
+        "En matglad Universitas-redaksjon (tekst + småfoto), Birte Nystad Magnussen (hovedbilde)",
+        "text: + småfoto: En matglad Universitas-redaksjon\nby: Birte Nystad Magnussen (hovedbilde)",
+    ),
+    (
+        "Ingvild Sagmoen (tekst), Jenny Dahl Bakken (tekst) Geir Molnes (tekst) • Skjalg Bøhmer Vold (foto)",
+        "text: Ingvild Sagmoen\ntext: Jenny Dahl Bakken\ntext: Geir Molnes\nphoto: Skjalg Bøhmer Vold",
+    ),
+]
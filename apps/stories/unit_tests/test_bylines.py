@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Golden output tests of the byline cleanup.
+"""
+from django.test import SimpleTestCase
+from apps.stories.bylines import clean_up_bylines, clean_up_bylines_many
+from apps.stories.unit_tests.byline_golden import BYLINE_GOLDEN
+
+
+class CleanUpBylinesTest(SimpleTestCase):
+
+    def test_golden_output(self):
+        for raw, expected in BYLINE_GOLDEN:
+            self.assertEqual(clean_up_bylines(raw, log=False), expected)
+
+    def test_many(self):
+        raw_bylines = [raw for raw, expected in BYLINE_GOLDEN]
+        expected = [expected for raw, expected in BYLINE_GOLDEN]
+        self.assertEqual(
+            clean_up_bylines_many(iter(raw_bylines), log=False), expected)
+
+    def test_many_with_workers(self):
+        raw_bylines = [raw for raw, expected in BYLINE_GOLDEN] * 4
+        expected = [expected for raw, expected in BYLINE_GOLDEN] * 4
+        self.assertEqual(
+            clean_up_bylines_many(raw_bylines, workers=2, log=False),
+            expected)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of stored canonical paths of stories.
+"""
+from django.test import TestCase
+from django.test.utils import override_settings
+from apps.stories.models import Section, Story, StoryType
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CanonicalPathTest(TestCase):
+
+    def setUp(self):
+        self.section = Section.objects.create(title='Testseksjon')
+        self.other_section = Section.objects.create(title='Andre saker')
+        self.story_type = StoryType.objects.create(
+            name='Testsak', section=self.section)
+        self.other_type = StoryType.objects.create(
+            name='Annen sak', section=self.other_section)
+        self.stories = [
+            Story.objects.create(title=title, story_type=self.story_type)
+            for title in ['Katt og hund', 'Bil og buss']]
+        self.other_story = Story.objects.create(
+            title='Fisk', story_type=self.other_type)
+
+    def paths(self):
+        return {
+            story.pk: story.canonical_path
+            for story in Story.objects.all()}
+
+    def assertPathsAreCurrent(self):
+        for story in Story.objects.all():
+            self.assertEqual(story.canonical_path, story.make_canonical_path())
+
+    def test_new_story(self):
+        story = Story.objects.get(pk=self.stories[0].pk)
+        self.assertEqual(
+            story.canonical_path,
+            '/testseksjon/{}/katt-og-hund/'.format(story.pk))
+        self.assertEqual(story.get_absolute_url(), story.canonical_path)
+
+    def test_rename_section(self):
+        other_path = self.other_story.canonical_path
+        self.section.title = 'Ny seksjon'
+        self.section.save()
+        self.assertEqual(self.section.slug, 'ny-seksjon')
+        paths = self.paths()
+        for story in self.stories:
+            self.assertEqual(
+                paths[story.pk],
+                '/ny-seksjon/{}/{}/'.format(story.pk, story.slug))
+        self.assertEqual(paths[self.other_story.pk], other_path)
+        self.assertPathsAreCurrent()
+
+    def test_move_story_type(self):
+        self.story_type.section = self.other_section
+        self.story_type.save()
+        paths = self.paths()
+        for story in self.stories:
+            self.assertTrue(paths[story.pk].startswith('/andre-saker/'))
+        self.assertPathsAreCurrent()
+
+    def test_move_canonical_paths(self):
+        changed = Story.objects.filter(
+            pk=self.stories[0].pk,
+        ).move_canonical_paths('/testseksjon/', '/arkiv/testseksjon/')
+        self.assertEqual(changed, 1)
+        paths = self.paths()
+        self.assertEqual(
+            paths[self.stories[0].pk],
+            '/arkiv/testseksjon/{}/katt-og-hund/'.format(self.stories[0].pk))
+        self.assertTrue(paths[self.stories[1].pk].startswith('/testseksjon/'))
+        self.assertEqual(
+            Story.objects.all().move_canonical_paths(
+                '/testseksjon/', '/testseksjon/'), 0)
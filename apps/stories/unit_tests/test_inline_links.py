@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of inline link markup.
+"""
+from django.test import TestCase
+from django.test.utils import override_settings
+from apps.stories.models import InlineLink, Section, Story, StoryType
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CleanAndCreateLinksTest(TestCase):
+
+    def setUp(self):
+        section = Section.objects.create(title='Testseksjon')
+        story_type = StoryType.objects.create(name='Testsak', section=section)
+        self.story = Story.objects.create(title='Lenker', story_type=story_type)
+        self.other_story = Story.objects.create(
+            title='Annen sak', story_type=story_type)
+
+    def clean(self, body):
+        return InlineLink.clean_and_create_links(body, self.story)
+
+    def links(self):
+        return {
+            link.number: link for link in
+            InlineLink.objects.filter(parent_story=self.story)}
+
+    def create_link(self, number, text, href):
+        return InlineLink.objects.create(
+            parent_story=self.story, number=number, text=text, href=href)
+
+    def test_no_links(self):
+        self.assertEqual(self.clean('Ingen lenker her.'), 'Ingen lenker her.')
+        self.assertEqual(self.links(), {})
+
+    def test_url_links(self):
+        body = self.clean(
+            'Se [Universitas](http://example.com/) og [VG](http://vg.no/).')
+        self.assertEqual(body, 'Se [Universitas](1) og [VG](2).')
+        links = self.links()
+        self.assertEqual(sorted(links), [1, 2])
+        self.assertEqual(links[1].href, 'http://example.com/')
+        self.assertEqual(links[1].text, 'Universitas')
+        self.assertEqual(links[1].alt_text, 'Universitas')
+        self.assertEqual(links[2].href, 'http://vg.no/')
+
+    def test_url_links_get_next_free_number(self):
+        self.create_link(1, 'A', 'http://a.no/')
+        self.create_link(2, 'B', 'http://b.no/')
+        self.assertEqual(self.clean('[C](http://c.no/)'), '[C](3)')
+        self.assertEqual(self.links()[3].href, 'http://c.no/')
+
+    def test_repeated_url_link(self):
+        body = self.clean('[X](http://x.no/) og [X](http://x.no/)')
+        self.assertEqual(body, '[X](1) og [X](1)')
+        self.assertEqual(sorted(self.links()), [1])
+
+    def test_number_of_missing_link(self):
+        self.assertEqual(self.clean('[Tekst](3)'), '[Tekst](3)')
+        links = self.links()
+        self.assertEqual(sorted(links), [3])
+        self.assertEqual(links[3].text, 'Tekst')
+        self.assertEqual(links[3].href, '')
+
+    def test_number_of_existing_link(self):
+        link = self.create_link(1, 'Gammel', 'http://a.no/')
+        self.assertEqual(self.clean('[Ny](1)'), '[Ny](1)')
+        links = self.links()
+        self.assertEqual(sorted(links), [1])
+        self.assertEqual(links[1].pk, link.pk)
+        self.assertEqual(links[1].text, 'Ny')
+
+    def test_duplicate_numbers(self):
+        first = self.create_link(1, 'A', 'http://a.no/')
+        second = self.create_link(1, 'B', 'http://b.no/')
+        # The second link with the same number gets the next free number.
+        self.assertEqual(self.clean('[A](1)'), '[A](1) [B](3)')
+        links = self.links()
+        self.assertEqual(sorted(links), [1, 3])
+        self.assertEqual(links[1].pk, first.pk)
+        self.assertEqual(links[3].pk, second.pk)
+        # Later references to the number find the first link.
+        self.assertEqual(self.clean('[A](1)'), '[A](1)')
+
+    def test_internal_link(self):
+        url = 'http://universitas.no/testseksjon/{}/annen-sak/'.format(
+            self.other_story.pk)
+        self.assertEqual(self.clean('[Sak]({})'.format(url)), '[Sak](1)')
+        link = self.links()[1]
+        self.assertEqual(link.linked_story_id, self.other_story.pk)
+        self.assertEqual(link.href, '')
+        self.assertEqual(link.alt_text, 'Annen sak')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the link checker, with a local stub http server.
+"""
+import socket
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from django.test import SimpleTestCase
+from apps.stories.link_checker import LinkChecker
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    """ Simulates slow, redirecting and dead pages. """
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path == '/slow':
+                time.sleep(1)
+            if self.path == '/gone' and self.command == 'HEAD':
+                self.send_response(410)
+            elif self.path in ('/moved', '/gone'):
+                self.send_response(301)
+                self.send_header('Location', '/ok')
+            elif self.path == '/error':
+                self.send_response(503)
+            elif self.path == '/huge-header':
+                # Longer than the line limit of asyncio stream readers.
+                self.send_response(200)
+                self.send_header('X-Huge', 'x' * 70000)
+            else:
+                time.sleep(0.05)
+                self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    do_HEAD = do_GET = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def unused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class LinkCheckerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = self.server.max_active = 0
+        threading.Thread(target=self.server.serve_forever).start()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check(self, urls, **kwargs):
+        kwargs.setdefault('delay', 0)
+        return LinkChecker(timeout=0.5, **kwargs).check_urls(urls)
+
+    def test_status_codes(self):
+        dead = 'http://127.0.0.1:{}/ok'.format(unused_port())
+        urls = {
+            '/ok': '200',
+            '/moved': '301',
+            '/gone': '200',
+            '/error': '500',
+            '/slow': '408',
+            '/huge-header': '500',
+        }
+        result = self.check([self.base + path for path in urls] + [
+            dead, 'ftp://example.com/'])
+        for path, status_code in urls.items():
+            self.assertEqual(result[self.base + path], status_code)
+        self.assertEqual(result[dead], 'DNS')
+        self.assertEqual(result['ftp://example.com/'], 'URL')
+
+    def test_duplicate_urls(self):
+        self.check([self.base + '/ok'] * 5)
+        self.assertEqual(self.server.requests, [('HEAD', '/ok')])
+
+    def test_per_host_limit(self):
+        urls = [self.base + '/ok?page={}'.format(page) for page in range(8)]
+        result = self.check(urls, per_host=2)
+        self.assertEqual(set(result.values()), {'200'})
+        self.assertLessEqual(self.server.max_active, 2)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of related stories.
+"""
+from django.test import SimpleTestCase
+from apps.stories.related import TfidfModel
+
+TEXTS = [
+    (1, '@tit: Katt og hund\n@txt: Katten jager fisk og hund.'),
+    (2, 'katt hund mus'),
+    (3, 'bil buss tog'),
+    (4, 'bil tog fly'),
+    (5, 'hund mus fisk'),
+]
+
+
+class TfidfModelTest(SimpleTestCase):
+
+    def test_neighbours(self):
+        model = TfidfModel.build(TEXTS)
+        neighbours = model.neighbours(model.vectors, model.story_ids, 2)
+        self.assertEqual([pk for pk, score in neighbours[2]], [4])
+        self.assertEqual(len(neighbours[1]), 2)
+        for story_neighbours, pk in zip(neighbours, model.story_ids):
+            self.assertNotIn(pk, [related for related, score in story_neighbours])
+
+    def test_add_keeps_vocabulary(self):
+        model = TfidfModel.build(TEXTS)
+        new_ids, vectors = model.add([(6, 'tog og bil og ukjent')])
+        self.assertEqual(model.vectors.shape, (6, len(model.words)))
+        self.assertNotIn('ukjent', model.vocabulary)
+        neighbours = model.neighbours(vectors, new_ids, 2)
+        self.assertEqual(sorted(pk for pk, score in neighbours[0]), [3, 4])
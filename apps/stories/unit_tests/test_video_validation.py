@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of video validation, with a local fake oEmbed server.
+"""
+import json
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from apps.stories.models import StoryVideo
+from apps.stories.video_validation import (
+    fetch_oembed, cache_fields, cached_fields)
+
+
+class FakeOembedHandler(BaseHTTPRequestHandler):
+
+    """ Answers like an oEmbed api, depending on the video id. """
+
+    def do_GET(self):
+        video_url = parse_qs(urlsplit(self.path).query)['url'][0]
+        body = b''
+        if video_url.endswith('missing'):
+            self.send_response(404)
+        elif video_url.endswith('private'):
+            self.send_response(403)
+        elif video_url.endswith('broken'):
+            self.send_response(200)
+            body = b'not json'
+        else:
+            if video_url.endswith('slow'):
+                time.sleep(1)
+            self.send_response(200)
+            body = json.dumps({
+                'type': 'video',
+                'title': 'Video {}'.format(video_url),
+                'thumbnail_url': 'http://example.com/thumb.jpg',
+                'width': 640,
+                'height': 360,
+            }).encode('utf-8')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOembedServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FetchOembedTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = FakeOembedServer(('127.0.0.1', 0), FakeOembedHandler)
+        threading.Thread(target=self.server.serve_forever).start()
+        endpoint = 'http://127.0.0.1:{}/oembed'.format(
+            self.server.server_port)
+        self.endpoints = {'vimeo': endpoint, 'youtu': endpoint}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, video_host, host_video_id):
+        key, fields = fetch_oembed(
+            (video_host, host_video_id), self.endpoints, timeout=0.5)
+        return fields
+
+    def test_valid_video(self):
+        fields = self.fetch('youtu', 'roHl3PJsZPk')
+        self.assertEqual(
+            fields['validation_status'], StoryVideo.VALIDATION_OK)
+        self.assertEqual(
+            fields['title'],
+            'Video https://www.youtube.com/watch?v=roHl3PJsZPk')
+        self.assertEqual(
+            fields['thumbnail_url'], 'http://example.com/thumb.jpg')
+        self.assertAlmostEqual(fields['video_ratio'], 360 / 640)
+
+    def test_missing_video(self):
+        for host_video_id in ['missing', 'private']:
+            fields = self.fetch('vimeo', host_video_id)
+            self.assertEqual(
+                fields['validation_status'], StoryVideo.VALIDATION_FAILED)
+
+    def test_try_again_later(self):
+        self.assertIsNone(self.fetch('vimeo', 'slow'))
+        self.assertIsNone(self.fetch('vimeo', 'broken'))
+
+    def test_unknown_host(self):
+        fields = self.fetch('dailymotion', '123')
+        self.assertEqual(
+            fields['validation_status'], StoryVideo.VALIDATION_FAILED)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheFieldsTest(SimpleTestCase):
+
+    def test_only_valid_videos_are_cached(self):
+        failed = {'validation_status': StoryVideo.VALIDATION_FAILED}
+        cache_fields(('vimeo', 'missing'), failed)
+        self.assertIsNone(cached_fields(('vimeo', 'missing')))
+        valid = {'validation_status': StoryVideo.VALIDATION_OK, 'title': 'x'}
+        cache_fields(('vimeo', '105149174'), valid)
+        self.assertEqual(cached_fields(('vimeo', '105149174')), valid)
+
+
+class ParseUrlTest(SimpleTestCase):
+
+    def test_parse_url(self):
+        self.assertEqual(
+            StoryVideo.parse_url('https://www.youtube.com/watch?v=roHl3PJsZPk'),
+            ('youtu', 'roHl3PJsZPk'))
+        self.assertEqual(
+            StoryVideo.parse_url('http://youtu.be/roHl3PJsZPk'),
+            ('youtu', 'roHl3PJsZPk'))
+        self.assertEqual(
+            StoryVideo.parse_url('http://vimeo.com/105149174'),
+            ('vimeo', '105149174'))
+        self.assertIsNone(StoryVideo.parse_url('http://example.com/123'))
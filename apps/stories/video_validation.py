@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Background validation of story videos.
+
+Videos are saved in a pending state, without contacting the video host. The
+`validate_videos` management command looks up pending videos with the oEmbed
+api of the video host, in a pool of threads. A video that exists gets the
+title, thumbnail and aspect ratio from the host, and a video that doesn't
+exist is marked as failed, and is not embedded in stories. Hosts that can't
+be reached are tried again next time. Valid answers from the host are cached
+per video id, so the same video in many stories is only looked up once.
+Failed answers are not cached, so failed videos are looked up again when
+they are retried.
+"""
+from collections import defaultdict
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+import requests
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import StoryVideo
+
+import logging
+logger = logging.getLogger('universitas')
+
+OEMBED_ENDPOINTS = {
+    'vimeo': 'https://vimeo.com/api/oembed.json',
+    'youtu': 'https://www.youtube.com/oembed',
+}
+VIDEO_URLS = {
+    'vimeo': 'https://vimeo.com/{}',
+    'youtu': 'https://www.youtube.com/watch?v={}',
+}
+# The video does not exist, or can't be embedded.
+FAILED_STATUS_CODES = (401, 403, 404)
+CACHE_KEY = 'stories.oembed.{}.{}'
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+TIMEOUT = 5
+THREADS = 8
+
+
+def fetch_oembed(key, endpoints=OEMBED_ENDPOINTS, timeout=TIMEOUT):
+    """
+    Video fields from the oEmbed api of the host, or None if the host can't
+    be reached. Runs in a worker thread.
+    """
+    video_host, host_video_id = key
+    if video_host not in endpoints:
+        return key, {'validation_status': StoryVideo.VALIDATION_FAILED}
+    try:
+        response = requests.get(
+            endpoints[video_host],
+            params={
+                'url': VIDEO_URLS[video_host].format(host_video_id),
+                'format': 'json',
+            },
+            timeout=timeout,
+        )
+    except requests.RequestException as error:
+        logger.debug('oEmbed lookup of {} failed: {}'.format(key, error))
+        return key, None
+    if response.status_code in FAILED_STATUS_CODES:
+        return key, {'validation_status': StoryVideo.VALIDATION_FAILED}
+    try:
+        response.raise_for_status()
+        data = response.json()
+    except (ValueError, requests.RequestException) as error:
+        logger.debug('oEmbed lookup of {} failed: {}'.format(key, error))
+        return key, None
+    fields = {
+        'validation_status': StoryVideo.VALIDATION_OK,
+        'title': (data.get('title') or '')[:500],
+        'thumbnail_url': (data.get('thumbnail_url') or '')[:500],
+        'video_ratio': None,
+    }
+    try:
+        fields['video_ratio'] = float(data['height']) / float(data['width'])
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        pass
+    return key, fields
+
+
+def pending_videos(retry_failed=False):
+    """ Pks of videos to validate, keyed by video host and id. """
+    status = [StoryVideo.VALIDATION_PENDING]
+    if retry_failed:
+        status.append(StoryVideo.VALIDATION_FAILED)
+    videos = defaultdict(list)
+    for pk, video_host, host_video_id in StoryVideo.objects.filter(
+            validation_status__in=status).values_list(
+            'pk', 'video_host', 'host_video_id'):
+        videos[video_host, host_video_id].append(pk)
+    return videos
+
+
+def cached_fields(key):
+    """ Cached fields of a valid video, or None. """
+    fields = cache.get(CACHE_KEY.format(*key))
+    if fields and fields['validation_status'] == StoryVideo.VALIDATION_OK:
+        return fields
+    return None
+
+
+def cache_fields(key, fields):
+    """ Cache fields of a valid video. """
+    if fields['validation_status'] == StoryVideo.VALIDATION_OK:
+        cache.set(CACHE_KEY.format(*key), fields, CACHE_TIMEOUT)
+
+
+def save_fields(key, pks, fields):
+    """ Update videos that still have the same host and id. """
+    video_host, host_video_id = key
+    StoryVideo.objects.filter(
+        pk__in=pks, video_host=video_host, host_video_id=host_video_id,
+    ).update(**fields)
+
+
+def validate_pending(threads=THREADS, retry_failed=False, use_cache=True,
+                     endpoints=OEMBED_ENDPOINTS, timeout=TIMEOUT):
+    """ Validate pending videos. Returns a dict of the new field values. """
+    videos = pending_videos(retry_failed)
+    if not videos:
+        return {}
+    started = timezone.now()
+    results = {}
+    lookups = []
+    for key, pks in videos.items():
+        fields = cached_fields(key) if use_cache else None
+        if fields is None:
+            lookups.append(key)
+        else:
+            save_fields(key, pks, fields)
+            results[key] = fields
+    if lookups:
+        fetch = partial(fetch_oembed, endpoints=endpoints, timeout=timeout)
+        pool = ThreadPool(min(threads, len(lookups)))
+        try:
+            for key, fields in pool.imap_unordered(fetch, lookups):
+                if fields is None:
+                    # Try again later.
+                    continue
+                cache_fields(key, fields)
+                save_fields(key, videos[key], fields)
+                results[key] = fields
+        finally:
+            pool.close()
+            pool.join()
+    logger.info('Validated {} of {} videos, {} looked up, in {}'.format(
+        len(results), len(videos), len(lookups), timezone.now() - started))
+    return results
@@ -0,0 +1,9 @@
+// Seed for stateless advert rotation. A random visitor id and a page view
+// counter, read by the server but only ever written here.
+(function(){
+  var name = 'ad_seed';
+  var match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([a-z0-9]+)\\.(\\d+)'));
+  var id = match ? match[1] : Math.random().toString(36).slice(2, 10);
+  var views = match ? (parseInt(match[2], 10) + 1) % 100000 : 0;
+  document.cookie = name + '=' + id + '.' + views + '; path=/; max-age=31536000';
+})();
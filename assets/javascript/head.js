@@ -1,2 +1,3 @@
 require('modernizr');
 require('./_google-analytics.js');
+require('./_ad-seed.js');
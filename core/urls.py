@@ -4,9 +4,10 @@ from django.conf.urls import patterns, include, url
 from django.contrib import admin
 from apps.core.views import RobotsTxtView, HumansTxtView
 from apps.search import urls as search_urls
+from apps.adverts import urls as advert_urls
 from apps.core.autocomplete_views import autocomplete_list
 from apps.frontpage.views import frontpage_view, section_frontpage, storytype_frontpage
-from apps.issues.views import PdfArchiveView, PubPlanView
+from apps.issues.views import PdfArchiveView, PrintPageView, PubPlanView
 from apps.stories.views import article_view
 from apps.stories.feeds import LatestStories
 from autocomplete_light import urls as autocomplete_light_urls
@@ -38,10 +39,14 @@ urlpatterns = [
     url(r'^annonser/$',
         TemplateView.as_view(template_name='advert-info.html'),
         name='ad_info',),
+    url(r'^annonser/', include(advert_urls, namespace='adverts')),
 
     url(r'^pdf/$',
         PdfArchiveView.as_view(),
         name='pdf_archive'),
+    url(r'^pdf/(?P<pk>\d+)/(?P<page_number>\d+)/$',
+        PrintPageView.as_view(),
+        name='pdf_page'),
     url(r'^utgivelsesplan/(?P<year>\d{4})/$',
         PubPlanView.as_view(),
         name='pub_plan'),
@@ -78,6 +78,26 @@ FILE_UPLOAD_PERMISSIONS = 0o664
 # Uncomment to enable original file names for resized images.
 # THUMBNAIL_BACKEND = 'apps.photo.custom_thumbnail_classes.KeepNameThumbnailBackend'
 
+# SEARCH INDEX
+# Set to 'watson.queues.RedisIndexQueue' to queue search index updates instead
+# of indexing on every save. Run `manage.py processwatsonqueue` to index them.
+WATSON_INDEX_QUEUE = None
+WATSON_REDIS_URL = 'redis://localhost:6379/1'
+# Seconds a queued object may be missing, such as in a long import transaction,
+# before it is assumed to be deleted.
+WATSON_INDEX_QUEUE_MISSING_TIMEOUT = 3600
+# Maintain a term dictionary for "did you mean" suggestions. The dictionary is
+# updated along with the search index.
+WATSON_SUGGESTIONS = True
+
+# ADVERTS
+# Impression and click counts are shared between processes in redis. Run
+# `manage.py flush_advert_counts` regularly to save them. The in-process
+# 'apps.adverts.tracking.LocalCounterBuffer' saves its own counts every minute
+# and at exit, and is only meant for development and tests.
+ADVERTS_COUNTER_BUFFER = 'apps.adverts.tracking.RedisCounterBuffer'
+ADVERTS_REDIS_URL = 'redis://localhost:6379/2'
+
 # DATABASE
 DATABASE_ROUTERS = ['apps.legacy_db.router.ProdsysRouter']
 DATABASES = {
@@ -135,6 +155,14 @@ FIXTURE_DIRS = [join_path(BASE_DIR, 'fixtures'), ]
 TEMPLATE_DIRS = [join_path(BASE_DIR, 'templates'), ]
 # Log files here
 LOG_FOLDER = join_path(PROJECT_DIR, 'logs')
+# Tf-idf model used by the related_stories command
+RELATED_STORIES_FILE = join_path(PROJECT_DIR, 'related_stories.npz')
+# High-water mark of the sync_prodsys command
+PRODSYS_SYNC_STATE_FILE = join_path(PROJECT_DIR, 'prodsys_sync.json')
+# Last imported story of the legacy website import
+LEGACY_IMPORT_CHECKPOINT_FILE = join_path(PROJECT_DIR, 'legacy_import.json')
+# Write input and output of the byline cleanup to bylines.log
+BYLINES_LOG = False
 
 # INTERNATIONALIZATION
 LANGUAGE_CODE = 'NB_no'
@@ -16,6 +16,8 @@ DATABASES = {
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+ADVERTS_COUNTER_BUFFER = 'apps.adverts.tracking.LocalCounterBuffer'
+
 # ignore the following error when using ipython:
 #/django/db/backends/sqlite3/base.py:50: RuntimeWarning:
 # SQLite received a naive datetime (2012-11-02 11:20:15.156506) while time zone support is active.
@@ -1,7 +1,8 @@
 # Based on https://djangosnippets.org/snippets/2283/
 
 from django.db import transaction
-from django.db.models import get_models, Model
+from django.apps import apps
+from django.db.models import Model
 from django.contrib.contenttypes.generic import GenericForeignKey
 
 @transaction.atomic
@@ -36,8 +37,8 @@ def merge_model_objects(primary_object, alias_objects=None, keep_old=False):
     # TODO: this is a bit of a hack, since the generics framework should provide a similar
     # method to the ForeignKey field for accessing the generic related fields.
     generic_fields = []
-    for model in get_models():
-        for field_name, field in filter(lambda x: isinstance(x[1], GenericForeignKey), model.__dict__.iteritems()):
+    for model in apps.get_models():
+        for field_name, field in filter(lambda x: isinstance(x[1], GenericForeignKey), model.__dict__.items()):
             generic_fields.append(field)
 
     blank_local_fields = set([field.attname for field in primary_object._meta.local_fields if getattr(primary_object, field.attname) in [None, '']])
@@ -52,9 +53,8 @@ def merge_model_objects(primary_object, alias_objects=None, keep_old=False):
             obj_varname = related_object.field.name
             related_objects = getattr(alias_object, alias_varname)
             if hasattr(related_objects, 'all'):
-                for obj in related_objects.all():
-                    setattr(obj, obj_varname, primary_object)
-                    obj.save()
+                # A single update query instead of saving each object.
+                related_objects.all().update(**{obj_varname: primary_object})
             else:
                 # `related_objects` is a one-to-one field.
                 # Merge related one-to-one fields.
@@ -84,9 +84,8 @@ def merge_model_objects(primary_object, alias_objects=None, keep_old=False):
             filter_kwargs = {}
             filter_kwargs[field.fk_field] = alias_object._get_pk_val()
             filter_kwargs[field.ct_field] = field.get_content_type(alias_object)
-            for generic_related_object in field.model.objects.filter(**filter_kwargs):
-                setattr(generic_related_object, field.name, primary_object)
-                generic_related_object.save()
+            field.model.objects.filter(**filter_kwargs).update(**{
+                field.fk_field: primary_object._get_pk_val()})
 
         # Try to fill all missing values in primary object by values of duplicates
         filled_up = set()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Values kept in memory by each process, and rebuilt when they are changed.
+
+The processes share a version number in Django's cache. A process checks the
+version at most every few seconds, and rebuilds its value when another
+process has changed it.
+"""
+import time
+
+from django.core.cache import cache
+
+# Seconds between checks of the shared version.
+CHECK_INTERVAL = 5
+
+
+class ProcessCache:
+
+    """ A value built once per process, shared version in Django's cache. """
+
+    def __init__(self, version_key, build, is_current=None,
+                 check_interval=CHECK_INTERVAL):
+        self.version_key = version_key
+        self.build = build
+        # Optional check of the value itself, such as a folder mtime.
+        self.is_current = is_current
+        self.check_interval = check_interval
+        self.value = None
+        self.version = None
+        self.checked = 0
+
+    def get_version(self):
+        return cache.get(self.version_key, 0)
+
+    def bump_version(self):
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, None)
+            return 1
+
+    def get(self):
+        """ The value for this process, rebuilt if it's out of date. """
+        now = time.time()
+        if self.value is not None and now - self.checked > self.check_interval:
+            self.checked = now
+            if self.get_version() != self.version or (
+                    self.is_current and not self.is_current(self.value)):
+                self.value = None
+        if self.value is None:
+            self.checked = now
+            # Read before building, so changes made meanwhile are noticed.
+            self.version = self.get_version()
+            self.value = self.build()
+        return self.value
+
+    def invalidate(self):
+        """ Make all processes rebuild the value. """
+        self.value = None
+        self.bump_version()
+
+    def changed(self):
+        """
+        Make other processes rebuild the value, after this process changed
+        its own value in place. This process keeps its value, unless another
+        process has changed it since it was built.
+        """
+        version = self.bump_version()
+        if self.value is not None and version == self.version + 1:
+            self.version = version
+        else:
+            self.value = None
@@ -15,6 +15,8 @@ from watson.registration import SearchAdapter, default_search_engine, search_con
 # The main search methods.
 search = default_search_engine.search
 filter = default_search_engine.filter
+facet_counts = default_search_engine.facet_counts
+suggest = default_search_engine.suggest
 
 
 # Easy registration.
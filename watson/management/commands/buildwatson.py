@@ -2,22 +2,29 @@
 
 from __future__ import unicode_literals, print_function
 
+import json
+import os
+from multiprocessing import Pool
 from optparse import make_option
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db.models import get_model
 from django.contrib import admin
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import connections, transaction
 from django.utils.encoding import force_text
 
-from watson.registration import SearchEngine, _bulk_save_search_entries
-from watson.models import SearchEntry
+from watson.registration import SearchEngine
+from watson.suggestions import suggestions_enabled, rebuild_terms
+from watson.models import SearchEntry, has_int_pk
 
 
 # Sets up registration for django-watson's admin integration.
 admin.autodiscover()
 
+DEFAULT_CHUNK_SIZE = 500
+
+
 def get_engine(engine_slug_):
     '''returns search engine with a given name'''
     try:
@@ -25,31 +32,135 @@ def get_engine(engine_slug_):
     except IndexError:
         raise CommandError("Search Engine \"%s\" is not registered!" % force_text(engine_slug_))
 
-def rebuild_index_for_model(model_, engine_slug_, verbosity_):
-    '''rebuilds index for a model'''
 
+def get_model_label(model_):
+    '''returns a picklable "app_label.ModelName" label for a model'''
+    return "{app_label}.{model_name}".format(
+        app_label = model_._meta.app_label,
+        model_name = model_.__name__,
+    )
+
+
+def get_chunks(pks, chunk_size, done_ranges=()):
+    '''splits a sorted list of primary keys into (first, last) ranges, skipping finished ranges'''
+    pks = [pk for pk in pks if not any(first <= pk <= last for first, last in done_ranges)]
+    return [
+        (pks[index], pks[min(index + chunk_size, len(pks)) - 1])
+        for index in range(0, len(pks), chunk_size)
+    ]
+
+
+def rebuild_chunk(model_, engine_slug_, first_pk, last_pk, update_terms=True):
+    '''rebuilds index for the objects in a range of primary keys, in a single transaction'''
     search_engine_ = get_engine(engine_slug_)
+    adapter = search_engine_.get_adapter(model_)
+    queryset = adapter.get_batch_queryset(
+        model_._default_manager.filter(pk__gte=first_pk, pk__lte=last_pk).order_by("pk")
+    )
+    with transaction.atomic():
+        return search_engine_.update_obj_index_batch(model_, queryset, update_terms=update_terms)
+
+
+def _rebuild_chunk_worker(task):
+    '''entry point for worker processes, which get model labels instead of model classes'''
+    model_label, engine_slug_, first_pk, last_pk, update_terms = task
+    model_ = get_model(*model_label.split("."))
+    return first_pk, last_pk, rebuild_chunk(model_, engine_slug_, first_pk, last_pk, update_terms)
+
+
+def _close_connections():
+    '''closes database connections, so that forked worker processes open their own'''
+    for connection in connections.all():
+        connection.close()
+
+
+class Checkpoint(object):
+
+    '''json file recording which primary key ranges have been indexed, so a rebuild can resume'''
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        if path and os.path.isfile(path):
+            with open(path) as checkpoint_file:
+                self.data = json.load(checkpoint_file)
+
+    def _key(self, model_, engine_slug_):
+        return "{engine_slug}:{model_label}".format(
+            engine_slug = engine_slug_,
+            model_label = get_model_label(model_),
+        )
+
+    def done_ranges(self, model_, engine_slug_):
+        return [tuple(pk_range) for pk_range in self.data.get(self._key(model_, engine_slug_), [])]
+
+    def add(self, model_, engine_slug_, first_pk, last_pk):
+        if not self.path:
+            return
+        self.data.setdefault(self._key(model_, engine_slug_), []).append([first_pk, last_pk])
+        with open(self.path, "w") as checkpoint_file:
+            json.dump(self.data, checkpoint_file)
+
+    def remove(self):
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+def rebuild_index_for_model(model_, engine_slug_, verbosity_, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, checkpoint=None, update_terms=True):
+    '''rebuilds index for a model'''
+
+    checkpoint = checkpoint or Checkpoint(None)
+    resumable = has_int_pk(model_)
+    if resumable:
+        done_ranges = checkpoint.done_ranges(model_, engine_slug_)
+    else:
+        # Python comparisons of non-integer keys don't necessarily match the database collation.
+        done_ranges = ()
+        workers = 1
+    pks = list(model_._default_manager.order_by("pk").values_list("pk", flat=True))
+    chunks = get_chunks(pks, chunk_size, done_ranges)
+
+    if workers > 1 and len(chunks) > 1:
+        tasks = [(get_model_label(model_), engine_slug_, first_pk, last_pk, update_terms) for first_pk, last_pk in chunks]
+        _close_connections()
+        pool = Pool(processes=workers)
+        try:
+            results = pool.imap_unordered(_rebuild_chunk_worker, tasks)
+            local_refreshed_model_count = 0
+            for first_pk, last_pk, count in results:
+                local_refreshed_model_count += _chunk_done(model_, engine_slug_, verbosity_, checkpoint, first_pk, last_pk, count)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        local_refreshed_model_count = 0
+        for first_pk, last_pk in chunks:
+            count = rebuild_chunk(model_, engine_slug_, first_pk, last_pk, update_terms)
+            local_refreshed_model_count += _chunk_done(model_, engine_slug_, verbosity_, checkpoint if resumable else None, first_pk, last_pk, count)
+
+    if verbosity_ == 2:
+        print("Refreshed {local_refreshed_model_count} {model} search entry(s) in {engine_slug!r} search engine.".format(
+            model = force_text(model_._meta.verbose_name),
+            local_refreshed_model_count = local_refreshed_model_count,
+            engine_slug = force_text(engine_slug_),
+        ))
+    return local_refreshed_model_count
+
+
+def _chunk_done(model_, engine_slug_, verbosity_, checkpoint, first_pk, last_pk, count):
+    '''records a finished chunk in the checkpoint and reports progress'''
+    if checkpoint is not None:
+        checkpoint.add(model_, engine_slug_, first_pk, last_pk)
+    if verbosity_ >= 3:
+        print("Refreshed {count} {model} search entry(s) with pk {first_pk!r} to {last_pk!r} in {engine_slug!r} search engine.".format(
+            count = count,
+            model = force_text(model_._meta.verbose_name),
+            first_pk = first_pk,
+            last_pk = last_pk,
+            engine_slug = force_text(engine_slug_),
+        ))
+    return count
 
-    local_refreshed_model_count = [0]  # HACK: Allows assignment to outer scope.
-    def iter_search_entries():
-        for obj in model_._default_manager.all().iterator():
-            for search_entry in search_engine_._update_obj_index_iter(obj):
-                yield search_entry
-            local_refreshed_model_count[0] += 1
-            if verbosity_ >= 3:
-                print("Refreshed search entry for {model} {obj} in {engine_slug!r} search engine.".format(
-                    model = force_text(model_._meta.verbose_name),
-                    obj = force_text(obj),
-                    engine_slug = force_text(engine_slug_),
-                ))
-        if verbosity_ == 2:
-            print("Refreshed {local_refreshed_model_count} {model} search entry(s) in {engine_slug!r} search engine.".format(
-                model = force_text(model_._meta.verbose_name),
-                local_refreshed_model_count = local_refreshed_model_count[0],
-                engine_slug = force_text(engine_slug_),
-            ))
-    _bulk_save_search_entries(iter_search_entries())
-    return local_refreshed_model_count[0]
 
 class Command(BaseCommand):
     args = "[[--engine=search_engine] <app.model|model> <app.model|model> ... ]"
@@ -58,12 +169,28 @@ class Command(BaseCommand):
     option_list = BaseCommand.option_list + (
         make_option("--engine",
             help="Search engine models are registered with"),
+        make_option("--chunk-size",
+            type="int",
+            dest="chunk_size",
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of objects to index in each transaction"),
+        make_option("--workers",
+            type="int",
+            dest="workers",
+            default=1,
+            help="Number of worker processes to index chunks with"),
+        make_option("--checkpoint",
+            dest="checkpoint",
+            default=None,
+            help="File recording finished chunks. An interrupted rebuild resumes from this file, which is removed when the rebuild completes."),
         )
 
-    @transaction.atomic()
     def handle(self, *args, **options):
         """Runs the management command."""
         verbosity = int(options.get("verbosity", 1))
+        chunk_size = max(1, int(options.get("chunk_size") or DEFAULT_CHUNK_SIZE))
+        workers = max(1, int(options.get("workers") or 1))
+        checkpoint = Checkpoint(options.get("checkpoint"))
 
         # see if we're asked to use a specific search engine
         if options['engine']:
@@ -94,12 +221,17 @@ class Command(BaseCommand):
             models.append(model)
 
         refreshed_model_count = 0
+        rebuild_options = {
+            "chunk_size": chunk_size,
+            "workers": workers,
+            "checkpoint": checkpoint,
+        }
 
         if models:  # request for (re-)building index for a subset of registered models
             if verbosity >= 3:
                 print("Using search engine \"%s\"" % engine_slug)
             for model in models:
-                refreshed_model_count += rebuild_index_for_model(model, engine_slug, verbosity)
+                refreshed_model_count += rebuild_index_for_model(model, engine_slug, verbosity, **rebuild_options)
 
         else:  # full rebuild (for one or all search engines)
             if engine_selected:
@@ -113,9 +245,9 @@ class Command(BaseCommand):
             for engine_slug in engine_slugs:
                 search_engine = get_engine(engine_slug)
                 registered_models = search_engine.get_registered_models()
-                # Rebuild the index for all registered models.
+                # Rebuild the index for all registered models. The term dictionary is rebuilt in one go afterwards.
                 for model in registered_models:
-                    refreshed_model_count += rebuild_index_for_model(model, engine_slug, verbosity)
+                    refreshed_model_count += rebuild_index_for_model(model, engine_slug, verbosity, update_terms=False, **rebuild_options)
 
                 # Clean out any search entries that exist for stale content types. Only do it during full rebuild
                 valid_content_types = [ContentType.objects.get_for_model(model) for model in registered_models]
@@ -133,6 +265,17 @@ class Command(BaseCommand):
                         engine_slug = force_text(engine_slug),
                     ))
 
+                if suggestions_enabled():
+                    term_count = rebuild_terms(engine_slug)
+                    if verbosity >= 2:
+                        print("Rebuilt {term_count} search term(s) in {engine_slug!r} search engine.".format(
+                            term_count = term_count,
+                            engine_slug = force_text(engine_slug),
+                        ))
+
+        # The rebuild completed, so there is nothing left to resume.
+        checkpoint.remove()
+
         if verbosity == 1:
             print("Refreshed {refreshed_model_count} search entry(s) in {engine_slug!r} search engine.".format(
                 refreshed_model_count = refreshed_model_count,
@@ -0,0 +1,65 @@
+"""Updates search entries for objects in django-watson's index update queue."""
+
+from __future__ import unicode_literals
+
+import time
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand, CommandError
+from django.contrib import admin
+
+from watson.registration import get_index_queue, process_index_queue, requeue_retry_tasks
+
+
+# Sets up registration for django-watson's admin integration.
+admin.autodiscover()
+
+
+class Command(NoArgsCommand):
+
+    help = "Updates search entries for objects in the index update queue. Runs until stopped, unless --once is given."
+
+    option_list = NoArgsCommand.option_list + (
+        make_option("--batch-size",
+            type="int",
+            dest="batch_size",
+            default=100,
+            help="Number of queued objects to index in each transaction"),
+        make_option("--interval",
+            type="float",
+            dest="interval",
+            default=2.0,
+            help="Seconds to wait when the queue is empty"),
+        make_option("--once",
+            action="store_true",
+            dest="once",
+            default=False,
+            help="Exit when the queue is empty"),
+        )
+
+    def handle_noargs(self, **options):
+        """Runs the management command."""
+        verbosity = int(options.get("verbosity", 1))
+        index_queue = get_index_queue()
+        if index_queue is None:
+            raise CommandError("The WATSON_INDEX_QUEUE setting is not configured.")
+        processed_count = 0
+        try:
+            while True:
+                batch_count = process_index_queue(batch_size=options["batch_size"])
+                processed_count += batch_count
+                if batch_count and verbosity >= 2:
+                    self.stdout.write("Updated search entries for {batch_count} queued object(s).\n".format(
+                        batch_count = batch_count,
+                    ))
+                if not batch_count:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        finally:
+            # Leave objects waiting for a retry on the queue for the next worker.
+            requeue_retry_tasks(index_queue, force=True)
+        if verbosity >= 1:
+            self.stdout.write("Updated search entries for {processed_count} queued object(s).\n".format(
+                processed_count = processed_count,
+            ))
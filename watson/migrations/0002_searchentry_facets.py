@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watson', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchentry',
+            name='facet_section',
+            field=models.CharField(max_length=200, db_index=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='facet_type',
+            field=models.CharField(max_length=200, db_index=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='facet_year',
+            field=models.IntegerField(db_index=True, null=True, blank=True),
+            preserve_default=True,
+        ),
+    ]
@@ -27,6 +27,10 @@ def has_int_pk(model):
 META_CACHE_KEY = "_meta_cache"
 
 
+# The facets that can be stored with a search entry.
+FACETS = ("section", "type", "year")
+
+
 class SearchEntry(models.Model):
 
     """An entry in the search index."""
@@ -70,6 +74,27 @@ class SearchEntry(models.Model):
 
     meta_encoded = models.TextField()
 
+    # Facet values are denormalized onto the entry at index time, so that facet counts
+    # and facet filters only need the search entry table.
+
+    facet_section = models.CharField(
+        max_length = 200,
+        blank = True,
+        db_index = True,
+    )
+
+    facet_type = models.CharField(
+        max_length = 200,
+        blank = True,
+        db_index = True,
+    )
+
+    facet_year = models.IntegerField(
+        blank = True,
+        null = True,
+        db_index = True,
+    )
+
     @property
     def meta(self):
         """Returns the meta information stored with the search entry."""
@@ -92,3 +117,29 @@ class SearchEntry(models.Model):
     class Meta:
         verbose_name_plural = "search entries"
         app_label = 'watson'
+
+
+class SearchTerm(models.Model):
+
+    """A term in the search index, with the number of search entries it appears in."""
+
+    engine_slug = models.CharField(
+        max_length = 200,
+        default = "default",
+    )
+
+    term = models.CharField(
+        max_length = 100,
+    )
+
+    frequency = models.IntegerField(
+        default = 0,
+    )
+
+    def __unicode__(self):
+        """Returns a unicode representation."""
+        return self.term
+
+    class Meta:
+        unique_together = (("engine_slug", "term"),)
+        app_label = 'watson'
@@ -0,0 +1,94 @@
+"""Queues for deferred search index updates used by django-watson."""
+
+from __future__ import unicode_literals
+
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_text
+
+
+def encode_task(engine_slug, content_type_id, object_id):
+    """Encodes a queued index update as a string."""
+    return "{engine_slug}:{content_type_id}:{object_id}".format(
+        engine_slug = engine_slug,
+        content_type_id = content_type_id,
+        object_id = force_text(object_id),
+    )
+
+
+def decode_task(task):
+    """Decodes a queued index update into a tuple of (engine_slug, content_type_id, object_id)."""
+    engine_slug, content_type_id, object_id = force_text(task).split(":", 2)
+    return engine_slug, int(content_type_id), object_id
+
+
+class IndexQueue(object):
+
+    """
+    Base class for index update queues.
+
+    A queue holds each (engine, content type, object id) at most once, so repeated saves
+    of the same object are coalesced into a single index update.
+    """
+
+    def push(self, engine_slug, content_type_id, object_id):
+        """Adds an object to the queue, unless it's already there."""
+        raise NotImplementedError
+
+    def pop_batch(self, batch_size):
+        """Removes and returns up to batch_size decoded tasks from the queue."""
+        raise NotImplementedError
+
+
+class LocalIndexQueue(IndexQueue):
+
+    """
+    An in-process queue.
+
+    Only useful for tests and single process development servers, since the queue is
+    not shared with a separate worker process.
+    """
+
+    def __init__(self):
+        self._tasks = set()
+        self._lock = Lock()
+
+    def push(self, engine_slug, content_type_id, object_id):
+        with self._lock:
+            self._tasks.add(encode_task(engine_slug, content_type_id, object_id))
+
+    def pop_batch(self, batch_size):
+        with self._lock:
+            batch = [self._tasks.pop() for _ in range(min(batch_size, len(self._tasks)))]
+        return [decode_task(task) for task in batch]
+
+
+class RedisIndexQueue(IndexQueue):
+
+    """
+    A queue stored as a redis set, shared between web processes and the index worker.
+
+    Configure the connection with the WATSON_REDIS_URL setting.
+    """
+
+    key = "watson:index_queue"
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisIndexQueue requires the redis package.")
+        url = getattr(settings, "WATSON_REDIS_URL", "redis://localhost:6379/0")
+        self._redis = redis.StrictRedis.from_url(url)
+
+    def push(self, engine_slug, content_type_id, object_id):
+        self._redis.sadd(self.key, encode_task(engine_slug, content_type_id, object_id))
+
+    def pop_batch(self, batch_size):
+        # The pops run in one MULTI block, so concurrent workers never get the same task.
+        pipeline = self._redis.pipeline(transaction=True)
+        for _ in range(batch_size):
+            pipeline.spop(self.key)
+        return [decode_task(task) for task in pipeline.execute() if task is not None]
@@ -2,8 +2,8 @@
 
 from __future__ import unicode_literals
 
-import sys, json
-from itertools import chain, islice
+import sys, json, time
+from itertools import islice
 from threading import local
 from functools import wraps
 from weakref import WeakValueDictionary
@@ -12,8 +12,8 @@ from django.conf import settings
 from django.core.signals import request_finished
 from django.core.exceptions import ImproperlyConfigured
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction, DatabaseError
+from django.db.models import Q, Count
 from django.db.models.query import QuerySet
 from django.db.models.signals import post_save, pre_delete
 from django.utils.encoding import force_text
@@ -23,7 +23,8 @@ try:
 except ImportError:
     from django.utils.importlib import import_module
 
-from watson.models import SearchEntry, has_int_pk
+from watson.models import SearchEntry, FACETS, has_int_pk
+from watson import suggestions
 
 
 class SearchAdapterError(Exception):
@@ -44,6 +45,10 @@ class SearchAdapter(object):
     # Use to specify object properties to be stored in the search index.
     store = ()
 
+    # Use to specify fields that don't affect the search index. Saves that only
+    # update these fields (using save(update_fields=...)) leave the index alone.
+    skip_update_fields = ()
+
     def __init__(self, model):
         """Initializes the search adapter."""
         self.model = model
@@ -142,6 +147,15 @@ class SearchAdapter(object):
             for field_name in self.store
         )
 
+    def get_facets(self, obj):
+        """
+        Returns a dictionary of facet values for the given obj.
+
+        Valid keys are "section", "type" and "year". The values are stored in indexed
+        columns of the search entry, so that searches can be counted and narrowed by facet.
+        """
+        return {}
+
     def get_live_queryset(self):
         """
         Returns the queryset of objects that should be considered live.
@@ -150,6 +164,18 @@ class SearchAdapter(object):
         """
         return None
 
+    def get_batch_queryset(self, queryset):
+        """
+        Returns the queryset used to load a batch of objects when the index is rebuilt.
+
+        Override this to add select_related() or prefetch_related() calls, so that
+        related data used by get_title(), get_content(), get_url() and get_meta() is
+        fetched once for the whole batch instead of once per object.
+
+        The default implementation returns the queryset unchanged.
+        """
+        return queryset
+
 
 class SearchEngineError(Exception):
 
@@ -228,7 +254,19 @@ class SearchContextManager(local):
         # Save all the models.
         tasks, is_invalid = self._stack.pop()
         if not is_invalid:
-            _bulk_save_search_entries(list(chain.from_iterable(engine._update_obj_index_iter(obj) for engine, obj in tasks)))
+            search_entries = []
+            # The term dictionary is updated once per engine for the whole context.
+            term_texts = {}
+            for engine, obj in tasks:
+                if engine._enqueue_obj(obj):
+                    continue
+                old_texts, new_texts = None, None
+                if suggestions.suggestions_enabled():
+                    old_texts, new_texts = term_texts.setdefault(engine, ([], []))
+                search_entries.extend(engine._update_obj_index_iter(obj, old_texts, new_texts))
+            _bulk_save_search_entries(search_entries)
+            for engine, (old_texts, new_texts) in term_texts.items():
+                suggestions.update_terms(engine._engine_slug, old_texts, new_texts)
 
     # Context management.
 
@@ -430,23 +468,43 @@ class SearchEngine(object):
             )
         return object_id_int, search_entries
 
-    def _update_obj_index_iter(self, obj):
-        """Either updates the given object index, or yields an unsaved search entry."""
-        model = obj.__class__
-        adapter = self.get_adapter(model)
-        content_type = ContentType.objects.get_for_model(model)
-        object_id = force_text(obj.pk)
-        # Create the search entry data.
-        search_entry_data = {
+    def _get_search_entry_data(self, adapter, obj):
+        """Returns a dictionary of search entry field values for the given obj."""
+        facets = adapter.get_facets(obj)
+        return {
             "engine_slug": self._engine_slug,
             "title": adapter.get_title(obj),
             "description": adapter.get_description(obj),
             "content": adapter.get_content(obj),
             "url": adapter.get_url(obj),
             "meta_encoded": json.dumps(adapter.get_meta(obj)),
+            "facet_section": force_text(facets.get("section") or ""),
+            "facet_type": force_text(facets.get("type") or ""),
+            "facet_year": facets.get("year"),
         }
+
+    def _update_obj_index_iter(self, obj, old_texts=None, new_texts=None):
+        """
+        Either updates the given object index, or yields an unsaved search entry.
+
+        If the old_texts and new_texts lists are given, the texts of the replaced and
+        new search entries are added to them, so that the caller can update the term
+        dictionary for a batch of objects at once.
+        """
+        model = obj.__class__
+        adapter = self.get_adapter(model)
+        content_type = ContentType.objects.get_for_model(model)
+        object_id = force_text(obj.pk)
+        # Create the search entry data.
+        search_entry_data = self._get_search_entry_data(adapter, obj)
         # Try to get the existing search entry.
         object_id_int, search_entries = self._get_entries_for_obj(obj)
+        if old_texts is not None:
+            old_texts.extend(
+                suggestions.get_entry_text(title, content)
+                for title, content in search_entries.values_list("title", "content")
+            )
+            new_texts.append(suggestions.get_entry_text(search_entry_data["title"], search_entry_data["content"]))
         # Attempt to update the search entries.
         update_count = search_entries.update(**search_entry_data)
         if update_count == 0:
@@ -462,21 +520,107 @@ class SearchEngine(object):
             search_entries.exclude(id=search_entries[0].id).delete()
 
     def update_obj_index(self, obj):
-        """Updates the search index for the given obj."""
-        _bulk_save_search_entries(list(self._update_obj_index_iter(obj)))
+        """Updates the search index and the term dictionary for the given obj."""
+        if not suggestions.suggestions_enabled():
+            _bulk_save_search_entries(list(self._update_obj_index_iter(obj)))
+            return
+        old_texts, new_texts = [], []
+        _bulk_save_search_entries(list(self._update_obj_index_iter(obj, old_texts, new_texts)))
+        suggestions.update_terms(self._engine_slug, old_texts, new_texts)
+
+    def _update_terms(self, stale_entries, search_entry_data_list):
+        """Updates the term dictionary for search entries that are about to be replaced."""
+        suggestions.update_terms(
+            self._engine_slug,
+            [
+                suggestions.get_entry_text(title, content)
+                for title, content in stale_entries.values_list("title", "content")
+            ],
+            [
+                suggestions.get_entry_text(search_entry_data["title"], search_entry_data["content"])
+                for search_entry_data in search_entry_data_list
+            ],
+        )
+
+    def update_obj_index_batch(self, model, objs, batch_size=100, update_terms=True):
+        """
+        Replaces the search entries for a batch of objects of the same model.
+
+        Instead of one UPDATE per object, the existing entries for the whole batch
+        are deleted with a single query and recreated with bulk inserts. This also
+        removes any duplicated search entries. Call this inside a transaction, so
+        that searches never see the batch half written.
+
+        Set update_terms to False if the term dictionary will be rebuilt afterwards anyway.
+        """
+        objs = list(objs)
+        if not objs:
+            return 0
+        adapter = self.get_adapter(model)
+        content_type = ContentType.objects.get_for_model(model)
+        int_pk = has_int_pk(model)
+        search_entries = []
+        for obj in objs:
+            search_entry_data = self._get_search_entry_data(adapter, obj)
+            search_entry_data.update((
+                ("content_type", content_type),
+                ("object_id", force_text(obj.pk)),
+                ("object_id_int", int(obj.pk) if int_pk else None),
+            ))
+            search_entries.append(SearchEntry(**search_entry_data))
+        # Remove the stale entries for the batch in a single query.
+        stale_entries = SearchEntry.objects.filter(
+            content_type = content_type,
+            engine_slug = self._engine_slug,
+        )
+        if int_pk:
+            stale_entries = stale_entries.filter(
+                object_id_int__in = [int(obj.pk) for obj in objs],
+            )
+        else:
+            stale_entries = stale_entries.filter(
+                object_id__in = [force_text(obj.pk) for obj in objs],
+            )
+        if update_terms and suggestions.suggestions_enabled():
+            self._update_terms(stale_entries, [
+                {"title": search_entry.title, "content": search_entry.content}
+                for search_entry in search_entries
+            ])
+        stale_entries.delete()
+        _bulk_save_search_entries(search_entries, batch_size=batch_size)
+        return len(objs)
+
+    def _enqueue_obj(self, obj):
+        """
+        Adds the given obj to the index update queue, if one is configured.
+
+        Returns False if index updates should happen right away instead.
+        """
+        index_queue = get_index_queue()
+        if index_queue is None:
+            return False
+        content_type = ContentType.objects.get_for_model(obj.__class__)
+        index_queue.push(self._engine_slug, content_type.id, obj.pk)
+        return True
 
     # Signalling hooks.
 
-    def _post_save_receiver(self, instance, **kwargs):
+    def _post_save_receiver(self, instance, update_fields=None, **kwargs):
         """Signal handler for when a registered model has been saved."""
+        adapter = self.get_adapter(instance.__class__)
+        if update_fields and set(update_fields) <= set(adapter.skip_update_fields):
+            # Nothing in the search index has changed.
+            return
         if self._search_context_manager.is_active():
             self._search_context_manager.add_to_context(self, instance)
-        else:
+        elif not self._enqueue_obj(instance):
             self.update_obj_index(instance)
 
     def _pre_delete_receiver(self, instance, **kwargs):
         """Signal handler for when a registered model has been deleted."""
         _, search_entries = self._get_entries_for_obj(instance)
+        if suggestions.suggestions_enabled():
+            self._update_terms(search_entries, [])
         search_entries.delete()
 
     # Searching.
@@ -529,8 +673,24 @@ class SearchEngine(object):
                 else:
                     yield queryset.all()
 
-    def search(self, search_text, models=(), exclude=(), ranking=True, backend_name=None):
-        """Performs a search using the given text, returning a queryset of SearchEntry."""
+    def _create_facet_filter(self, facets):
+        """Creates a filter for the given dictionary of selected facet values."""
+        filter = Q()
+        for facet, value in (facets or {}).items():
+            if facet not in FACETS:
+                raise SearchEngineError("{facet!r} is not a valid facet".format(
+                    facet = facet,
+                ))
+            if value is not None:
+                filter &= Q(**{"facet_" + facet: value})
+        return filter
+
+    def search(self, search_text, models=(), exclude=(), ranking=True, backend_name=None, facets=None):
+        """
+        Performs a search using the given text, returning a queryset of SearchEntry.
+
+        If facets is given, it should be a dictionary of facet values to narrow the search by.
+        """
         # Check for blank search text.
         search_text = search_text.strip()
         if not search_text:
@@ -538,6 +698,8 @@ class SearchEngine(object):
         # Get the initial queryset.
         queryset = SearchEntry.objects.filter(
             engine_slug = self._engine_slug,
+        ).filter(
+            self._create_facet_filter(facets)
         )
         # Process the allowed models.
         queryset = queryset.filter(
@@ -554,6 +716,59 @@ class SearchEngine(object):
         # Return the complete queryset.
         return queryset
 
+    def _count_facets(self, queryset, counted_facets):
+        """Counts the search entries in the queryset by value for each of the given facets."""
+        rows = queryset.order_by().values(
+            *["facet_" + facet for facet in counted_facets]
+        ).annotate(
+            watson_facet_count = Count("id"),
+        )
+        counts = dict((facet, {}) for facet in counted_facets)
+        for row in rows:
+            for facet in counted_facets:
+                value = row["facet_" + facet]
+                if value not in ("", None):
+                    counts[facet][value] = counts[facet].get(value, 0) + row["watson_facet_count"]
+        return counts
+
+    def facet_counts(self, search_text, models=(), exclude=(), backend_name=None, facets=None):
+        """
+        Counts the matches for the given search by facet value.
+
+        Returns a dictionary mapping each facet to a list of (value, count) tuples, most
+        frequent first. Each facet is counted with the other selected facets applied, but
+        not its own, so the counts of the alternatives to a selected value are still shown.
+        The facets without a selected value are counted by a single grouped query, and each
+        selected facet by one more.
+        """
+        selected = dict(
+            (facet, value) for facet, value in (facets or {}).items()
+            if value is not None
+        )
+        unselected = [facet for facet in FACETS if facet not in selected]
+        counts = {}
+        if unselected:
+            queryset = self.search(search_text, models, exclude, ranking=False, backend_name=backend_name, facets=selected)
+            counts.update(self._count_facets(queryset, unselected))
+        for facet in selected:
+            other_facets = dict(selected)
+            del other_facets[facet]
+            queryset = self.search(search_text, models, exclude, ranking=False, backend_name=backend_name, facets=other_facets)
+            counts.update(self._count_facets(queryset, [facet]))
+        return dict(
+            (facet, sorted(facet_counts.items(), key=lambda item: (-item[1], item[0])))
+            for facet, facet_counts in counts.items()
+        )
+
+    def suggest(self, search_text):
+        """
+        Returns a corrected version of the search text, or None if there is nothing to suggest.
+
+        Suggestions come from the term dictionary, which is only maintained when the
+        WATSON_SUGGESTIONS setting is True.
+        """
+        return suggestions.suggest(self._engine_slug, search_text)
+
     def filter(self, queryset, search_text, ranking=True, backend_name=None):
         """
         Filters the given model or queryset using the given text, returning the
@@ -606,3 +821,121 @@ def get_backend(backend_name=None):
     backend = backend_cls()
     _backends_cache[backend_name] = backend
     return backend
+
+
+# The cache for the initialized index queue.
+_index_queue_cache = {}
+
+
+def get_index_queue():
+    """
+    Initializes and returns the index update queue.
+
+    Returns None unless the WATSON_INDEX_QUEUE setting names a queue class, in which
+    case saves of registered models are queued instead of indexed right away.
+    """
+    queue_name = getattr(settings, "WATSON_INDEX_QUEUE", None)
+    if not queue_name:
+        return None
+    # Try to use the cached queue.
+    if queue_name in _index_queue_cache:
+        return _index_queue_cache[queue_name]
+    # Load the queue class.
+    queue_module_name, queue_cls_name = queue_name.rsplit(".", 1)
+    queue_module = import_module(queue_module_name)
+    try:
+        queue_cls = getattr(queue_module, queue_cls_name)
+    except AttributeError:
+        raise ImproperlyConfigured("Could not find a class named {queue_cls_name!r} in {queue_module_name!r}".format(
+            queue_module_name = queue_module_name,
+            queue_cls_name = queue_cls_name,
+        ))
+    # Initialize the queue.
+    index_queue = queue_cls()
+    _index_queue_cache[queue_name] = index_queue
+    return index_queue
+
+
+# Seconds to wait before queued objects that were locked or missing are tried again.
+INDEX_QUEUE_RETRY_DELAY = 5.0
+
+# Tasks to push back onto the queue, mapped to [time to push them, time first found missing].
+_retry_tasks = {}
+
+
+def _retry_task(task, missing=False):
+    """
+    Pushes the task back onto the index queue later.
+
+    Objects created in a long transaction are missing until it commits, so a missing
+    object is only assumed to be deleted once it has been missing for longer than the
+    WATSON_INDEX_QUEUE_MISSING_TIMEOUT setting, in seconds. Buildwatson indexes any
+    object that is dropped too early.
+    """
+    now = time.time()
+    missing_since = _retry_tasks.get(task, [None, None])[1]
+    if missing and missing_since is None:
+        missing_since = now
+    if missing_since is not None and now - missing_since >= getattr(settings, "WATSON_INDEX_QUEUE_MISSING_TIMEOUT", 3600):
+        _retry_tasks.pop(task, None)
+    else:
+        _retry_tasks[task] = [now + INDEX_QUEUE_RETRY_DELAY, missing_since]
+
+
+def requeue_retry_tasks(index_queue, force=False):
+    """Pushes tasks waiting for a retry back onto the index queue once their delay has passed."""
+    now = time.time()
+    for task, retry in _retry_tasks.items():
+        if retry[0] is not None and (force or retry[0] <= now):
+            index_queue.push(*task)
+            retry[0] = None
+
+
+def process_index_queue(batch_size=100):
+    """
+    Removes a batch of queued objects from the index update queue and updates their search entries.
+
+    Objects are loaded with one query per model, and the search entries for each model
+    are replaced in a single transaction. Returns the number of queued tasks processed.
+
+    Objects are queued when they are saved, which may be before the saving transaction
+    commits. Rows that are locked by another transaction, and rows that aren't visible
+    yet, are pushed back onto the queue and tried again after INDEX_QUEUE_RETRY_DELAY.
+    """
+    index_queue = get_index_queue()
+    if index_queue is None:
+        return 0
+    requeue_retry_tasks(index_queue)
+    tasks = index_queue.pop_batch(batch_size)
+    grouped_ids = {}
+    for engine_slug, content_type_id, object_id in tasks:
+        grouped_ids.setdefault((engine_slug, content_type_id), set()).add(object_id)
+    engines = dict(SearchEngine.get_created_engines())
+    for (engine_slug, content_type_id), object_ids in grouped_ids.items():
+        engine = engines.get(engine_slug)
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if engine is None or model is None or not engine.is_registered(model):
+            continue
+        adapter = engine.get_adapter(model)
+        try:
+            with transaction.atomic():
+                # Lock the rows, so no uncommitted changes are indexed.
+                found_ids = set(force_text(pk) for pk in model._default_manager.filter(
+                    pk__in = object_ids,
+                ).select_for_update(nowait=True).values_list("pk", flat=True))
+                objs = adapter.get_batch_queryset(model._default_manager.filter(pk__in=found_ids))
+                engine.update_obj_index_batch(model, objs)
+        except DatabaseError:
+            # Another transaction is still changing some of the objects.
+            for object_id in object_ids:
+                _retry_task((engine_slug, content_type_id, object_id))
+            continue
+        for object_id in object_ids:
+            task = (engine_slug, content_type_id, object_id)
+            if object_id in found_ids:
+                _retry_tasks.pop(task, None)
+            else:
+                # Either deleted, in which case pre_delete removed the entries,
+                # or created in a transaction that hasn't committed yet.
+                _retry_task(task, missing=True)
+    return len(tasks)
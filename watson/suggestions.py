@@ -0,0 +1,270 @@
+"""Spelling suggestions for searches, based on a dictionary of indexed terms."""
+
+from __future__ import unicode_literals, division
+
+import re, time
+from array import array
+from collections import Counter
+from threading import Lock, Thread
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.encoding import force_text
+
+from watson.models import SearchEntry, SearchTerm
+
+
+RE_WORD = re.compile(r"\w+", re.UNICODE)
+
+MIN_TERM_LENGTH = 3
+
+MAX_TERM_LENGTH = 100
+
+MIN_SIMILARITY = 0.3
+
+BATCH_SIZE = 500
+
+
+def suggestions_enabled():
+    """Tests whether the term dictionary should be maintained."""
+    return getattr(settings, "WATSON_SUGGESTIONS", False)
+
+
+def is_term(word):
+    """Tests whether the given lowercase word belongs in the term dictionary."""
+    return MIN_TERM_LENGTH <= len(word) <= MAX_TERM_LENGTH and not word.isdigit()
+
+
+def get_terms(text):
+    """Returns the set of dictionary terms in the given text."""
+    return set(
+        word for word in RE_WORD.findall(force_text(text).lower())
+        if is_term(word)
+    )
+
+
+def get_entry_text(title, content):
+    """Returns the text of a search entry used for the term dictionary."""
+    return " ".join((title, content))
+
+
+def _batches(items, batch_size=BATCH_SIZE):
+    """Splits a list into lists of at most batch_size items."""
+    for index in range(0, len(items), batch_size):
+        yield items[index:index + batch_size]
+
+
+def update_terms(engine_slug, old_texts, new_texts):
+    """
+    Updates the term dictionary after search entries have changed.
+
+    Terms are counted once per search entry, so the dictionary only needs the difference
+    between the old and new texts of the changed entries. Existing terms are updated
+    with one query per distinct change in frequency, and new terms are bulk inserted.
+    """
+    if not suggestions_enabled():
+        return
+    deltas = Counter()
+    for text in old_texts:
+        deltas.subtract(get_terms(text))
+    for text in new_texts:
+        deltas.update(get_terms(text))
+    terms_by_delta = {}
+    for term, delta in deltas.items():
+        if delta:
+            terms_by_delta.setdefault(delta, []).append(term)
+    if not terms_by_delta:
+        return
+    search_terms = SearchTerm.objects.filter(
+        engine_slug = engine_slug,
+    )
+    # Find the added terms that aren't in the dictionary yet.
+    added_terms = [term for term, delta in deltas.items() if delta > 0]
+    existing_terms = set()
+    for batch in _batches(added_terms):
+        existing_terms.update(search_terms.filter(term__in=batch).values_list("term", flat=True))
+    # Update the frequencies of the existing terms.
+    for delta, terms in terms_by_delta.items():
+        for batch in _batches(terms):
+            search_terms.filter(term__in=batch).update(frequency=F("frequency") + delta)
+    # Create the new terms.
+    new_terms = [
+        SearchTerm(
+            engine_slug = engine_slug,
+            term = term,
+            frequency = deltas[term],
+        )
+        for term in added_terms
+        if term not in existing_terms
+    ]
+    try:
+        with transaction.atomic():
+            SearchTerm.objects.bulk_create(new_terms, batch_size=BATCH_SIZE)
+    except IntegrityError:
+        # Another process added some of the terms in the meantime.
+        for search_term in new_terms:
+            if not search_terms.filter(term=search_term.term).update(frequency=F("frequency") + search_term.frequency):
+                search_term.save()
+    # Remove terms that no longer appear in any search entry.
+    removed_terms = [term for term, delta in deltas.items() if delta < 0]
+    for batch in _batches(removed_terms):
+        search_terms.filter(term__in=batch, frequency__lte=0).delete()
+
+
+def rebuild_terms(engine_slug):
+    """Rebuilds the term dictionary for the given search engine from its search entries."""
+    frequencies = Counter()
+    search_entries = SearchEntry.objects.filter(
+        engine_slug = engine_slug,
+    ).values_list("title", "content")
+    for title, content in search_entries.iterator():
+        frequencies.update(get_terms(get_entry_text(title, content)))
+    with transaction.atomic():
+        SearchTerm.objects.filter(engine_slug=engine_slug).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(
+                engine_slug = engine_slug,
+                term = term,
+                frequency = frequency,
+            )
+            for term, frequency in frequencies.items()
+        ], batch_size=BATCH_SIZE)
+    return len(frequencies)
+
+
+def get_trigrams(term):
+    """Returns the set of trigrams in the given term, padded like pg_trgm."""
+    padded = "  {term} ".format(term=term)
+    return set(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+class TrigramIndex(object):
+
+    """
+    An in-memory trigram index of the term dictionary.
+
+    Each trigram maps to a compact array of term ids, so the candidates for a misspelled
+    word are found by merging a handful of posting lists instead of scanning every term.
+    """
+
+    def __init__(self, terms):
+        """Builds the index from an iterable of (term, frequency) tuples."""
+        self.terms = []
+        self.term_ids = {}
+        self.frequencies = array("L")
+        self.trigram_counts = array("H")
+        self.postings = {}
+        for term, frequency in terms:
+            term_id = len(self.terms)
+            trigrams = get_trigrams(term)
+            self.terms.append(term)
+            self.term_ids[term] = term_id
+            self.frequencies.append(frequency)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, array("L")).append(term_id)
+
+    def __contains__(self, term):
+        return term in self.term_ids
+
+    def suggest_term(self, word, min_similarity=MIN_SIMILARITY):
+        """
+        Returns the most similar term to the given word, or None.
+
+        Similarity is the proportion of shared trigrams. Ties go to the more frequent term.
+        """
+        trigrams = get_trigrams(word)
+        shared_counts = Counter()
+        for trigram in trigrams:
+            shared_counts.update(self.postings.get(trigram, ()))
+        best_term_id = None
+        best_score = (min_similarity, 0)
+        for term_id, shared_count in shared_counts.items():
+            similarity = shared_count / (len(trigrams) + self.trigram_counts[term_id] - shared_count)
+            score = (similarity, self.frequencies[term_id])
+            if score >= best_score:
+                best_term_id = term_id
+                best_score = score
+        if best_term_id is None:
+            return None
+        return self.terms[best_term_id]
+
+
+# The cache of loaded trigram indices, keyed by engine slug.
+_term_index_cache = {}
+
+# Engine slugs with a trigram index being loaded in a background thread.
+_term_index_loading = set()
+
+_term_index_lock = Lock()
+
+
+def load_term_index(engine_slug):
+    """Loads the trigram index for the given search engine from the term dictionary."""
+    terms = SearchTerm.objects.filter(
+        engine_slug = engine_slug,
+        frequency__gt = 0,
+    ).values_list("term", "frequency")
+    term_index = TrigramIndex(terms.iterator())
+    _term_index_cache[engine_slug] = (time.time(), term_index)
+    return term_index
+
+
+def _load_term_index_in_background(engine_slug):
+    try:
+        load_term_index(engine_slug)
+    finally:
+        with _term_index_lock:
+            _term_index_loading.discard(engine_slug)
+        # The thread has its own database connection.
+        connection.close()
+
+
+def get_term_index(engine_slug):
+    """
+    Returns the trigram index for the given search engine, or None if it isn't loaded yet.
+
+    The whole term dictionary is too slow to load during a search, so the index is
+    loaded in a background thread, and reloaded the same way when it is older than the
+    WATSON_SUGGESTIONS_MAX_AGE setting, in seconds. Until then, the old index is used.
+    """
+    max_age = getattr(settings, "WATSON_SUGGESTIONS_MAX_AGE", 3600)
+    loaded_at, term_index = _term_index_cache.get(engine_slug, (None, None))
+    if loaded_at is not None and time.time() - loaded_at < max_age:
+        return term_index
+    with _term_index_lock:
+        if engine_slug not in _term_index_loading:
+            _term_index_loading.add(engine_slug)
+            thread = Thread(target=_load_term_index_in_background, args=(engine_slug,))
+            thread.daemon = True
+            thread.start()
+    return term_index
+
+
+def suggest(engine_slug, search_text):
+    """
+    Returns the search text with unknown words replaced by their closest dictionary terms.
+
+    Returns None if there is nothing to suggest.
+    """
+    search_text = force_text(search_text).strip()
+    if not search_text:
+        return None
+    term_index = get_term_index(engine_slug)
+    if term_index is None:
+        return None
+    changed = []
+    def replace_word(match):
+        word = match.group(0).lower()
+        if not is_term(word) or word in term_index:
+            return match.group(0)
+        suggestion = term_index.suggest_term(word)
+        if suggestion is None:
+            return match.group(0)
+        changed.append(word)
+        return suggestion
+    suggestion = RE_WORD.sub(replace_word, search_text)
+    if not changed:
+        return None
+    return suggestion
@@ -8,7 +8,7 @@ these tests have been amended to 'fooo' and 'baar'. Ho hum.
 
 from __future__ import unicode_literals
 
-import os, json
+import os, json, tempfile
 try:
     from unittest import skipUnless
 except:
@@ -24,13 +24,15 @@ except ImportError:  # Django<1.4
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.http import HttpResponseNotFound, HttpResponseServerError
 from django import template
 from django.utils.encoding import force_text
 
 import watson
-from watson.registration import RegistrationError, get_backend, SearchEngine
-from watson.models import SearchEntry
+from watson.registration import RegistrationError, get_backend, SearchEngine, process_index_queue, get_index_queue, requeue_retry_tasks
+from watson.models import SearchEntry, SearchTerm
+from watson import suggestions
 
 
 class TestModelBase(models.Model):
@@ -214,6 +216,167 @@ class InternalsTest(SearchTestBase):
         self.assertEqual(watson.search("fooo1").count(), 1)
         self.assertEqual(watson.search("fooo2").count(), 1)
 
+    def testBuildWatsonCommandInChunks(self):
+        # Hack a change into the model using a bulk update, which doesn't send signals.
+        WatsonTestModel1.objects.filter(id=self.test11.id).update(title="fooo1")
+        WatsonTestModel2.objects.filter(id=self.test21.id).update(title="fooo2")
+        # Run the rebuild command with one object per transaction.
+        call_command("buildwatson", chunk_size=1, verbosity=0)
+        # Test that the update is now applied, without duplicating entries.
+        self.assertEqual(watson.search("fooo1").count(), 1)
+        self.assertEqual(watson.search("fooo2").count(), 1)
+        self.assertEqual(SearchEntry.objects.filter(engine_slug="default").count(), 4)
+
+    def testBuildWatsonCommandResumesFromCheckpoint(self):
+        WatsonTestModel1.objects.filter(id=self.test11.id).update(title="fooo1")
+        WatsonTestModel2.objects.filter(id=self.test21.id).update(title="fooo2")
+        # Pretend that an earlier rebuild finished model1 before it was interrupted.
+        checkpoint_path = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        with open(checkpoint_path, "w") as checkpoint_file:
+            json.dump({"default:auth.WatsonTestModel1": [[self.test11.id, self.test12.id]]}, checkpoint_file)
+        try:
+            call_command("buildwatson", checkpoint=checkpoint_path, verbosity=0)
+            # Finished ranges are skipped. Models without integer keys are always rebuilt.
+            self.assertEqual(watson.search("fooo1").count(), 0)
+            self.assertEqual(watson.search("fooo2").count(), 1)
+            # The checkpoint is removed once the rebuild completes.
+            self.assertFalse(os.path.exists(checkpoint_path))
+        finally:
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+    def getEngineCount(self, model):
+        return len([
+            engine for engine_slug, engine in SearchEngine.get_created_engines()
+            if engine.is_registered(model)
+        ])
+
+    def testIndexQueueCoalescesUpdates(self):
+        with self.settings(WATSON_INDEX_QUEUE="watson.queues.LocalIndexQueue"):
+            self.test11.title = "fooo"
+            self.test11.save()
+            self.test11.save()
+            # Nothing is indexed until the queue is processed.
+            self.assertEqual(watson.search("fooo").count(), 0)
+            # One task for each engine the model is registered with.
+            self.assertEqual(process_index_queue(), self.getEngineCount(WatsonTestModel1))
+            self.assertEqual(watson.search("fooo").count(), 1)
+            self.assertEqual(process_index_queue(), 0)
+
+    def testIndexQueueRetriesMissingObjects(self):
+        with self.settings(WATSON_INDEX_QUEUE="watson.queues.LocalIndexQueue"):
+            index_queue = get_index_queue()
+            content_type = ContentType.objects.get_for_model(WatsonTestModel1)
+            # An object saved in a transaction that hasn't committed yet.
+            missing_id = WatsonTestModel1.objects.order_by("-id")[0].id + 1
+            index_queue.push("default", content_type.id, missing_id)
+            self.assertEqual(process_index_queue(), 1)
+            # The object is tried again later, not dropped.
+            self.assertEqual(process_index_queue(), 0)
+            requeue_retry_tasks(index_queue, force=True)
+            WatsonTestModel1.objects.create(
+                id = missing_id,
+                title = "fooo",
+                description = "description",
+                content = "content",
+            )
+            # The retried task is coalesced with the one queued by the save.
+            self.assertEqual(process_index_queue(), self.getEngineCount(WatsonTestModel1))
+            self.assertEqual(watson.search("fooo").count(), 1)
+            # Nothing is left to retry once the object has been indexed.
+            requeue_retry_tasks(index_queue, force=True)
+            self.assertEqual(process_index_queue(), 0)
+
+    def testIndexQueueDropsObjectsMissingTooLong(self):
+        with self.settings(WATSON_INDEX_QUEUE="watson.queues.LocalIndexQueue", WATSON_INDEX_QUEUE_MISSING_TIMEOUT=0):
+            index_queue = get_index_queue()
+            content_type = ContentType.objects.get_for_model(WatsonTestModel1)
+            missing_id = WatsonTestModel1.objects.order_by("-id")[0].id + 1
+            index_queue.push("default", content_type.id, missing_id)
+            self.assertEqual(process_index_queue(), 1)
+            # The object is assumed to be deleted.
+            requeue_retry_tasks(index_queue, force=True)
+            self.assertEqual(process_index_queue(), 0)
+
+    def testSkipUpdateFields(self):
+        adapter = watson.get_adapter(WatsonTestModel1)
+        adapter.skip_update_fields = ("title",)
+        try:
+            self.test11.title = "fooo"
+            self.test11.save(update_fields=["title"])
+            self.assertEqual(watson.search("fooo").count(), 0)
+            self.test11.save()
+            self.assertEqual(watson.search("fooo").count(), 1)
+        finally:
+            del adapter.skip_update_fields
+
+    def testFacets(self):
+        adapter = watson.get_adapter(WatsonTestModel1)
+        adapter.get_facets = lambda obj: {
+            "section": "news" if obj.pk == self.test11.pk else "culture",
+            "year": 2015,
+        }
+        try:
+            self.test11.save()
+            self.test12.save()
+            self.assertEqual(watson.facet_counts("TITLE"), {
+                "section": [("culture", 1), ("news", 1)],
+                "type": [],
+                "year": [(2015, 2)],
+            })
+            self.assertEqual(watson.search("TITLE", facets={"section": "news"}).get().object, self.test11)
+            self.assertEqual(watson.search("TITLE", facets={"year": 2015}).count(), 2)
+            # A selected facet doesn't narrow its own counts, so other values can still be chosen.
+            self.assertEqual(watson.facet_counts("TITLE", facets={"section": "news"}), {
+                "section": [("culture", 1), ("news", 1)],
+                "type": [],
+                "year": [(2015, 1)],
+            })
+            self.assertEqual(watson.facet_counts("TITLE", facets={"section": "news", "year": 2014}), {
+                "section": [],
+                "type": [],
+                "year": [(2015, 1)],
+            })
+        finally:
+            del adapter.get_facets
+
+    def testSuggestions(self):
+        with self.settings(WATSON_SUGGESTIONS=True):
+            # A full rebuild also rebuilds the term dictionary.
+            call_command("buildwatson", verbosity=0)
+            suggestions.load_term_index("default")
+            self.assertEqual(watson.suggest("contemt"), "content")
+            self.assertEqual(watson.suggest("content"), None)
+            # Saves update the term dictionary along with the search index.
+            self.test11.title = "kattepus"
+            self.test11.save()
+            self.assertEqual(SearchTerm.objects.get(engine_slug="default", term="title").frequency, 3)
+            self.assertEqual(SearchTerm.objects.get(engine_slug="default", term="kattepus").frequency, 1)
+            suggestions.load_term_index("default")
+            self.assertEqual(watson.suggest("kattepuss model1"), "kattepus model1")
+            # Saves in a search context update it once, when the context ends.
+            with watson.update_index():
+                self.test12.title = "kattepus"
+                self.test12.save()
+                self.assertEqual(SearchTerm.objects.get(engine_slug="default", term="kattepus").frequency, 1)
+            self.assertEqual(SearchTerm.objects.get(engine_slug="default", term="kattepus").frequency, 2)
+            # Deleted objects leave the dictionary.
+            self.test11.delete()
+            self.test12.delete()
+            self.assertFalse(SearchTerm.objects.filter(engine_slug="default", term="kattepus").exists())
+            suggestions.load_term_index("default")
+            self.assertEqual(watson.suggest("kattepuss"), None)
+
+    def testSuggestionsFromIndexQueue(self):
+        with self.settings(WATSON_SUGGESTIONS=True, WATSON_INDEX_QUEUE="watson.queues.LocalIndexQueue"):
+            call_command("buildwatson", verbosity=0)
+            self.test11.title = "kattepus"
+            self.test11.save()
+            self.assertFalse(SearchTerm.objects.filter(engine_slug="default", term="kattepus").exists())
+            # The queue worker updates it along with the search index.
+            process_index_queue()
+            self.assertEqual(SearchTerm.objects.get(engine_slug="default", term="kattepus").frequency, 1)
+
     def testUpdateSearchIndex(self):
         # Update a model and make sure that the search results match.
         self.test11.title = "fooo"